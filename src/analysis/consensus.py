@@ -0,0 +1,110 @@
+import itertools
+import numpy as np
+import pandas as pd
+
+# Detector flags are held as packed bitsets (np.packbits, 8 rows per byte),
+# one row of bytes per detector. Every set operation is a bytewise AND / OR /
+# XOR / NOT, and every count is a popcount, so memory and time grow with
+# rows / 8 per detector.
+
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+MAX_VENN_DETECTORS = 12
+
+def align_on_key(frames, key='DateTime'):
+    # Inner join on the key: each frame gets the positions of the shared keys,
+    # so row order inside any detector output no longer matters.
+    sorted_keys = []
+    for df in frames:
+        values = pd.to_datetime(df[key]).to_numpy(dtype='datetime64[ns]') if key == 'DateTime' else df[key].to_numpy()
+        order = np.argsort(values, kind='stable')
+        ordered = values[order]
+        if len(ordered) > 1 and (ordered[1:] == ordered[:-1]).any():
+            raise ValueError(f"Duplicate {key} values in a detector output; cannot align on key")
+        sorted_keys.append((ordered, order))
+
+    shared = sorted_keys[0][0]
+    for ordered, _ in sorted_keys[1:]:
+        shared = np.intersect1d(shared, ordered, assume_unique=True)
+
+    positions = [order[np.searchsorted(ordered, shared)] for ordered, order in sorted_keys]
+    return shared, positions
+
+def build_bitsets(detector_flags):
+    names = list(detector_flags)
+    n_rows = len(next(iter(detector_flags.values())))
+    bits = np.vstack([np.packbits(np.asarray(detector_flags[name], dtype=bool)) for name in names])
+    # Padding bits in the last byte must stay 0 through NOT operations
+    valid = np.packbits(np.ones(n_rows, dtype=bool))
+    return {'names': names, 'bits': bits, 'valid': valid, 'n_rows': n_rows}
+
+def popcount(bits):
+    return int(POPCOUNT[bits].sum(dtype=np.int64))
+
+def unpack(bitsets, bits):
+    return np.unpackbits(bits, count=bitsets['n_rows']).astype(bool)
+
+def detector_counts(bitsets):
+    return {name: popcount(bitsets['bits'][i]) for i, name in enumerate(bitsets['names'])}
+
+def pairwise_overlaps(bitsets):
+    names = bitsets['names']
+    bits = bitsets['bits']
+    matrix = np.zeros((len(names), len(names)), dtype=np.int64)
+    for i, j in itertools.combinations_with_replacement(range(len(names)), 2):
+        matrix[i, j] = matrix[j, i] = popcount(bits[i] & bits[j])
+    return pd.DataFrame(matrix, index=names, columns=names)
+
+def venn_regions(bitsets):
+    # Exclusive regions: rows flagged by exactly the detectors in each subset.
+    names = bitsets['names']
+    if len(names) > MAX_VENN_DETECTORS:
+        raise ValueError(f"Venn regions are enumerated for at most {MAX_VENN_DETECTORS} detectors")
+
+    bits = bitsets['bits']
+    inverted = ~bits & bitsets['valid']
+    regions = {}
+    for membership in itertools.product([False, True], repeat=len(names)):
+        if not any(membership):
+            continue
+        region = bitsets['valid'].copy()
+        for i, member in enumerate(membership):
+            region &= bits[i] if member else inverted[i]
+        regions[membership] = popcount(region)
+    return regions
+
+def count_planes(bitsets):
+    # Bit-sliced counter: plane i holds bit i of "number of detectors that
+    # flagged this row", updated with a ripple-carry add per detector.
+    planes = []
+    for row_bits in bitsets['bits']:
+        carry = row_bits.copy()
+        for i in range(len(planes)):
+            planes[i], carry = planes[i] ^ carry, planes[i] & carry
+        if carry.any():
+            planes.append(carry)
+    return planes
+
+def at_least_k(bitsets, planes, k):
+    # Bitwise comparison of the sliced count against the constant k, from the
+    # most significant plane down.
+    k = int(k)
+    if k <= 0:
+        return bitsets['valid'].copy()
+    if k.bit_length() > len(planes):
+        return np.zeros_like(bitsets['valid'])
+
+    greater = np.zeros_like(bitsets['valid'])
+    equal = bitsets['valid'].copy()
+    for i in reversed(range(len(planes))):
+        if (k >> i) & 1:
+            equal &= planes[i]
+        else:
+            greater |= equal & planes[i]
+            equal &= ~planes[i]
+    return greater | equal
+
+def methods_per_row(bitsets, planes):
+    counts = np.zeros(bitsets['n_rows'], dtype=np.uint16)
+    for i, plane in enumerate(planes):
+        counts += unpack(bitsets, plane).astype(np.uint16) << i
+    return counts
@@ -1,19 +1,166 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from scipy import fft, stats
+from utils import (load_final_dataset, get_numeric_features, _cache_path, project_root, CLEANED_DATA_PATH,
+                   NUMERIC_COLUMNS, SEASONS, MONTH_TO_SEASON, save_report, save_csv, print_section_header)
+from instrumentation import instrument_stage, run_manifest
 
+def comoment_pass(X, chunk_rows=200_000):
+    # One pass over the rows: each chunk's means and centred cross-products
+    # are merged into the running totals (pairwise update), which stays
+    # accurate where the raw-sums formula loses precision. As in
+    # DataFrame.corr() and cov(), NaNs are handled pairwise: every pair (i, j)
+    # keeps its own count, means and sums of squares over the rows where both
+    # are present, so all totals are k × k. mean[i, j] and m2[i, j] belong to
+    # feature i over the rows of pair (i, j).
+    k = X.shape[1]
+    n = np.zeros((k, k))
+    mean = np.zeros((k, k))
+    m2 = np.zeros((k, k))
+    comoment = np.zeros((k, k))
+    for start in range(0, len(X), chunk_rows):
+        chunk = np.asarray(X[start:start + chunk_rows], dtype=np.float64)
+        valid = ~np.isnan(chunk)
+        both = valid.astype(np.float64)
+        # Centring on the column means first keeps the per-pair sums small
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.nan_to_num(np.nansum(chunk, axis=0) / valid.sum(axis=0))
+        centred = np.where(valid, chunk - shift, 0.0)
+        n_b = both.T @ both
+        safe_n_b = np.maximum(n_b, 1)
+        sums = centred.T @ both
+        mean_b = sums / safe_n_b + shift[:, np.newaxis]
+        m2_b = (centred * centred).T @ both - sums * sums / safe_n_b
+        comoment_b = centred.T @ centred - sums * sums.T / safe_n_b
+        
+        total = n + n_b
+        weight = n * n_b / np.maximum(total, 1)
+        delta = mean_b - mean
+        comoment += comoment_b + delta * delta.T * weight
+        m2 += m2_b + delta * delta * weight
+        mean += delta * n_b / np.maximum(total, 1)
+        n = total
+    return n, mean, comoment, m2
+
+def covariance_from_comoment(n, comoment, features):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = comoment / (n - 1)
+    return pd.DataFrame(np.where(n > 1, covariance, np.nan), index=features, columns=features)
+
+def correlation_from_comoment(comoment, m2, features):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = comoment / np.sqrt(m2 * m2.T)
+    return pd.DataFrame(correlation, index=features, columns=features)
+
+@instrument_stage()
 def calculate_correlation(df, features):
     print_section_header("CORRELATION ANALYSIS")
     
-    correlation_matrix = df[features].corr()
+    n, _, comoment, m2 = comoment_pass(df[features].to_numpy(dtype=np.float64))
+    correlation_matrix = correlation_from_comoment(comoment, m2, features)
+    covariance_matrix = covariance_from_comoment(n, comoment, features)
     
     print("Correlation Matrix:")
     print(correlation_matrix)
     print()
     
-    return correlation_matrix
+    return correlation_matrix, covariance_matrix
+
+def _rank_column(task):
+    source, target = task
+    values = np.load(source, mmap_mode='r') if isinstance(source, str) else source
+    # NaNs stay NaN and the other values are ranked among themselves, so the
+    # kernel drops them pairwise (pandas re-ranks each pair's common rows)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    ranks = np.full(len(values), np.nan)
+    ranks[valid] = stats.rankdata(values[valid])
+    if target is None:
+        return ranks
+    tmp_path = f'{target}.tmp-{os.getpid()}.npy'
+    np.save(tmp_path, ranks)
+    os.replace(tmp_path, target)
+    return None
+
+@instrument_stage()
+def rank_columns(df, features, workers=None, cache=False, data_path=CLEANED_DATA_PATH):
+    print_section_header("RANKING FEATURES")
+    
+    # Cached ranks live in the binary column cache, which is replaced whenever
+    # the CSV changes, so they are never stale. Workers read the cached column
+    # files themselves instead of receiving the data.
+    if cache:
+        cache_path = _cache_path(data_path)
+        rank_dir = os.path.join(cache_path, 'ranks')
+        os.makedirs(rank_dir, exist_ok=True)
+        targets = {col: os.path.join(rank_dir, f'{col}.npy') for col in features}
+        tasks = {col: (os.path.join(cache_path, f'{col}.npy'), targets[col])
+                 for col in features if not os.path.exists(targets[col])}
+    else:
+        tasks = {col: (df[col].to_numpy(dtype=np.float64), None) for col in features}
+    
+    print(f"  Ranking {len(tasks)} of {len(features)} columns (average ranks for ties, workers={workers or 1})")
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            ranked = dict(zip(tasks, executor.map(_rank_column, tasks.values())))
+    else:
+        ranked = {col: _rank_column(task) for col, task in tasks.items()}
+    
+    if cache:
+        print(f"  ✓ Ranks cached: {os.path.relpath(rank_dir, project_root)}")
+        return np.column_stack([np.load(targets[col], mmap_mode='r') for col in features])
+    return np.column_stack([ranked[col] for col in features])
+
+@instrument_stage()
+def calculate_spearman(ranks, features):
+    print_section_header("SPEARMAN RANK CORRELATION")
+    
+    # Spearman's rho is Pearson's r on the ranks, so it reuses the same kernel
+    _, _, comoment, m2 = comoment_pass(ranks)
+    spearman_matrix = correlation_from_comoment(comoment, m2, features)
+    
+    print("Spearman Correlation Matrix:")
+    print(spearman_matrix)
+    print()
+    
+    return spearman_matrix
+
+@instrument_stage()
+def estimate_kendall(df, features, sample_size=20_000, repeats=5, seed=42):
+    print_section_header("KENDALL TAU (SUBSAMPLED)")
+    
+    # Tau is estimated on independent seeded subsamples; the spread between
+    # them gives the standard error of the mean estimate.
+    rng = np.random.default_rng(seed)
+    n_rows = len(df)
+    sample_size = min(sample_size, n_rows)
+    samples = [np.sort(rng.choice(n_rows, size=sample_size, replace=False)) for _ in range(repeats)]
+    values = {col: df[col].to_numpy(dtype=np.float64) for col in features}
+    
+    rows = []
+    for i in range(len(features)):
+        for j in range(i + 1, len(features)):
+            x, y = values[features[i]], values[features[j]]
+            taus = np.array([stats.kendalltau(x[sample], y[sample])[0] for sample in samples])
+            rows.append({
+                'Feature_1': features[i],
+                'Feature_2': features[j],
+                'Kendall_Tau': taus.mean(),
+                'Std_Error': taus.std(ddof=1) / np.sqrt(repeats) if repeats > 1 else np.nan,
+                'Sample_Min': taus.min(),
+                'Sample_Max': taus.max()
+            })
+    
+    kendall_df = pd.DataFrame(rows)
+    print(f"  {repeats} subsamples of {sample_size:,} rows ({sample_size / n_rows:.1%} of data each)")
+    print(f"  Largest standard error: {kendall_df['Std_Error'].max():.4f}")
+    
+    return kendall_df
 
 def find_strong_correlations(correlation_matrix, threshold=0.7):
     strong_corr = []
@@ -30,7 +177,8 @@ def find_strong_correlations(correlation_matrix, threshold=0.7):
     
     return pd.DataFrame(strong_corr)
 
-def create_correlation_heatmap(correlation_matrix):
+def create_correlation_heatmap(correlation_matrix, title='Feature Correlation Heatmap',
+                               filename='correlation_heatmap.png'):
     plt.figure(figsize=(12, 10))
     
     sns.heatmap(correlation_matrix, 
@@ -42,15 +190,13 @@ def create_correlation_heatmap(correlation_matrix):
                 linewidths=1,
                 cbar_kws={'label': 'Correlation Coefficient'})
     
-    plt.title('Feature Correlation Heatmap', fontsize=16, fontweight='bold', pad=20)
+    plt.title(title, fontsize=16, fontweight='bold', pad=20)
     plt.tight_layout()
-    plt.savefig('../../outputs/phase2/correlation_heatmap.png', dpi=300, bbox_inches='tight')
-    print("\n✓ Saved: correlation_heatmap.png")
+    plt.savefig(f'../../outputs/phase2/{filename}', dpi=300, bbox_inches='tight')
+    print(f"\n✓ Saved: {filename}")
     plt.close()
 
-def create_covariance_heatmap(df, features):
-    covariance_matrix = df[features].cov()
-    
+def create_covariance_heatmap(covariance_matrix):
     plt.figure(figsize=(12, 10))
     
     sns.heatmap(covariance_matrix, 
@@ -66,8 +212,6 @@ def create_covariance_heatmap(df, features):
     plt.savefig('../../outputs/phase2/covariance_heatmap.png', dpi=300, bbox_inches='tight')
     print("✓ Saved: covariance_heatmap.png")
     plt.close()
-    
-    return covariance_matrix
 
 def generate_report(correlation_matrix, strong_corr_df):
     report = []
@@ -114,13 +258,338 @@ def generate_report(correlation_matrix, strong_corr_df):
     
     return "\n".join(report)
 
-def main():
+def generate_rank_report(correlation_matrix, spearman_matrix, kendall_df, n_rows, sample_size, repeats):
+    report = []
+    report.append("Rank Correlation Report (Spearman and Kendall)")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Rank correlations measure monotonic rather than linear association, so they are")
+    report.append("not dominated by the long right tails of the consumption features.")
+    report.append("")
+    report.append(f"Spearman's rho: exact, on all {n_rows:,} rows. Each column is ranked once (ties get")
+    report.append("their average rank) and rho is Pearson's r on the ranks, from the same one-pass")
+    report.append("covariance kernel as the Pearson matrix.")
+    report.append("")
+    report.append(f"Kendall's tau-b: mean over {repeats} independent subsamples of {sample_size:,} rows;")
+    report.append("the standard error is the spread between subsamples divided by sqrt(subsamples).")
+    report.append("")
+    report.append("Pairs (Pearson r / Spearman rho / Kendall tau ± standard error):")
+    report.append("")
+    for _, row in kendall_df.iterrows():
+        f1, f2 = row['Feature_1'], row['Feature_2']
+        report.append(f"{f1} ↔ {f2}: {correlation_matrix.loc[f1, f2]:.3f} / {spearman_matrix.loc[f1, f2]:.3f} / "
+                      f"{row['Kendall_Tau']:.3f} ± {row['Std_Error']:.4f}")
+    report.append("")
+    
+    gap = (spearman_matrix - correlation_matrix).abs().to_numpy()
+    i, j = np.unravel_index(np.nanargmax(gap), gap.shape)
+    report.append("Key Findings:")
+    report.append(f"- Largest Pearson/Spearman gap: {spearman_matrix.index[i]} ↔ {spearman_matrix.columns[j]} "
+                  f"({gap[i, j]:.3f}): rank and linear association differ most for this pair")
+    report.append(f"- Largest Kendall standard error: {kendall_df['Std_Error'].max():.4f}")
+    
+    return "\n".join(report)
+
+LAG_CHANNELS = ['Global_active_power', 'Voltage', 'Sub_metering_1', 'Sub_metering_2', 'Sub_metering_3']
+MIN_LAG_OVERLAP = 100
+
+def minute_grid(datetimes, X):
+    # Rows go to their minute offset on a regular grid; missing minutes stay 0
+    # with mask 0, so they add nothing to any lagged product.
+    datetimes = np.asarray(datetimes, dtype='datetime64[ns]')
+    minutes = ((datetimes - datetimes.min()) // np.timedelta64(1, 'm')).astype(np.int64)
+    n_minutes = int(minutes.max()) + 1
+    
+    grid = np.zeros((n_minutes, X.shape[1]), dtype=np.float64)
+    mask = np.zeros(n_minutes, dtype=np.float64)
+    grid[minutes] = X
+    mask[minutes] = 1.0
+    return grid, mask
+
+@instrument_stage()
+def lagged_cross_correlation(grid, mask, channels, max_lag=1440):
+    print_section_header("LAGGED CROSS-CORRELATION (FFT)")
+    
+    valid = mask > 0
+    print(f"  Minute grid: {len(grid):,} minutes, {int(valid.sum()):,} observed "
+          f"({1 - valid.mean():.1%} gap-filled)")
+    
+    # Constant channels (Sub_metering_1 is all zero in the cleaned set) have
+    # no defined correlation; their z stays 0 and their pairs are reported as NaN
+    z = np.zeros_like(grid)
+    observed = grid[valid]
+    std = observed.std(axis=0)
+    varying = std > 0
+    for channel in np.asarray(channels)[~varying]:
+        print(f"  Note: {channel} is constant over the observed minutes; its pairs are left as NaN")
+    z[valid] = np.where(varying, (observed - observed.mean(axis=0)) / np.where(varying, std, 1.0), 0.0)
+    
+    # Zero-padding to n + max_lag keeps every lag up to max_lag free of
+    # circular wrap-around. irfft(conj(A) * B)[k] = sum_t a[t] * b[t + k].
+    size = fft.next_fast_len(len(grid) + max_lag)
+    spectra = fft.rfft(z, n=size, axis=0)
+    mask_spectrum = fft.rfft(mask, n=size)
+    
+    lags = np.arange(-max_lag, max_lag + 1)
+    positions = lags % size
+    overlap = np.rint(fft.irfft(np.conj(mask_spectrum) * mask_spectrum, n=size)[positions])
+    
+    table = {'Lag_Minutes': lags}
+    for i in range(len(channels)):
+        for j in range(i + 1, len(channels)):
+            if not (varying[i] and varying[j]):
+                table[f'{channels[i]}__{channels[j]}'] = np.full(len(lags), np.nan)
+                continue
+            products = fft.irfft(np.conj(spectra[:, i]) * spectra[:, j], n=size)[positions]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                table[f'{channels[i]}__{channels[j]}'] = np.where(overlap >= MIN_LAG_OVERLAP,
+                                                                  products / overlap, np.nan)
+    
+    lag_df = pd.DataFrame(table)
+    lag_df['Overlap_Minutes'] = overlap.astype(np.int64)
+    print(f"  ✓ {len(table) - 1} channel pairs × {len(lags):,} lags (±{max_lag} minutes)")
+    return lag_df
+
+def summarize_lag_peaks(lag_df):
+    peaks = []
+    zero = lag_df['Lag_Minutes'] == 0
+    for column in lag_df.columns[1:-1]:
+        first, second = column.split('__')
+        values = lag_df[column].to_numpy()
+        if np.isnan(values).all():
+            # Constant channel or too little overlap at every lag
+            peak_lag, peak = np.nan, np.nan
+        else:
+            best = np.nanargmax(np.abs(values))
+            peak_lag, peak = lag_df['Lag_Minutes'].iloc[best], values[best]
+        peaks.append({
+            'Feature_1': first,
+            'Feature_2': second,
+            'Peak_Lag_Minutes': peak_lag,
+            'Peak_Correlation': peak,
+            'Zero_Lag_Correlation': float(lag_df.loc[zero, column].iloc[0])
+        })
+    return pd.DataFrame(peaks)
+
+def create_lag_correlation_plot(lag_df, peaks_df):
+    pairs = list(lag_df.columns[1:-1])
+    n_cols = 5
+    n_rows = (len(pairs) + n_cols - 1) // n_cols
+    fig, axes = plt.subplots(n_rows, n_cols, figsize=(22, n_rows * 4), sharex=True)
+    axes = np.atleast_1d(axes).flatten()
+    
+    hours = lag_df['Lag_Minutes'] / 60
+    for ax, column, (_, peak) in zip(axes, pairs, peaks_df.iterrows()):
+        ax.plot(hours, lag_df[column], color='steelblue', linewidth=1)
+        ax.axvline(0, color='gray', linestyle=':', linewidth=1)
+        ax.axvline(peak['Peak_Lag_Minutes'] / 60, color='red', linestyle='--', linewidth=1)
+        ax.set_title(f"{peak['Feature_1']} → {peak['Feature_2']}\npeak {peak['Peak_Correlation']:.2f} "
+                     f"at {peak['Peak_Lag_Minutes']:+.0f} min", fontsize=10, fontweight='bold')
+        ax.set_xlabel('Lag (hours)', fontsize=9)
+        ax.set_ylabel('Correlation', fontsize=9)
+        ax.grid(alpha=0.3)
+    
+    for ax in axes[len(pairs):]:
+        fig.delaxes(ax)
+    
+    plt.tight_layout()
+    plt.savefig('../../outputs/phase2/lag_correlation.png', dpi=300, bbox_inches='tight')
+    print("\n✓ Saved: lag_correlation.png")
+    plt.close()
+
+def generate_lag_report(peaks_df, max_lag, n_minutes, n_observed):
+    report = []
+    report.append("Lagged Cross-Correlation Report")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Each channel is standardized and placed on a regular minute grid; missing minutes")
+    report.append("are filled with 0 and excluded through a mask. For every pair, the correlation at")
+    report.append("lag L is the mean of z1(t) * z2(t + L) over minutes where both are observed, for all")
+    report.append(f"lags within ±{max_lag} minutes, computed with one FFT cross-correlation per pair.")
+    report.append("A positive peak lag means the first channel leads the second by that many minutes.")
+    report.append("")
+    report.append(f"Grid: {n_minutes:,} minutes, {n_observed:,} observed ({1 - n_observed / n_minutes:.1%} gap-filled)")
+    report.append("")
+    report.append("Peaks (largest |correlation|):")
+    report.append("")
+    for _, row in peaks_df.iterrows():
+        if np.isnan(row['Peak_Correlation']):
+            report.append(f"{row['Feature_1']} → {row['Feature_2']}: undefined (constant channel or too little overlap)")
+            continue
+        report.append(f"{row['Feature_1']} → {row['Feature_2']}: {row['Peak_Correlation']:.3f} at "
+                      f"{row['Peak_Lag_Minutes']:+.0f} min (zero lag: {row['Zero_Lag_Correlation']:.3f})")
+    
+    return "\n".join(report)
+
+def main_lagged(df=None, max_lag=1440):
+    print_section_header("LAGGED CROSS-CORRELATION ANALYSIS")
+    
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'] + LAG_CHANNELS, mmap=True)
+    
+    grid, mask = minute_grid(df['DateTime'].to_numpy(), df[LAG_CHANNELS].to_numpy(dtype=np.float64))
+    lag_df = lagged_cross_correlation(grid, mask, LAG_CHANNELS, max_lag=max_lag)
+    peaks_df = summarize_lag_peaks(lag_df)
+    
+    create_lag_correlation_plot(lag_df, peaks_df)
+    save_csv(lag_df, 'lag_correlation.csv')
+    save_csv(peaks_df, 'lag_correlation_peaks.csv')
+    
+    report = generate_lag_report(peaks_df, max_lag, len(grid), int(mask.sum()))
+    save_report(report, 'lag_correlation_report.txt')
+    
+    print_section_header("LAGGED CROSS-CORRELATION COMPLETE")
+    print(f"✓ {len(peaks_df)} channel pairs, lags up to ±{max_lag} minutes")
+    
+    return lag_df, peaks_df
+
+# Window length and step between window ends, in minutes
+ROLLING_WINDOWS = {'daily': (1440, 60), 'weekly': (7 * 1440, 1440)}
+MIN_WINDOW_COVERAGE = 0.5
+# Window variances below this fraction of the channel's overall variance are
+# cumulative-sum round-off from an idle channel, not real spread
+VARIANCE_RTOL = 1e-8
+
+def rolling_correlation(grid, mask, start, features, window, step):
+    # Every window is a difference of cumulative sums of x, x^2 and x*y over
+    # the masked minute grid, so a pair costs O(n) whatever the window length.
+    # Channels are centred on their global mean first to keep the sums small.
+    valid = mask > 0
+    centred = np.where(valid[:, np.newaxis], grid - grid[valid].mean(axis=0), 0.0)
+    
+    def window_sums(values):
+        cumulative = np.concatenate([[0.0], np.cumsum(values)])
+        return cumulative[ends] - cumulative[ends - window]
+    
+    ends = np.arange(window, len(grid) + 1, step)
+    n = window_sums(mask)
+    sums = [window_sums(centred[:, i]) for i in range(len(features))]
+    # n * sum(x^2) - sum(x)^2 is n^2 times the window variance. A channel that
+    # is constant in a window (a sub-meter idle all day) leaves round-off from
+    # the long cumulative sums instead of 0, so small values are zeroed.
+    overall = centred[valid].var(axis=0)
+    variances = []
+    for i in range(len(features)):
+        variance = n * window_sums(centred[:, i] ** 2) - sums[i] ** 2
+        variances.append(np.where(variance > VARIANCE_RTOL * n ** 2 * overall[i], variance, 0.0))
+    
+    table = {'Window_End': start + (ends - 1) * np.timedelta64(1, 'm'), 'Observed_Minutes': n.astype(np.int64)}
+    enough = n >= MIN_WINDOW_COVERAGE * window
+    for i in range(len(features)):
+        for j in range(i + 1, len(features)):
+            covariance = n * window_sums(centred[:, i] * centred[:, j]) - sums[i] * sums[j]
+            # Windows where either channel is constant have no correlation
+            defined = enough & (variances[i] > 0) & (variances[j] > 0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = covariance / np.sqrt(variances[i] * variances[j])
+            table[f'{features[i]}__{features[j]}'] = np.where(defined, np.clip(corr, -1.0, 1.0), np.nan)
+    
+    return pd.DataFrame(table)
+
+@instrument_stage()
+def calculate_rolling_correlations(df, features, windows=ROLLING_WINDOWS):
+    print_section_header("ROLLING-WINDOW CORRELATION")
+    
+    datetimes = df['DateTime'].to_numpy(dtype='datetime64[ns]')
+    grid, mask = minute_grid(datetimes, df[features].to_numpy(dtype=np.float64))
+    
+    frames = []
+    for name, (window, step) in windows.items():
+        frame = rolling_correlation(grid, mask, datetimes.min(), features, window, step)
+        frame.insert(0, 'Window', name)
+        frames.append(frame)
+        print(f"  {name}: {len(frame):,} windows of {window:,} minutes, one every {step:,} minutes")
+    
+    return pd.concat(frames, ignore_index=True)
+
+def summarize_rolling_by_season(rolling_df):
+    pairs = [col for col in rolling_df.columns if '__' in col]
+    seasons = np.array(SEASONS)[MONTH_TO_SEASON[pd.DatetimeIndex(rolling_df['Window_End']).month]]
+    summary = rolling_df.assign(Season=seasons).groupby(['Window', 'Season'])[pairs].mean()
+    return summary.reindex(SEASONS, level='Season')
+
+def create_rolling_correlation_plot(rolling_df, n_pairs=4):
+    pairs = [col for col in rolling_df.columns if '__' in col]
+    weekly = rolling_df[rolling_df['Window'] == 'weekly']
+    # The pairs whose weekly correlation moves the most
+    shown = weekly[pairs].std().sort_values(ascending=False).index[:n_pairs]
+    
+    fig, axes = plt.subplots(len(shown), 1, figsize=(15, 3.5 * len(shown)), sharex=True)
+    axes = np.atleast_1d(axes)
+    for ax, pair in zip(axes, shown):
+        for name, color, width in [('daily', 'lightsteelblue', 0.8), ('weekly', 'darkblue', 2)]:
+            frame = rolling_df[rolling_df['Window'] == name]
+            ax.plot(frame['Window_End'], frame[pair], color=color, linewidth=width, label=name)
+        ax.set_title(pair.replace('__', ' ↔ '), fontsize=11, fontweight='bold')
+        ax.set_ylabel('Correlation', fontsize=10)
+        ax.set_ylim(-1.05, 1.05)
+        ax.grid(alpha=0.3)
+        ax.legend(loc='lower right')
+    
+    plt.tight_layout()
+    plt.savefig('../../outputs/phase2/rolling_correlation.png', dpi=300, bbox_inches='tight')
+    print("\n✓ Saved: rolling_correlation.png")
+    plt.close()
+
+def generate_rolling_report(rolling_df, season_df, windows=ROLLING_WINDOWS):
+    report = []
+    report.append("Rolling-Window Correlation Report")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Pearson correlations per pair over sliding windows of the minute grid, from")
+    report.append("cumulative sums (O(n) per pair, independent of the window length). Windows with")
+    report.append(f"less than {MIN_WINDOW_COVERAGE:.0%} of their minutes observed, or with a constant channel, are empty.")
+    report.append("")
+    for name, (window, step) in windows.items():
+        count = int((rolling_df['Window'] == name).sum())
+        report.append(f"{name}: {window:,}-minute windows every {step:,} minutes ({count:,} windows)")
+    report.append("")
+    report.append("Mean correlation by season (daily windows):")
+    report.append("")
+    daily = season_df.loc['daily']
+    for pair in daily.columns:
+        values = ", ".join(f"{season} {daily.loc[season, pair]:+.3f}" if season in daily.index else f"{season} n/a"
+                           for season in SEASONS)
+        report.append(f"{pair.replace('__', ' ↔ ')}: {values}")
+    
+    return "\n".join(report)
+
+def main_rolling(df=None):
+    print_section_header("ROLLING CORRELATION ANALYSIS")
+    
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'] + NUMERIC_COLUMNS, mmap=True)
+    features = get_numeric_features(df)
+    
+    rolling_df = calculate_rolling_correlations(df, features)
+    season_df = summarize_rolling_by_season(rolling_df)
+    
+    create_rolling_correlation_plot(rolling_df)
+    save_csv(rolling_df, 'rolling_correlation.csv')
+    save_csv(season_df.reset_index(), 'rolling_correlation_by_season.csv')
+    
+    report = generate_rolling_report(rolling_df, season_df)
+    save_report(report, 'rolling_correlation_report.txt')
+    
+    print_section_header("ROLLING CORRELATION COMPLETE")
+    print(f"✓ {len([c for c in rolling_df.columns if '__' in c])} pairs, {len(rolling_df):,} windows")
+    
+    return rolling_df
+
+def main(df=None, method='pearson', workers=None, kendall_sample=20_000, kendall_repeats=5, max_lag=1440):
+    if method == 'lagged':
+        return main_lagged(df, max_lag=max_lag)
+    if method == 'rolling':
+        return main_rolling(df)
+    
     print_section_header("CORRELATION & COVARIANCE ANALYSIS")
     
-    df = load_final_dataset()
+    cached = df is None
+    if df is None:
+        df = load_final_dataset(columns=NUMERIC_COLUMNS, mmap=True)
     features = get_numeric_features(df)
     
-    correlation_matrix = calculate_correlation(df, features)
+    correlation_matrix, covariance_matrix = calculate_correlation(df, features)
     strong_corr_df = find_strong_correlations(correlation_matrix, threshold=0.7)
     
     print(f"Found {len(strong_corr_df)} strong correlations (|r| >= 0.7)")
@@ -130,7 +599,7 @@ def main():
             print(f"  {row['Feature_1']} ↔ {row['Feature_2']}: {row['Correlation']:.3f}")
     
     create_correlation_heatmap(correlation_matrix)
-    covariance_matrix = create_covariance_heatmap(df, features)
+    create_covariance_heatmap(covariance_matrix)
     
     save_csv(correlation_matrix, 'correlation_matrix.csv')
     save_csv(covariance_matrix, 'covariance_matrix.csv')
@@ -140,9 +609,61 @@ def main():
     report = generate_report(correlation_matrix, strong_corr_df)
     save_report(report, 'correlation_analysis_report.txt')
     
+    if method == 'rank':
+        ranks = rank_columns(df, features, workers=workers, cache=cached)
+        spearman_matrix = calculate_spearman(ranks, features)
+        kendall_df = estimate_kendall(df, features, sample_size=kendall_sample, repeats=kendall_repeats)
+        
+        create_correlation_heatmap(spearman_matrix, title='Spearman Rank Correlation Heatmap',
+                                   filename='spearman_heatmap.png')
+        save_csv(spearman_matrix, 'spearman_correlation_matrix.csv')
+        save_csv(kendall_df, 'kendall_tau.csv')
+        report = generate_rank_report(correlation_matrix, spearman_matrix, kendall_df, len(df),
+                                      min(kendall_sample, len(df)), kendall_repeats)
+        save_report(report, 'correlation_rank_report.txt')
+    
     print_section_header("CORRELATION ANALYSIS COMPLETE")
     print(f"✓ Analyzed correlations between {len(features)} features")
     print(f"✓ Generated correlation and covariance heatmaps")
+    
+    return correlation_matrix, covariance_matrix
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Correlation and covariance analysis of the numeric features.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['pearson', 'rank', 'lagged', 'rolling'],
+        default='pearson',
+        help='pearson: correlation and covariance; rank: also Spearman (exact) and Kendall (subsampled); '
+             'lagged: FFT cross-correlation between power channels over the minute grid; '
+             'rolling: daily and weekly sliding-window correlations'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Rank columns in a process pool with N workers (default: single process)'
+    )
+    parser.add_argument(
+        '--kendall-sample',
+        type=int,
+        default=20_000,
+        help='Rows per Kendall subsample (default: 20000)'
+    )
+    parser.add_argument(
+        '--kendall-repeats',
+        type=int,
+        default=5,
+        help='Independent Kendall subsamples used for the estimate and its error (default: 5)'
+    )
+    parser.add_argument(
+        '--max-lag',
+        type=int,
+        default=1440,
+        help='Largest lag in minutes for the lagged method (default: 1440, one day)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('correlation_analysis'):
+        main(method=args.method, workers=args.workers, kendall_sample=args.kendall_sample,
+             kendall_repeats=args.kendall_repeats, max_lag=args.max_lag)
@@ -0,0 +1,62 @@
+import numpy as np
+from matplotlib.colors import LogNorm, Normalize
+
+# Scatter plots of a million points draw a million markers and still end up
+# as an overplotted blob. These helpers bin the points into a 2D histogram
+# instead and draw it as a single image, so the drawing cost depends only on
+# the number of bins. Time axes can be passed as matplotlib date numbers
+# (matplotlib.dates.date2num).
+
+def density_extent(x, y):
+    extent = []
+    for values in (x, y):
+        lo, hi = float(np.nanmin(values)), float(np.nanmax(values))
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        extent.extend([lo, hi])
+    return extent
+
+def _bin_index(values, lo, hi, edges):
+    # Arithmetic index, then a one-bin correction against the linspace edges
+    # so values on a boundary land where np.histogram2d puts them
+    n_bins = len(edges) - 1
+    idx = np.clip(((values - lo) / (hi - lo) * n_bins).astype(np.int64), 0, n_bins - 1)
+    idx -= values < edges[idx]
+    idx += (values >= edges[idx + 1]) & (idx < n_bins - 1)
+    return idx
+
+def density_grid(x, y, bins=512, extent=None, chunk_size=1_000_000):
+    # Bin indices are computed arithmetically and counted with one bincount
+    # per chunk, which is much faster than np.histogram2d's searchsorted and
+    # gives the same counts.
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if extent is None:
+        extent = density_extent(x, y)
+    x_bins, y_bins = (bins, bins) if np.isscalar(bins) else bins
+    x_lo, x_hi, y_lo, y_hi = extent
+
+    x_edges = np.linspace(x_lo, x_hi, x_bins + 1)
+    y_edges = np.linspace(y_lo, y_hi, y_bins + 1)
+    counts = np.zeros(x_bins * y_bins, dtype=np.int64)
+    for start in range(0, len(x), chunk_size):
+        xs = np.asarray(x[start:start + chunk_size], dtype=np.float64)
+        ys = np.asarray(y[start:start + chunk_size], dtype=np.float64)
+        keep = (xs >= x_lo) & (xs <= x_hi) & (ys >= y_lo) & (ys <= y_hi)
+        xi = _bin_index(xs[keep], x_lo, x_hi, x_edges)
+        yi = _bin_index(ys[keep], y_lo, y_hi, y_edges)
+        counts += np.bincount(yi * x_bins + xi, minlength=x_bins * y_bins)
+
+    return counts.reshape(y_bins, x_bins), extent
+
+def density_image(ax, x, y, bins=512, extent=None, log=True, cmap='viridis', colorbar=True):
+    counts, extent = density_grid(x, y, bins=bins, extent=extent)
+
+    vmax = max(int(counts.max()), 1)
+    norm = LogNorm(vmin=1, vmax=max(vmax, 2)) if log else Normalize(vmin=0, vmax=vmax)
+    # Empty bins stay transparent so the axes background and grid show through
+    image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', extent=extent, aspect='auto',
+                      cmap=cmap, norm=norm, interpolation='nearest')
+    if colorbar:
+        ax.figure.colorbar(image, ax=ax, label='Points per bin')
+    return image
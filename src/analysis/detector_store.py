@@ -0,0 +1,103 @@
+import argparse
+import os
+import time
+import joblib
+import pandas as pd
+import numpy as np
+from utils import project_root, save_csv, print_section_header
+
+MODELS_DIR = os.path.join(project_root, 'outputs/phase2/models')
+DETECTORS = ['zscore', 'zscore_robust', 'zscore_contextual', 'lof', 'iforest']
+
+# A detector bundle is a dict with:
+#   kind      - 'zscore', 'contextual_zscore', 'lof' or 'iforest'
+#   features  - input columns, in model order
+#   scaler    - fitted transformer applied before the model, or None for raw units
+#   threshold - decision threshold on the detector's own score
+# plus the fitted state for that kind (centre/scale, baselines, reference or model).
+
+def detector_path(name):
+    return os.path.join(MODELS_DIR, f'{name}_detector.joblib')
+
+def save_detector(bundle, name):
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    bundle = dict(bundle, name=name, fitted=pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S'))
+    joblib.dump(bundle, detector_path(name))
+    print(f"  ✓ Saved detector: {os.path.relpath(detector_path(name), project_root)}")
+
+def load_detector(name):
+    path = detector_path(name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No saved detector '{name}' at {path}; run its analysis script first")
+    return joblib.load(path)
+
+def score_batch(df, bundle):
+    X = df[bundle['features']].to_numpy(dtype=np.float64)
+    if bundle.get('scaler') is not None:
+        X = bundle['scaler'].transform(X)
+
+    kind = bundle['kind']
+    if kind == 'zscore':
+        z_scores = (X - bundle['center']) / bundle['scale']
+        scores = np.fmax.reduce(np.abs(z_scores), axis=1)
+        outliers = scores > bundle['threshold']
+    elif kind == 'contextual_zscore':
+        from outlier_zscore import score_contextual
+        z_scores = score_contextual(df, bundle['features'], bundle['baselines'])
+        scores = np.fmax.reduce(np.abs(z_scores), axis=1)
+        outliers = scores > bundle['threshold']
+    elif kind == 'lof':
+        # novelty=True semantics: batch rows are never part of the reference,
+        # so none of them is excluded from its own neighbour list.
+        from outlier_lof import score_against_reference
+        negative_lof = score_against_reference(X, np.full(len(X), -1), bundle['reference'])
+        scores = -negative_lof
+        outliers = negative_lof < bundle['threshold']
+    elif kind == 'iforest':
+        scores = bundle['model'].score_samples(X)
+        outliers = scores < bundle['threshold']
+    else:
+        raise ValueError(f"Unknown detector kind: {kind}")
+
+    name = bundle['name']
+    return pd.DataFrame({f'{name}_score': scores, f'{name}_outlier': outliers}, index=df.index)
+
+def score_new_batch(df, names=DETECTORS):
+    print_section_header("SCORING NEW BATCH")
+
+    results = [df[['DateTime']]] if 'DateTime' in df.columns else []
+    for name in names:
+        bundle = load_detector(name)
+        start = time.perf_counter()
+        scored = score_batch(df, bundle)
+        elapsed = time.perf_counter() - start
+
+        n_outliers = int(scored[f'{name}_outlier'].sum())
+        print(f"  {name:<18} {n_outliers:>8,} outliers  {elapsed * 1000:>9.1f} ms  (fitted {bundle['fitted']})")
+        results.append(scored)
+
+    return pd.concat(results, axis=1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Score a new batch of minutes with the saved outlier detectors.')
+    parser.add_argument('input', help='CSV with the measurement columns (and DateTime for zscore_contextual)')
+    parser.add_argument(
+        '-d', '--detectors',
+        nargs='+',
+        choices=DETECTORS,
+        default=['zscore', 'lof', 'iforest'],
+        help='Detectors to apply (default: zscore lof iforest)'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        default='new_batch_scores.csv',
+        help='Output file name under outputs/phase2/ (default: new_batch_scores.csv)'
+    )
+    args = parser.parse_args()
+
+    batch = pd.read_csv(args.input)
+    if 'DateTime' in batch.columns:
+        batch['DateTime'] = pd.to_datetime(batch['DateTime'])
+
+    scores_df = score_new_batch(batch, args.detectors)
+    save_csv(scores_df, args.output)
@@ -1,23 +1,57 @@
+import argparse
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
-import seaborn as sns
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from utils import save_report, save_csv, print_section_header
+from instrumentation import instrument_stage, run_manifest
+from density_plot import density_image
+from binned_kde import kde_to_frame
+from quantile_sketch import sketch_points
+from feature_summary import load_feature_summary, summary_kde
 
-def test_normality(df, features):
+def anderson_statistic(sample):
+    # Only the statistic is used, so SciPy 1.17's FutureWarning asking for a
+    # p-value `method` (not accepted by older releases) is silenced here
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', category=FutureWarning, message='.*`method` parameter')
+        return stats.anderson(sample).statistic
+
+def ks_from_sketch(sketch, mean, std):
+    # One-sample KS against N(mean, std) over every row, from the sketch's
+    # empirical CDF. Each bin is treated as an atom at its left edge, which is
+    # exact for values on the sketch grid.
+    points, counts = sketch_points(sketch)
+    n = sketch['count']
+    upper = np.cumsum(counts) / n
+    cdf = stats.norm.cdf(points, loc=mean, scale=std)
+    statistic = max((upper - cdf).max(), (cdf - (upper - counts / n)).max())
+    return statistic, stats.kstwo.sf(statistic, n)
+
+@instrument_stage()
+def test_normality(summary, features, shapiro_size=5000, seed=42):
     print_section_header("NORMALITY TESTS")
     
     normality_results = []
+    rng = np.random.default_rng(seed)
     
     for feature in features:
-        data = df[feature].dropna()
+        column = summary['columns'][feature]
+        sample = column['sample']
         
-        shapiro_stat, shapiro_p = stats.shapiro(data[:5000])
+        # Shapiro-Wilk is exact up to 5000 values; a seeded draw from the
+        # random sample covers the whole period rather than the first rows
+        positions = np.sort(rng.choice(len(sample), size=min(shapiro_size, len(sample)), replace=False))
+        shapiro_stat, shapiro_p = stats.shapiro(np.asarray(sample[positions]))
         
-        ks_stat, ks_p = stats.kstest(data, 'norm', args=(data.mean(), data.std()))
+        ks_stat, ks_p = ks_from_sketch(column['sketch'], column['mean'], column['std'])
         
-        anderson_result = stats.anderson(data)
+        anderson_stat = anderson_statistic(np.asarray(sample))
         
         is_normal_shapiro = shapiro_p > 0.05
         is_normal_ks = ks_p > 0.05
@@ -37,12 +71,12 @@ def test_normality(df, features):
             'KS_Statistic': ks_stat,
             'KS_P_Value': ks_p,
             'KS_Normal': is_normal_ks,
-            'Anderson_Statistic': anderson_result.statistic
+            'Anderson_Statistic': anderson_stat
         })
     
     return pd.DataFrame(normality_results)
 
-def create_qq_plots(df, features):
+def create_qq_plots(summary, features):
     n_features = len(features)
     n_cols = 3
     n_rows = (n_features + n_cols - 1) // n_cols
@@ -52,9 +86,14 @@ def create_qq_plots(df, features):
     
     for idx, feature in enumerate(features):
         ax = axes[idx]
-        data = df[feature].dropna()
+        sample = np.asarray(summary['columns'][feature]['sample'])
         
-        stats.probplot(data, dist="norm", plot=ax)
+        (theoretical, ordered), (slope, intercept, _) = stats.probplot(sample, dist="norm")
+        density_image(ax, theoretical, ordered, bins=256, colorbar=False)
+        ends = theoretical[[0, -1]]
+        ax.plot(ends, slope * ends + intercept, 'r-', linewidth=1.5)
+        ax.set_xlabel('Theoretical quantiles')
+        ax.set_ylabel('Ordered Values')
         ax.set_title(f'Q-Q Plot: {feature}', fontsize=11, fontweight='bold')
         ax.grid(alpha=0.3)
     
@@ -66,7 +105,7 @@ def create_qq_plots(df, features):
     print("\n✓ Saved: qq_plots.png")
     plt.close()
 
-def create_distribution_comparison(df, features):
+def create_distribution_comparison(summary, features, kde):
     n_features = len(features)
     n_cols = 2
     n_rows = (n_features + n_cols - 1) // n_cols
@@ -76,13 +115,16 @@ def create_distribution_comparison(df, features):
     
     for idx, feature in enumerate(features):
         ax = axes[idx]
-        data = df[feature].dropna()
+        column = summary['columns'][feature]
+        counts, edges = column['hist_counts'], column['hist_edges']
+        
+        ax.bar(edges[:-1], counts / (counts.sum() * np.diff(edges)), width=np.diff(edges), align='edge',
+               alpha=0.6, color='steelblue', edgecolor='black', label='Observed')
         
-        ax.hist(data, bins=50, density=True, alpha=0.6, color='steelblue', 
-                edgecolor='black', label='Observed')
+        ax.plot(kde['grid'][:, idx], kde['density'][:, idx], color='navy', linewidth=1.5, label='KDE')
         
-        mu, sigma = data.mean(), data.std()
-        x = np.linspace(data.min(), data.max(), 100)
+        mu, sigma = column['mean'], column['std']
+        x = np.linspace(column['min'], column['max'], 100)
         ax.plot(x, stats.norm.pdf(x, mu, sigma), 'r-', linewidth=2, 
                 label=f'Normal(μ={mu:.2f}, σ={sigma:.2f})')
         
@@ -100,7 +142,7 @@ def create_distribution_comparison(df, features):
     print("✓ Saved: distribution_vs_normal.png")
     plt.close()
 
-def create_kde_plots(df, features):
+def create_kde_plots(summary, features, kde):
     n_features = len(features)
     n_cols = 2
     n_rows = (n_features + n_cols - 1) // n_cols
@@ -110,12 +152,13 @@ def create_kde_plots(df, features):
     
     for idx, feature in enumerate(features):
         ax = axes[idx]
-        data = df[feature].dropna()
+        column = summary['columns'][feature]
         
-        sns.kdeplot(data=data, ax=ax, fill=True, color='steelblue', alpha=0.6)
+        ax.fill_between(kde['grid'][:, idx], kde['density'][:, idx], color='steelblue', alpha=0.6)
+        ax.plot(kde['grid'][:, idx], kde['density'][:, idx], color='steelblue', linewidth=1.5)
         
-        ax.axvline(data.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {data.mean():.2f}')
-        ax.axvline(data.median(), color='green', linestyle='--', linewidth=2, label=f'Median: {data.median():.2f}')
+        ax.axvline(column['mean'], color='red', linestyle='--', linewidth=2, label=f"Mean: {column['mean']:.2f}")
+        ax.axvline(column['median'], color='green', linestyle='--', linewidth=2, label=f"Median: {column['median']:.2f}")
         
         ax.set_xlabel(feature, fontsize=10)
         ax.set_ylabel('Density', fontsize=10)
@@ -207,19 +250,197 @@ def generate_report(normality_df):
     
     return "\n".join(report)
 
-def main():
+def ks_from_sorted(sorted_sample, mean, std):
+    # One-sample KS against N(mean, std) for data that is already sorted, so
+    # the test itself is a single vectorized pass with no sort.
+    m = len(sorted_sample)
+    cdf = stats.norm.cdf(sorted_sample, loc=mean, scale=std)
+    d_plus = (np.arange(1, m + 1) / m - cdf).max()
+    d_minus = (cdf - np.arange(m) / m).max()
+    statistic = max(d_plus, d_minus)
+    return statistic, stats.kstwo.sf(statistic, m)
+
+def _test_subsamples(task):
+    reference_path, mean, std, sample_size, repeats, seed = task
+    reference = np.load(reference_path, mmap_mode='r')
+    rng = np.random.default_rng(seed)
+    
+    results = np.empty((repeats, 4))
+    for r in range(repeats):
+        # Sorted positions into the sorted reference give a sorted sample
+        positions = np.sort(rng.choice(len(reference), size=min(sample_size, len(reference)), replace=False))
+        sample = np.asarray(reference[positions], dtype=np.float64)
+        results[r, 0] = stats.shapiro(sample)[1]
+        results[r, 1:3] = ks_from_sorted(sample, mean, std)
+        results[r, 3] = anderson_statistic(sample)
+    return results
+
+@instrument_stage()
+def test_normality_subsampled(summary, features, sample_size=5000, repeats=50, workers=None, seed=42,
+                              batch_repeats=10):
+    print_section_header("SUBSAMPLED NORMALITY TESTS")
+    
+    # Every test draws from the summary's sorted random sample of each
+    # feature, so the cost is bounded by the reference size and
+    # repeats × sample_size whatever the number of rows.
+    print(f"  Reference: {min(summary['sample_size'], summary['rows']):,} of {summary['rows']:,} rows per feature; "
+          f"{repeats} tests of {sample_size:,} rows each (workers={workers or 1})")
+    
+    tmp_dir = tempfile.mkdtemp(prefix='normality_')
+    try:
+        tasks = []
+        owners = []
+        seeds = np.random.SeedSequence(seed).spawn(len(features) * ((repeats + batch_repeats - 1) // batch_repeats))
+        for feature in features:
+            column = summary['columns'][feature]
+            # Cached summaries already have the sample on disk for the workers
+            reference_path = column.get('sample_path')
+            if reference_path is None:
+                reference_path = os.path.join(tmp_dir, f'{feature}.npy')
+                np.save(reference_path, column['sample'])
+            
+            # KS is against the normal fitted to the reference, as the full test fits the column
+            sample = np.asarray(column['sample'])
+            mean, std = sample.mean(), sample.std(ddof=1)
+            for start in range(0, repeats, batch_repeats):
+                tasks.append((reference_path, mean, std, sample_size, min(batch_repeats, repeats - start),
+                              seeds[len(tasks)]))
+                owners.append(feature)
+        
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                batches = list(executor.map(_test_subsamples, tasks))
+        else:
+            batches = [_test_subsamples(task) for task in tasks]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    pvalues = []
+    for feature, batch in zip(owners, batches):
+        frame = pd.DataFrame(batch, columns=['Shapiro_P_Value', 'KS_Statistic', 'KS_P_Value', 'Anderson_Statistic'])
+        frame.insert(0, 'Feature', feature)
+        pvalues.append(frame)
+    pvalues_df = pd.concat(pvalues, ignore_index=True)
+    pvalues_df.insert(1, 'Repeat', pvalues_df.groupby('Feature').cumcount())
+    
+    summary_rows = []
+    for feature in features:
+        frame = pvalues_df[pvalues_df['Feature'] == feature]
+        shapiro_p = frame['Shapiro_P_Value'].to_numpy()
+        ks_p = frame['KS_P_Value'].to_numpy()
+        summary_rows.append({
+            'Feature': feature,
+            'Shapiro_P_Median': np.median(shapiro_p),
+            'Shapiro_P_Q05': np.quantile(shapiro_p, 0.05),
+            'Shapiro_P_Q95': np.quantile(shapiro_p, 0.95),
+            'Shapiro_Reject_Rate': (shapiro_p <= 0.05).mean(),
+            'KS_Statistic_Median': frame['KS_Statistic'].median(),
+            'KS_P_Median': np.median(ks_p),
+            'KS_P_Q05': np.quantile(ks_p, 0.05),
+            'KS_P_Q95': np.quantile(ks_p, 0.95),
+            'KS_Reject_Rate': (ks_p <= 0.05).mean(),
+            'Anderson_Statistic_Median': frame['Anderson_Statistic'].median(),
+            'Shapiro_Normal': np.median(shapiro_p) > 0.05,
+            'KS_Normal': np.median(ks_p) > 0.05
+        })
+        print(f"{feature}:")
+        print(f"  Shapiro-Wilk: median p={np.median(shapiro_p):.4e}, rejected in {(shapiro_p <= 0.05).mean():.0%} of tests")
+        print(f"  Kolmogorov-Smirnov: median p={np.median(ks_p):.4e}, rejected in {(ks_p <= 0.05).mean():.0%} of tests")
+    
+    return pd.DataFrame(summary_rows), pvalues_df
+
+def create_pvalue_distribution_plot(pvalues_df, features):
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6), sharey=True)
+    floor = 1e-300
+    
+    for ax, column, title in [(axes[0], 'Shapiro_P_Value', 'Shapiro-Wilk'), (axes[1], 'KS_P_Value', 'Kolmogorov-Smirnov')]:
+        data = [np.log10(np.maximum(pvalues_df.loc[pvalues_df['Feature'] == f, column], floor)) for f in features]
+        ax.boxplot(data, vert=False)
+        ax.set_yticks(range(1, len(features) + 1))
+        ax.set_yticklabels(features)
+        ax.axvline(np.log10(0.05), color='red', linestyle='--', label='p = 0.05')
+        ax.set_xlabel('log10(p-value)', fontsize=11)
+        ax.set_title(f'{title} p-values across subsamples', fontsize=12, fontweight='bold')
+        ax.grid(axis='x', alpha=0.3)
+        ax.legend()
+    
+    plt.tight_layout()
+    plt.savefig('../../outputs/phase2/normality_pvalue_distribution.png', dpi=300, bbox_inches='tight')
+    print("\n✓ Saved: normality_pvalue_distribution.png")
+    plt.close()
+
+def generate_subsample_report(summary_df, n_rows, reference_rows, sample_size, repeats):
+    report = []
+    report.append("Subsampled Normality Test Report")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Tests run on seeded random subsamples spread over the whole period, not on the")
+    report.append("first rows. Every subsample comes from one sorted random reference sample per")
+    report.append("feature, so KS needs no further sorting and runtime does not grow with the data.")
+    report.append("")
+    report.append(f"Rows: {n_rows:,}; reference sample: {reference_rows:,}; {repeats} tests of {sample_size:,} rows per feature")
+    report.append("A feature counts as normal when its median p-value is above 0.05.")
+    report.append("")
+    for _, row in summary_df.iterrows():
+        report.append(f"{row['Feature']}:")
+        report.append(f"  Shapiro-Wilk p-value: median {row['Shapiro_P_Median']:.4e} "
+                      f"(5%-95%: {row['Shapiro_P_Q05']:.2e} to {row['Shapiro_P_Q95']:.2e}), "
+                      f"rejected in {row['Shapiro_Reject_Rate']:.0%} of tests")
+        report.append(f"  Kolmogorov-Smirnov p-value: median {row['KS_P_Median']:.4e} "
+                      f"(5%-95%: {row['KS_P_Q05']:.2e} to {row['KS_P_Q95']:.2e}), "
+                      f"rejected in {row['KS_Reject_Rate']:.0%} of tests")
+        report.append(f"  Result: {'Normal' if row['Shapiro_Normal'] else 'Not Normal'}")
+        report.append("")
+    
+    normal_count = int(summary_df['Shapiro_Normal'].sum())
+    report.append(f"Features passing normality (median Shapiro-Wilk p): {normal_count}/{len(summary_df)}")
+    
+    return "\n".join(report)
+
+def main_subsample(summary=None, sample_size=5000, repeats=50, reference_size=500_000, workers=None):
+    print_section_header("DISTRIBUTION ANALYSIS: SUBSAMPLED NORMALITY TESTS")
+    
+    if summary is None:
+        summary = load_feature_summary(sample_size=reference_size)
+    features = summary['features']
+    
+    summary_df, pvalues_df = test_normality_subsampled(
+        summary, features, sample_size=sample_size, repeats=repeats, workers=workers
+    )
+    create_pvalue_distribution_plot(pvalues_df, features)
+    save_csv(summary_df, 'normality_tests_subsampled.csv')
+    save_csv(pvalues_df, 'normality_pvalues.csv')
+    
+    report = generate_subsample_report(summary_df, summary['rows'], min(summary['sample_size'], summary['rows']),
+                                       sample_size, repeats)
+    save_report(report, 'normality_subsample_report.txt')
+    
+    print_section_header("SUBSAMPLED NORMALITY TESTS COMPLETE")
+    print(f"✓ {repeats} subsample tests for each of {len(features)} features")
+    print(f"✓ {int(summary_df['Shapiro_Normal'].sum())}/{len(features)} features are normally distributed (median p)")
+    
+    return summary_df
+
+def main(summary=None, method='full', **kwargs):
+    if method == 'subsample':
+        return main_subsample(summary, **kwargs)
+    
     print_section_header("DISTRIBUTION ANALYSIS & NORMALITY TESTS")
     
-    df = load_final_dataset()
-    features = get_numeric_features(df)
+    if summary is None:
+        summary = load_feature_summary()
+    features = summary['features']
+    
+    normality_df = test_normality(summary, features)
     
-    normality_df = test_normality(df, features)
+    kde = summary_kde(summary, features)
     
-    create_qq_plots(df, features)
-    create_distribution_comparison(df, features)
-    create_kde_plots(df, features)
+    create_qq_plots(summary, features)
+    create_distribution_comparison(summary, features, kde)
+    create_kde_plots(summary, features, kde)
     
     save_csv(normality_df, 'normality_tests.csv')
+    save_csv(kde_to_frame(kde), 'kde_density.csv')
     
     report = generate_report(normality_df)
     save_report(report, 'distribution_analysis_report.txt')
@@ -229,6 +450,46 @@ def main():
     print(f"✓ Tested {len(features)} features for normality")
     print(f"✓ {normal_count}/{len(features)} features are normally distributed")
     print(f"✓ Generated Q-Q plots, distribution comparisons, and KDE plots")
+    
+    return normality_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Distribution analysis and normality tests.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['full', 'subsample'],
+        default='full',
+        help='full: tests, Q-Q, distribution and KDE plots; subsample: repeated tests on seeded random subsamples'
+    )
+    parser.add_argument(
+        '-s', '--sample-size',
+        type=int,
+        default=5000,
+        help='Rows per subsample test (default: 5000, the Shapiro-Wilk exact limit)'
+    )
+    parser.add_argument(
+        '-n', '--repeats',
+        type=int,
+        default=50,
+        help='Subsample tests per feature (default: 50)'
+    )
+    parser.add_argument(
+        '-r', '--reference-size',
+        type=int,
+        default=500_000,
+        help='Rows in the sorted reference sample that subsamples are drawn from (default: 500000)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Run the tests in a process pool with N workers (default: single process)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('distribution_analysis'):
+        if args.method == 'subsample':
+            main(method='subsample', sample_size=args.sample_size, repeats=args.repeats,
+                 reference_size=args.reference_size, workers=args.workers)
+        else:
+            main()
@@ -1,69 +1,122 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 from scipy import stats
 import matplotlib.pyplot as plt
-import seaborn as sns
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from utils import (load_final_dataset, _cache_path, CLEANED_DATA_PATH,
+                   save_report, save_csv, print_section_header)
+from instrumentation import instrument_stage, run_manifest
+from feature_summary import feature_summary
+from moment_engine import empty_moments, chunk_moments, merge_moments, finalize_moments, partial_quantiles
+from quantile_sketch import create_sketch, update_sketch, merge_sketches, sketch_quantile
 
-def calculate_enhanced_statistics(df, features):
-    print_section_header("ENHANCED STATISTICAL ANALYSIS")
-    
-    stats_list = []
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+
+def statistics_frame(features, moments, quantiles, minimum, maximum):
+    count = moments['count']
+    ci_lower, ci_upper = stats.t.interval(0.95, count - 1, loc=moments['mean'], scale=moments['sem'])
+    p05, q25, median, q75, p95 = quantiles
     
-    for feature in features:
-        data = df[feature].dropna()
-        
-        mean = data.mean()
-        median = data.median()
-        std = data.std()
-        variance = data.var()
-        
-        q25 = data.quantile(0.25)
-        q75 = data.quantile(0.75)
-        iqr = q75 - q25
-        
-        skewness = stats.skew(data)
-        kurtosis = stats.kurtosis(data)
-        
-        ci_95 = stats.t.interval(0.95, len(data)-1, loc=mean, scale=stats.sem(data))
-        ci_lower = ci_95[0]
-        ci_upper = ci_95[1]
-        
-        percentile_5 = data.quantile(0.05)
-        percentile_95 = data.quantile(0.95)
-        
-        min_val = data.min()
-        max_val = data.max()
-        
-        stats_dict = {
-            'Feature': feature,
-            'Count': len(data),
-            'Mean': mean,
-            'Median': median,
-            'Std': std,
-            'Variance': variance,
-            'Min': min_val,
-            'Max': max_val,
-            'Q25': q25,
-            'Q75': q75,
-            'IQR': iqr,
-            'Skewness': skewness,
-            'Kurtosis': kurtosis,
-            'CI_95_Lower': ci_lower,
-            'CI_95_Upper': ci_upper,
-            'Percentile_5': percentile_5,
-            'Percentile_95': percentile_95
-        }
-        
-        stats_list.append(stats_dict)
-        
-        print(f"{feature}:")
+    return pd.DataFrame({
+        'Feature': features,
+        'Count': count,
+        'Mean': moments['mean'],
+        'Median': median,
+        'Std': moments['std'],
+        'Variance': moments['variance'],
+        'Min': minimum,
+        'Max': maximum,
+        'Q25': q25,
+        'Q75': q75,
+        'IQR': q75 - q25,
+        'Skewness': moments['skewness'],
+        'Kurtosis': moments['kurtosis'],
+        'CI_95_Lower': ci_lower,
+        'CI_95_Upper': ci_upper,
+        'Percentile_5': p05,
+        'Percentile_95': p95
+    })
+
+def print_shape_summary(stats_df):
+    for _, row in stats_df.iterrows():
+        skewness, kurtosis = row['Skewness'], row['Kurtosis']
+        print(f"{row['Feature']}:")
         print(f"  Skewness: {skewness:.4f} {'(right-skewed)' if skewness > 0 else '(left-skewed)' if skewness < 0 else '(symmetric)'}")
         print(f"  Kurtosis: {kurtosis:.4f} {'(heavy-tailed)' if kurtosis > 0 else '(light-tailed)'}")
-        print(f"  95% CI: [{ci_lower:.4f}, {ci_upper:.4f}]")
+        print(f"  95% CI: [{row['CI_95_Lower']:.4f}, {row['CI_95_Upper']:.4f}]")
         print()
+
+def summary_moments(summary, features):
+    columns = [summary['columns'][f] for f in features]
+    moments = {key: np.array([column[key] for column in columns], dtype=np.float64)
+               for key in ('mean', 'variance', 'std', 'skewness', 'kurtosis')}
+    moments['count'] = np.array([column['count'] for column in columns], dtype=np.int64)
+    moments['sem'] = moments['std'] / np.sqrt(moments['count'])
+    return moments
+
+@instrument_stage()
+def calculate_enhanced_statistics(df, features, summary):
+    print_section_header("ENHANCED STATISTICAL ANALYSIS")
     
-    stats_df = pd.DataFrame(stats_list)
+    # The moments come from the distribution summary, which the moment engine
+    # already built in its pass; the quantiles, min and max need one partial
+    # sort over all features at their original precision
+    moments = summary_moments(summary, features)
+    quantiles, minimum, maximum = partial_quantiles(df[features].to_numpy(dtype=np.float64), QUANTILES)
+    
+    stats_df = statistics_frame(features, moments, quantiles, minimum, maximum)
+    print_shape_summary(stats_df)
+    return stats_df
+
+def _partial_statistics(task):
+    column_paths, start, stop, chunk_rows = task
+    columns = [np.load(path, mmap_mode='r') for path in column_paths]
+    
+    state = empty_moments(len(columns))
+    sketches = [create_sketch() for _ in columns]
+    for chunk_start in range(start, stop, chunk_rows):
+        chunk_stop = min(chunk_start + chunk_rows, stop)
+        X = np.column_stack([col[chunk_start:chunk_stop] for col in columns])
+        state = merge_moments(state, chunk_moments(X))
+        for j, sketch in enumerate(sketches):
+            update_sketch(sketch, X[:, j])
+    return state, sketches
+
+@instrument_stage()
+def calculate_enhanced_statistics_streaming(features, workers=None, block_rows=1_000_000, chunk_rows=65_536,
+                                            data_path=CLEANED_DATA_PATH):
+    print_section_header("ENHANCED STATISTICAL ANALYSIS (STREAMING)")
+    
+    # Each worker reads a block of rows from the cached column files and
+    # returns mergeable partials: moment sums and one quantile sketch per
+    # feature. Moments merge exactly; quantiles carry the sketch's bin error.
+    n_rows = len(load_final_dataset(columns=list(features), mmap=True, data_path=data_path))
+    cache_path = _cache_path(data_path)
+    column_paths = [os.path.join(cache_path, f'{col}.npy') for col in features]
+    tasks = [(column_paths, start, min(start + block_rows, n_rows), chunk_rows)
+             for start in range(0, n_rows, block_rows)]
+    print(f"  {len(tasks)} blocks of up to {block_rows:,} rows (workers={workers or 1})")
+    
+    if workers and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(_partial_statistics, tasks))
+    else:
+        partials = [_partial_statistics(task) for task in tasks]
+    
+    state = empty_moments(len(features))
+    sketches = [create_sketch() for _ in features]
+    for block_state, block_sketches in partials:
+        state = merge_moments(state, block_state)
+        sketches = [merge_sketches(a, b) for a, b in zip(sketches, block_sketches)]
+    
+    quantiles = np.column_stack([sketch_quantile(sketch, QUANTILES) for sketch in sketches])
+    minimum = np.array([sketch['min'] if sketch['count'] else np.nan for sketch in sketches])
+    maximum = np.array([sketch['max'] if sketch['count'] else np.nan for sketch in sketches])
+    
+    stats_df = statistics_frame(list(features), finalize_moments(state), quantiles, minimum, maximum)
+    print_shape_summary(stats_df)
     return stats_df
 
 def interpret_skewness(skewness):
@@ -88,7 +141,7 @@ def interpret_kurtosis(kurtosis):
     else:
         return "Light-tailed (platykurtic) - fewer outliers"
 
-def visualize_distributions(df, features):
+def visualize_distributions(summary, features):
     n_features = len(features)
     n_cols = 3
     n_rows = (n_features + n_cols - 1) // n_cols
@@ -98,15 +151,17 @@ def visualize_distributions(df, features):
     
     for idx, feature in enumerate(features):
         ax = axes[idx]
-        data = df[feature].dropna()
+        column = summary['columns'][feature]
+        edges = column['hist_edges']
         
-        ax.hist(data, bins=50, alpha=0.7, color='steelblue', edgecolor='black')
-        ax.axvline(data.mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {data.mean():.2f}')
-        ax.axvline(data.median(), color='green', linestyle='--', linewidth=2, label=f'Median: {data.median():.2f}')
+        ax.bar(edges[:-1], column['hist_counts'], width=np.diff(edges), align='edge',
+               alpha=0.7, color='steelblue', edgecolor='black')
+        ax.axvline(column['mean'], color='red', linestyle='--', linewidth=2, label=f"Mean: {column['mean']:.2f}")
+        ax.axvline(column['median'], color='green', linestyle='--', linewidth=2, label=f"Median: {column['median']:.2f}")
         
         ax.set_xlabel(feature, fontsize=10)
         ax.set_ylabel('Frequency', fontsize=10)
-        ax.set_title(f'{feature}\nSkew: {stats.skew(data):.2f}, Kurt: {stats.kurtosis(data):.2f}', 
+        ax.set_title(f"{feature}\nSkew: {column['skewness']:.2f}, Kurt: {column['kurtosis']:.2f}", 
                      fontsize=11, fontweight='bold')
         ax.legend(fontsize=8)
         ax.grid(alpha=0.3)
@@ -215,17 +270,22 @@ def generate_report(stats_df):
     
     return "\n".join(report)
 
-def main():
+def main(df=None, summary=None, method='exact', workers=None):
     print_section_header("ENHANCED STATISTICS ANALYSIS")
     
-    df = load_final_dataset()
-    features = get_numeric_features(df)
-    
-    stats_df = calculate_enhanced_statistics(df, features)
+    if summary is None:
+        summary = feature_summary(df)
+    features = summary['features']
+    if method == 'streaming':
+        stats_df = calculate_enhanced_statistics_streaming(features, workers=workers)
+    else:
+        if df is None:
+            df = load_final_dataset(columns=features, mmap=True)
+        stats_df = calculate_enhanced_statistics(df, features, summary)
     
     save_csv(stats_df, 'enhanced_statistics.csv')
     
-    visualize_distributions(df, features)
+    visualize_distributions(summary, features)
     create_statistics_summary_plot(stats_df)
     
     report = generate_report(stats_df)
@@ -235,6 +295,25 @@ def main():
     print(f"✓ Analyzed {len(features)} features")
     print(f"✓ Calculated skewness, kurtosis, and confidence intervals")
     print(f"✓ Generated distribution visualizations")
+    
+    return stats_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Enhanced descriptive statistics of the numeric features.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['exact', 'streaming'],
+        default='exact',
+        help='exact: in-memory moments and partial-sort quantiles; '
+             'streaming: mergeable per-block partials from the column cache, quantiles from sketches'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Process row blocks in a pool with N workers in streaming mode (default: single process)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('enhanced_statistics'):
+        main(method=args.method, workers=args.workers)
@@ -0,0 +1,129 @@
+import json
+import os
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+from utils import (load_final_dataset, _cache_path, _source_signature, project_root,
+                   CLEANED_DATA_PATH, NUMERIC_COLUMNS)
+from instrumentation import run_manifest
+
+# The standardized float32 feature matrix shared by PCA, LOF, Isolation Forest
+# and the saved detectors. It lives next to the binary column cache, so it is
+# discarded whenever that cache is rebuilt, and it is read with mmap_mode='r'.
+
+def _matrix_paths(data_path):
+    cache_path = _cache_path(data_path)
+    return os.path.join(cache_path, 'standardized.npy'), os.path.join(cache_path, 'standardized.json')
+
+def _column_params(values):
+    # StandardScaler conventions: population std, and scale 1 for constant columns
+    mean = float(np.nanmean(values))
+    var = float(np.nanvar(values))
+    scale = np.sqrt(var) if var > 0 else 1.0
+    return mean, var, scale
+
+def _standardize_into(X, df, features):
+    params = {'features': list(features), 'mean': [], 'var': [], 'scale': [], 'min': [], 'max': []}
+    for j, col in enumerate(features):
+        values = np.asarray(df[col], dtype=np.float64)
+        mean, var, scale = _column_params(values)
+        X[:, j] = (values - mean) / scale
+        params['mean'].append(mean)
+        params['var'].append(var)
+        params['scale'].append(scale)
+        params['min'].append(float(np.nanmin(values)))
+        params['max'].append(float(np.nanmax(values)))
+    params['rows'] = len(df)
+    return params
+
+def standardize_matrix(df, features):
+    X = np.empty((len(df), len(features)), dtype=np.float32)
+    return X, _standardize_into(X, df, features)
+
+def build_standardized_matrix(features=NUMERIC_COLUMNS, data_path=CLEANED_DATA_PATH):
+    print("  Building standardized float32 feature matrix...")
+    df = load_final_dataset(columns=list(features), mmap=True, data_path=data_path)
+    matrix_path, meta_path = _matrix_paths(data_path)
+
+    # Written one column at a time, so peak memory is one float64 column
+    tmp_path = f'{matrix_path}.tmp-{os.getpid()}.npy'
+    X = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(len(df), len(features)))
+    params = _standardize_into(X, df, features)
+    X.flush()
+    del X
+    os.replace(tmp_path, matrix_path)
+
+    params.update(_source_signature(data_path))
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(params, f, indent=2)
+
+    print(f"  ✓ Cached standardized matrix: {os.path.relpath(matrix_path, project_root)}")
+    return params
+
+def load_standardized_matrix(features=NUMERIC_COLUMNS, data_path=CLEANED_DATA_PATH):
+    matrix_path, meta_path = _matrix_paths(data_path)
+
+    params = None
+    if os.path.exists(meta_path) and os.path.exists(matrix_path):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        signature = _source_signature(data_path)
+        if params['features'] != list(features) or any(params.get(k) != v for k, v in signature.items()):
+            params = None
+    if params is None:
+        params = build_standardized_matrix(features, data_path)
+
+    X = np.load(matrix_path, mmap_mode='r')
+    params['path'] = matrix_path
+    print(f"  ✓ Standardized matrix: {X.shape[0]:,} rows × {X.shape[1]} features (float32, memory-mapped)")
+    return X, params
+
+def open_standardized_matrix(params):
+    return np.load(params['path'], mmap_mode='r')
+
+def standardized_features(df=None, matrix=None, features=NUMERIC_COLUMNS):
+    # Pipeline runs pass the params from the feature_matrix stage and open its
+    # memory-mapped file. Standalone runs read the shared artifact, and a
+    # DataFrame passed on its own is standardized in memory.
+    if matrix is not None:
+        return open_standardized_matrix(matrix), dict(matrix)
+    if df is None:
+        return load_standardized_matrix(features)
+    X, params = standardize_matrix(df, features)
+    params['path'] = None
+    return X, params
+
+def select_features(X, params, features):
+    # Evenly spaced columns (all of them, or a contiguous run) are a view of
+    # the memory-mapped matrix. Any other subset, such as PCA's features
+    # without Sub_metering_1, needs fancy indexing and is copied into memory.
+    idx = [params['features'].index(f) for f in features]
+    step = idx[1] - idx[0] if len(idx) > 1 else 1
+    if step > 0 and idx == list(range(idx[0], idx[-1] + 1, step)):
+        return X[:, idx[0]:idx[-1] + 1:step]
+    selected = np.asarray(X[:, idx])
+    print(f"  Copied {len(idx)} of {X.shape[1]} standardized columns into memory "
+          f"({selected.nbytes / 1024 ** 2:.1f} MB)")
+    return selected
+
+def scaler_from_params(params, features=None):
+    features = features or params['features']
+    idx = [params['features'].index(f) for f in features]
+    scaler = StandardScaler()
+    scaler.mean_ = np.asarray(params['mean'], dtype=np.float64)[idx]
+    scaler.var_ = np.asarray(params['var'], dtype=np.float64)[idx]
+    scaler.scale_ = np.asarray(params['scale'], dtype=np.float64)[idx]
+    scaler.n_features_in_ = len(idx)
+    scaler.n_samples_seen_ = params['rows']
+    return scaler
+
+def main(df=None):
+    # Pipeline stage: the cleaning stage has written the cleaned CSV, so the
+    # shared matrix is built (or reused) for it on disk, and only its params
+    # and path are handed to PCA, LOF and Isolation Forest, which open it
+    # memory-mapped instead of each standardizing the DataFrame again
+    _, params = load_standardized_matrix()
+    return params
+
+if __name__ == "__main__":
+    with run_manifest('feature_matrix'):
+        main()
@@ -0,0 +1,186 @@
+import json
+import os
+import numpy as np
+from utils import (load_final_dataset, get_numeric_features, _cache_path, _source_signature, project_root,
+                   CLEANED_DATA_PATH, NUMERIC_COLUMNS)
+from quantile_sketch import create_sketch, update_sketch, sketch_quantile, sketch_points
+from binned_kde import weighted_binned_kde
+from moment_engine import empty_moments, chunk_moments, merge_moments, finalize_moments
+from instrumentation import run_manifest
+
+# Per-feature distribution summary shared by the enhanced statistics and
+# distribution analyses: moments, a quantile sketch, a fixed-bin histogram
+# and a sorted random sample. It is built in a chunked pass over the
+# columns and cached next to the binary column cache, so the histogram, Q-Q,
+# KDE and normality-test paths no longer each re-scan the data. A second
+# pass counts the histogram exactly once each column's range is known.
+
+HISTOGRAM_BINS = 50
+SAMPLE_SIZE = 500_000
+SAMPLE_SEED = 42
+# Bumped when the summary's contents change, so older cached summaries are rebuilt
+SUMMARY_FORMAT = 2
+
+def _summary_dir(data_path):
+    return os.path.join(_cache_path(data_path), 'summary')
+
+def _sample_path(summary_dir, feature):
+    return os.path.join(summary_dir, f'{feature}.sample.npy')
+
+def _finish_column(moments, j, sketch, sample):
+    n = int(moments['count'][j])
+    column = {key: float(moments[key][j]) for key in ('mean', 'variance', 'std', 'skewness', 'kurtosis')}
+    column.update({
+        'count': n,
+        'min': float(sketch['min']) if n else np.nan,
+        'max': float(sketch['max']) if n else np.nan,
+        'median': float(sketch_quantile(sketch, 0.5)[0]),
+        'sketch': sketch,
+        'sample': sample
+    })
+    return column
+
+def _histogram_range(column):
+    # np.histogram's own range for the column, so the summed chunk counts
+    # match a histogram of the whole column
+    lo, hi = (column['min'], column['max']) if column['count'] else (0.0, 1.0)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return lo, hi
+
+def build_feature_summary(df, features, sample_size=SAMPLE_SIZE, bins=HISTOGRAM_BINS, seed=SAMPLE_SEED,
+                          chunk_size=1_000_000):
+    print(f"  Building distribution summary for {len(features)} features...")
+    n_rows = len(df)
+
+    # The sample rows are drawn up front and sorted, so each chunk picks up
+    # its share of them during the same pass.
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(n_rows, size=min(sample_size, n_rows), replace=False))
+
+    state = empty_moments(len(features))
+    sketches = {f: create_sketch() for f in features}
+    samples = {f: np.empty(len(sample_rows)) for f in features}
+    arrays = {f: df[f].to_numpy() for f in features}
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        first, last = np.searchsorted(sample_rows, [start, stop])
+        picked = sample_rows[first:last]
+        X = np.column_stack([np.asarray(arrays[f][start:stop], dtype=np.float64) for f in features])
+        state = merge_moments(state, chunk_moments(X))
+        for j, feature in enumerate(features):
+            samples[feature][first:last] = X[picked - start, j]
+            update_sketch(sketches[feature], X[:, j])
+
+    moments = finalize_moments(state)
+    columns = {}
+    for j, feature in enumerate(features):
+        sample = samples[feature]
+        sample = np.sort(sample[~np.isnan(sample)])
+        columns[feature] = _finish_column(moments, j, sketches[feature], sample)
+
+    # The bin edges depend on each column's min and max, so the histogram is
+    # counted exactly in a second chunked pass once those are known
+    ranges = {f: _histogram_range(columns[f]) for f in features}
+    hist_counts = {f: np.zeros(bins, dtype=np.int64) for f in features}
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+        for feature in features:
+            values = np.asarray(arrays[feature][start:stop], dtype=np.float64)
+            counts, _ = np.histogram(values[~np.isnan(values)], bins=bins, range=ranges[feature])
+            hist_counts[feature] += counts
+    for feature in features:
+        columns[feature]['hist_counts'] = hist_counts[feature]
+        columns[feature]['hist_edges'] = np.histogram_bin_edges([], bins=bins, range=ranges[feature])
+
+    return {'features': list(features), 'rows': n_rows, 'sample_size': sample_size, 'bins': bins,
+            'columns': columns}
+
+def save_feature_summary(summary, data_path=CLEANED_DATA_PATH):
+    summary_dir = _summary_dir(data_path)
+    os.makedirs(summary_dir, exist_ok=True)
+
+    meta = {key: summary[key] for key in ('features', 'rows', 'sample_size', 'bins')}
+    meta['format'] = SUMMARY_FORMAT
+    meta['columns'] = {}
+    arrays = {}
+    for feature, column in summary['columns'].items():
+        np.save(_sample_path(summary_dir, feature), column['sample'])
+        sketch = column['sketch']
+        arrays[feature] = sketch['counts']
+        meta['columns'][feature] = {
+            key: value for key, value in column.items() if key not in ('sketch', 'sample', 'hist_counts', 'hist_edges')
+        }
+        meta['columns'][feature]['sketch'] = {key: value for key, value in sketch.items() if key != 'counts'}
+        meta['columns'][feature]['hist_counts'] = column['hist_counts'].tolist()
+        meta['columns'][feature]['hist_edges'] = column['hist_edges'].tolist()
+    np.savez(os.path.join(summary_dir, 'sketches.npz'), **arrays)
+
+    # The metadata goes last, so a partly written summary is never valid
+    meta.update(_source_signature(data_path))
+    with open(os.path.join(summary_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    print(f"  ✓ Cached distribution summary: {os.path.relpath(summary_dir, project_root)}")
+
+def _read_feature_summary(features, sample_size, bins, data_path):
+    summary_dir = _summary_dir(data_path)
+    meta_path = os.path.join(summary_dir, 'summary.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    signature = _source_signature(data_path)
+    if (meta.get('format') != SUMMARY_FORMAT or meta['features'] != list(features)
+            or meta['sample_size'] != sample_size or meta['bins'] != bins
+            or any(meta.get(k) != v for k, v in signature.items())):
+        return None
+
+    with np.load(os.path.join(summary_dir, 'sketches.npz')) as sketch_counts:
+        for feature, column in meta['columns'].items():
+            column['sketch']['counts'] = sketch_counts[feature]
+            column['hist_counts'] = np.asarray(column['hist_counts'])
+            column['hist_edges'] = np.asarray(column['hist_edges'])
+            column['sample_path'] = _sample_path(summary_dir, feature)
+            column['sample'] = np.load(column['sample_path'], mmap_mode='r')
+    return meta
+
+def load_feature_summary(features=NUMERIC_COLUMNS, sample_size=SAMPLE_SIZE, bins=HISTOGRAM_BINS,
+                         data_path=CLEANED_DATA_PATH):
+    summary = _read_feature_summary(features, sample_size, bins, data_path)
+    if summary is None:
+        df = load_final_dataset(columns=list(features), mmap=True, data_path=data_path)
+        save_feature_summary(build_feature_summary(df, features, sample_size, bins), data_path)
+        summary = _read_feature_summary(features, sample_size, bins, data_path)
+
+    print(f"  ✓ Distribution summary: {summary['rows']:,} rows × {len(summary['features'])} features "
+          f"(sorted samples of {sample_size:,} rows, memory-mapped)")
+    return summary
+
+def feature_summary(df=None, features=None, sample_size=SAMPLE_SIZE):
+    # Standalone runs read the cached summary. A DataFrame passed directly is
+    # summarized in memory; pipeline runs get the summary from its own stage.
+    if df is None:
+        return load_feature_summary(features or NUMERIC_COLUMNS, sample_size)
+    return build_feature_summary(df, features or get_numeric_features(df), sample_size)
+
+def summary_kde(summary, features=None, grid_size=2048):
+    # KDE of the sketch bins weighted by their counts, with the bandwidth set
+    # from the full column's count and standard deviation
+    features = features or summary['features']
+    columns = []
+    for feature in features:
+        column = summary['columns'][feature]
+        points, counts = sketch_points(column['sketch'])
+        columns.append((points, counts.astype(np.float64), column['count'], column['std']))
+    return weighted_binned_kde(features, columns, grid_size=grid_size)
+
+def main(df=None):
+    # Pipeline stage: built once from the cleaned data and handed to the
+    # enhanced statistics and distribution stages, which the pipeline skips
+    # rebuilding while the cleaned data is unchanged
+    return feature_summary(df)
+
+if __name__ == "__main__":
+    with run_manifest('feature_summary'):
+        main()
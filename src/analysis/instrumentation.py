@@ -0,0 +1,149 @@
+import functools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from utils import create_timestamp, project_root
+
+_records = []
+_active = []
+
+def count_rows(value):
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return len(value)
+    if isinstance(value, dict):
+        # Summaries (e.g. feature_summary) carry the row count they describe
+        if isinstance(value.get('rows'), int):
+            return value['rows']
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            rows = count_rows(item)
+            if rows is not None:
+                return rows
+    return None
+
+def process_peak_rss_mb():
+    # Peak RSS of the whole process so far, not of one stage: in a reused pool
+    # worker it can come from an earlier stage run in the same process
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+@contextmanager
+def track_stage(name, rows_in=None, trace_memory=True):
+    record = {
+        'stage': name,
+        'parent': _active[-1]['stage'] if _active else None,
+        'rows_in': rows_in,
+        'rows_out': None,
+        '_peak': 0
+    }
+
+    started_tracing = False
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        elif _active:
+            # reset_peak() is global, so bank the enclosing stage's peak first
+            _active[-1]['_peak'] = max(_active[-1]['_peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    _active.append(record)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield record
+    finally:
+        wall_time = time.perf_counter() - wall_start
+        cpu_time = time.process_time() - cpu_start
+        _active.pop()
+
+        peak = record.pop('_peak')
+        if trace_memory:
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            if started_tracing:
+                tracemalloc.stop()
+            elif _active:
+                _active[-1]['_peak'] = max(_active[-1]['_peak'], peak)
+
+        rows = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+        record['wall_time_s'] = round(wall_time, 4)
+        record['cpu_time_s'] = round(cpu_time, 4)
+        record['rows_per_s'] = round(rows / wall_time, 1) if rows and wall_time > 0 else None
+        record['peak_tracemalloc_mb'] = round(peak / 1024**2, 2) if trace_memory else None
+        record['process_peak_rss_mb'] = round(process_peak_rss_mb(), 2) if resource is not None else None
+        _records.append(record)
+
+def instrument_stage(name=None, trace_memory=True):
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = count_rows(list(args) + list(kwargs.values()))
+            with track_stage(stage_name, rows_in=rows_in, trace_memory=trace_memory) as record:
+                result = func(*args, **kwargs)
+                record['rows_out'] = count_rows(result)
+            return result
+
+        return wrapper
+    return decorator
+
+def pop_stage_records():
+    records = list(_records)
+    _records.clear()
+    return records
+
+def write_run_manifest(records, path=None, extra=None, name=None):
+    if path is None:
+        tag = f"{name}_" if name else ''
+        filename = f"run_manifest_{tag}{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        path = os.path.join(project_root, 'reports/runs', filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    manifest = {
+        'generated': create_timestamp(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'stage_wall_time_total_s': round(sum(r['wall_time_s'] for r in records if r['parent'] is None), 4),
+        'stages': records
+    }
+    if extra:
+        manifest.update(extra)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, default=str)
+
+    print(f"  ✓ Saved run manifest: {os.path.relpath(path, project_root)}")
+    return path
+
+@contextmanager
+def run_manifest(script, **extra):
+    # For standalone runs (`python outlier_lof.py`): the script becomes the
+    # top-level stage, its decorated functions nest under it, and the records
+    # are written out on exit instead of waiting for run_pipeline.py to
+    # collect them. Memory is traced by the nested stages only.
+    try:
+        with track_stage(script, trace_memory=False):
+            yield
+    finally:
+        write_run_manifest(pop_stage_records(), extra={'script': script, 'argv': sys.argv[1:], **extra},
+                           name=script)
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Column statistics for every feature of a 2D array at once. Moments come
+# from one power-sum accumulation per chunk, taken about the chunk mean so
+# that Voltage (around 240 V) keeps its precision, and chunk results combine
+# with Pébay's pairwise formulas. A state is a dict of per-feature arrays
+# (n, mean, m2, m3, m4), so states from chunks or worker processes merge
+# exactly in any order. Quantiles, min and max come from one partial sort.
+
+def empty_moments(n_features):
+    zeros = np.zeros(n_features)
+    return {'n': zeros.copy(), 'mean': zeros.copy(), 'm2': zeros.copy(), 'm3': zeros.copy(), 'm4': zeros.copy()}
+
+def chunk_moments(X):
+    X = np.asarray(X, dtype=np.float64)
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=0).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, np.nansum(X, axis=0) / n, 0.0)
+    d = np.where(valid, X - mean, 0.0)
+    d2 = d * d
+    return {'n': n, 'mean': mean, 'm2': d2.sum(axis=0), 'm3': (d2 * d).sum(axis=0), 'm4': (d2 * d2).sum(axis=0)}
+
+def merge_moments(a, b):
+    n_a, n_b = a['n'], b['n']
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1.0)
+    delta = b['mean'] - a['mean']
+
+    m2 = a['m2'] + b['m2'] + delta ** 2 * n_a * n_b / safe_n
+    m3 = (a['m3'] + b['m3']
+          + delta ** 3 * n_a * n_b * (n_a - n_b) / safe_n ** 2
+          + 3 * delta * (n_a * b['m2'] - n_b * a['m2']) / safe_n)
+    m4 = (a['m4'] + b['m4']
+          + delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / safe_n ** 3
+          + 6 * delta ** 2 * (n_a ** 2 * b['m2'] + n_b ** 2 * a['m2']) / safe_n ** 2
+          + 4 * delta * (n_a * b['m3'] - n_b * a['m3']) / safe_n)
+    return {'n': n, 'mean': a['mean'] + delta * n_b / safe_n, 'm2': m2, 'm3': m3, 'm4': m4}
+
+def finalize_moments(state):
+    n, m2 = state['n'], state['m2']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = np.where(n > 1, m2 / (n - 1), np.nan)
+        spread = np.where(m2 > 0, m2, np.nan)
+        result = {
+            'count': n.astype(np.int64),
+            'mean': np.where(n > 0, state['mean'], np.nan),
+            'variance': variance,
+            'std': np.sqrt(variance),
+            'sem': np.sqrt(variance / n),
+            # Biased estimators, as scipy.stats.skew and kurtosis (excess) default to
+            'skewness': np.sqrt(n) * state['m3'] / spread ** 1.5,
+            'kurtosis': n * state['m4'] / spread ** 2 - 3
+        }
+    return result
+
+def partial_quantiles(X, q):
+    # Linear interpolation between order statistics, as pandas' quantile. The
+    # order statistics each column needs (including min and max) are gathered
+    # into one kth list, so the array is partitioned once rather than sorted.
+    X = np.asarray(X)
+    q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+    n = (~np.isnan(X)).sum(axis=0)
+    positions = q[:, np.newaxis] * np.maximum(n - 1, 0)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(n - 1, 0))
+    kth = np.unique(np.concatenate([lower.ravel(), upper.ravel(), [0], np.maximum(n - 1, 0)]))
+
+    # NaNs are partitioned to the end of each column, after its n values
+    part = np.partition(X, kth, axis=0)
+    cols = np.arange(X.shape[1])
+    lo_values = part[lower, cols].astype(np.float64)
+    hi_values = part[upper, cols].astype(np.float64)
+    quantiles = lo_values + (positions - lower) * (hi_values - lo_values)
+
+    empty = n == 0
+    quantiles[:, empty] = np.nan
+    minimum = np.where(empty, np.nan, part[0, cols])
+    maximum = np.where(empty, np.nan, part[np.maximum(n - 1, 0), cols])
+    return quantiles, minimum, maximum
@@ -1,8 +1,26 @@
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib_venn import venn3
 from utils import save_report, save_csv, print_section_header
+from instrumentation import run_manifest
+from consensus import (align_on_key, build_bitsets, popcount, unpack, detector_counts,
+                       pairwise_overlaps, venn_regions, count_planes, at_least_k, methods_per_row)
+
+# Detector name -> flag column in its output CSV
+DETECTOR_FLAGS = {
+    'zscore': 'outlier_any',
+    'iforest': 'outlier_iforest',
+    'lof': 'outlier_lof'
+}
+
+# Detector name -> (score column, sign that makes larger = more anomalous)
+DETECTOR_SCORES = {
+    'zscore': ('max_abs_zscore', 1.0),
+    'iforest': ('anomaly_score', -1.0),
+    'lof': ('lof_score', 1.0)
+}
 
 def load_outlier_results():
     print_section_header("LOADING OUTLIER DETECTION RESULTS")
@@ -17,126 +35,110 @@ def load_outlier_results():
     
     return zscore_df, iforest_df, lof_df
 
-def create_comparison_dataframe(zscore_df, iforest_df, lof_df):
-    comparison_df = pd.DataFrame({
-        'outlier_zscore': zscore_df['outlier_any'],
-        'outlier_iforest': iforest_df['outlier_iforest'],
-        'outlier_lof': lof_df['outlier_lof']
-    })
-    
-    comparison_df['num_methods'] = (
-        comparison_df['outlier_zscore'].astype(int) +
-        comparison_df['outlier_iforest'].astype(int) +
-        comparison_df['outlier_lof'].astype(int)
-    )
-    
-    comparison_df['outlier_consensus'] = comparison_df['num_methods'] >= 2
-    comparison_df['outlier_all'] = comparison_df['num_methods'] == 3
-    
-    return comparison_df
+def align_detector_outputs(frames):
+    if all('DateTime' in df.columns for df in frames.values()):
+        keys, positions = align_on_key(list(frames.values()), key='DateTime')
+        dropped = {name: len(df) - len(keys) for name, df in frames.items()}
+        print(f"✓ Aligned on DateTime: {len(keys):,} shared rows")
+        for name, n_dropped in dropped.items():
+            if n_dropped:
+                print(f"  ⚠ {name}: {n_dropped:,} rows without a match in every detector were dropped")
+        return keys, dict(zip(frames, positions))
+    
+    lengths = {len(df) for df in frames.values()}
+    if len(lengths) != 1:
+        raise ValueError("Detector outputs have no DateTime column and different lengths; re-run the detectors")
+    print("⚠ Detector outputs have no DateTime column; aligning by row position. Re-run the detectors to add the key.")
+    n_rows = lengths.pop()
+    return None, {name: np.arange(n_rows) for name in frames}
+
+def build_consensus(zscore_df, iforest_df, lof_df):
+    frames = {'zscore': zscore_df, 'iforest': iforest_df, 'lof': lof_df}
+    keys, positions = align_detector_outputs(frames)
+    
+    flags = {name: frames[name][DETECTOR_FLAGS[name]].to_numpy(dtype=bool)[positions[name]] for name in frames}
+    bitsets = build_bitsets(flags)
+    planes = count_planes(bitsets)
+    
+    n_detectors = len(bitsets['names'])
+    consensus = {
+        'keys': keys,
+        'positions': positions,
+        'bitsets': bitsets,
+        'planes': planes,
+        'consensus_bits': at_least_k(bitsets, planes, 2),
+        'all_bits': at_least_k(bitsets, planes, n_detectors),
+        'any_bits': at_least_k(bitsets, planes, 1)
+    }
+    return consensus
 
-def analyze_overlap(comparison_df):
+def create_comparison_dataframe(consensus):
+    bitsets = consensus['bitsets']
+    columns = {}
+    if consensus['keys'] is not None:
+        columns['DateTime'] = consensus['keys']
+    for i, name in enumerate(bitsets['names']):
+        columns[f'outlier_{name}'] = unpack(bitsets, bitsets['bits'][i])
+    columns['num_methods'] = methods_per_row(bitsets, consensus['planes'])
+    columns['outlier_consensus'] = unpack(bitsets, consensus['consensus_bits'])
+    columns['outlier_all'] = unpack(bitsets, consensus['all_bits'])
+    
+    return pd.DataFrame(columns)
+
+def analyze_overlap(consensus):
     print_section_header("OUTLIER METHOD OVERLAP ANALYSIS")
     
-    total_rows = len(comparison_df)
-    
-    only_zscore = (comparison_df['outlier_zscore'] & 
-                   ~comparison_df['outlier_iforest'] & 
-                   ~comparison_df['outlier_lof']).sum()
+    bitsets = consensus['bitsets']
+    total_rows = bitsets['n_rows']
+    regions = venn_regions(bitsets)
     
-    only_iforest = (~comparison_df['outlier_zscore'] & 
-                    comparison_df['outlier_iforest'] & 
-                    ~comparison_df['outlier_lof']).sum()
-    
-    only_lof = (~comparison_df['outlier_zscore'] & 
-                ~comparison_df['outlier_iforest'] & 
-                comparison_df['outlier_lof']).sum()
-    
-    zscore_iforest = (comparison_df['outlier_zscore'] & 
-                      comparison_df['outlier_iforest'] & 
-                      ~comparison_df['outlier_lof']).sum()
-    
-    zscore_lof = (comparison_df['outlier_zscore'] & 
-                  ~comparison_df['outlier_iforest'] & 
-                  comparison_df['outlier_lof']).sum()
-    
-    iforest_lof = (~comparison_df['outlier_zscore'] & 
-                   comparison_df['outlier_iforest'] & 
-                   comparison_df['outlier_lof']).sum()
-    
-    all_three = comparison_df['outlier_all'].sum()
+    # Membership order follows DETECTOR_FLAGS: (zscore, iforest, lof)
+    results = {
+        'only_zscore': regions[(True, False, False)],
+        'only_iforest': regions[(False, True, False)],
+        'only_lof': regions[(False, False, True)],
+        'zscore_iforest': regions[(True, True, False)],
+        'zscore_lof': regions[(True, False, True)],
+        'iforest_lof': regions[(False, True, True)],
+        'all_three': regions[(True, True, True)],
+        'consensus': popcount(consensus['consensus_bits']),
+        'any': popcount(consensus['any_bits']),
+        'per_method': detector_counts(bitsets),
+        'pairwise': pairwise_overlaps(bitsets)
+    }
     
     print("Outlier Detection Overlap:")
     print("-" * 60)
-    print(f"Only Z-Score: {only_zscore:,} ({only_zscore/total_rows*100:.2f}%)")
-    print(f"Only Isolation Forest: {only_iforest:,} ({only_iforest/total_rows*100:.2f}%)")
-    print(f"Only LOF: {only_lof:,} ({only_lof/total_rows*100:.2f}%)")
-    print(f"Z-Score + Isolation Forest: {zscore_iforest:,} ({zscore_iforest/total_rows*100:.2f}%)")
-    print(f"Z-Score + LOF: {zscore_lof:,} ({zscore_lof/total_rows*100:.2f}%)")
-    print(f"Isolation Forest + LOF: {iforest_lof:,} ({iforest_lof/total_rows*100:.2f}%)")
-    print(f"All 3 Methods: {all_three:,} ({all_three/total_rows*100:.2f}%)")
+    print(f"Only Z-Score: {results['only_zscore']:,} ({results['only_zscore']/total_rows*100:.2f}%)")
+    print(f"Only Isolation Forest: {results['only_iforest']:,} ({results['only_iforest']/total_rows*100:.2f}%)")
+    print(f"Only LOF: {results['only_lof']:,} ({results['only_lof']/total_rows*100:.2f}%)")
+    print(f"Z-Score + Isolation Forest: {results['zscore_iforest']:,} ({results['zscore_iforest']/total_rows*100:.2f}%)")
+    print(f"Z-Score + LOF: {results['zscore_lof']:,} ({results['zscore_lof']/total_rows*100:.2f}%)")
+    print(f"Isolation Forest + LOF: {results['iforest_lof']:,} ({results['iforest_lof']/total_rows*100:.2f}%)")
+    print(f"All 3 Methods: {results['all_three']:,} ({results['all_three']/total_rows*100:.2f}%)")
     print("-" * 60)
     
-    consensus = comparison_df['outlier_consensus'].sum()
-    print(f"\nConsensus outliers (2+ methods): {consensus:,} ({consensus/total_rows*100:.2f}%)")
-    
-    results = {
-        'only_zscore': only_zscore,
-        'only_iforest': only_iforest,
-        'only_lof': only_lof,
-        'zscore_iforest': zscore_iforest,
-        'zscore_lof': zscore_lof,
-        'iforest_lof': iforest_lof,
-        'all_three': all_three,
-        'consensus': consensus
-    }
+    print(f"\nConsensus outliers (2+ methods): {results['consensus']:,} ({results['consensus']/total_rows*100:.2f}%)")
+    print("\nPairwise overlaps (rows flagged by both):")
+    print(results['pairwise'].to_string())
     
     return results
 
-def create_venn_diagram(comparison_df):
-    n_zscore = comparison_df['outlier_zscore'].sum()
-    n_iforest = comparison_df['outlier_iforest'].sum()
-    n_lof = comparison_df['outlier_lof'].sum()
-    
-    only_zscore = (comparison_df['outlier_zscore'] & 
-                   ~comparison_df['outlier_iforest'] & 
-                   ~comparison_df['outlier_lof']).sum()
-    
-    only_iforest = (~comparison_df['outlier_zscore'] & 
-                    comparison_df['outlier_iforest'] & 
-                    ~comparison_df['outlier_lof']).sum()
-    
-    only_lof = (~comparison_df['outlier_zscore'] & 
-                ~comparison_df['outlier_iforest'] & 
-                comparison_df['outlier_lof']).sum()
-    
-    zscore_iforest = (comparison_df['outlier_zscore'] & 
-                      comparison_df['outlier_iforest'] & 
-                      ~comparison_df['outlier_lof']).sum()
-    
-    zscore_lof = (comparison_df['outlier_zscore'] & 
-                  ~comparison_df['outlier_iforest'] & 
-                  comparison_df['outlier_lof']).sum()
-    
-    iforest_lof = (~comparison_df['outlier_zscore'] & 
-                   comparison_df['outlier_iforest'] & 
-                   comparison_df['outlier_lof']).sum()
-    
-    all_three = comparison_df['outlier_all'].sum()
-    
+def create_venn_diagram(overlap_results):
     plt.figure(figsize=(12, 8))
     
     venn = venn3(
-        subsets=(only_zscore, only_iforest, zscore_iforest, 
-                 only_lof, zscore_lof, iforest_lof, all_three),
+        subsets=(overlap_results['only_zscore'], overlap_results['only_iforest'], overlap_results['zscore_iforest'],
+                 overlap_results['only_lof'], overlap_results['zscore_lof'], overlap_results['iforest_lof'],
+                 overlap_results['all_three']),
         set_labels=('Z-Score', 'Isolation Forest', 'LOF')
     )
     
     plt.title('Outlier Detection Method Overlap', fontsize=16, fontweight='bold', pad=20)
     
-    plt.text(0.5, -0.15, f'Total unique outliers: {comparison_df["num_methods"].gt(0).sum():,}', 
+    plt.text(0.5, -0.15, f'Total unique outliers: {overlap_results["any"]:,}', 
              ha='center', transform=plt.gca().transAxes, fontsize=12)
-    plt.text(0.5, -0.20, f'Consensus (2+ methods): {comparison_df["outlier_consensus"].sum():,}', 
+    plt.text(0.5, -0.20, f'Consensus (2+ methods): {overlap_results["consensus"]:,}', 
              ha='center', transform=plt.gca().transAxes, fontsize=12)
     
     plt.tight_layout()
@@ -144,16 +146,89 @@ def create_venn_diagram(comparison_df):
     print("\n✓ Saved: outlier_method_venn.png")
     plt.close()
 
-def create_comparison_bar_chart(comparison_df):
+def percentile_ranks(values):
+    # One argsort per detector; searchsorted on the sorted copy gives tied
+    # values the same percentile. Memory stays O(rows), never pairwise.
+    # Non-finite scores are ranked among nothing: they get NaN, and the
+    # fusion leaves them out instead of sorting them to the top.
+    finite = np.isfinite(values)
+    scores = values[finite]
+    order = np.argsort(scores, kind='stable')
+    ranks = np.searchsorted(scores[order], scores, side='right')
+    percentiles = np.full(len(values), np.nan, dtype=np.float32)
+    percentiles[finite] = ranks / max(len(scores), 1)
+    return percentiles
+
+def fuse_scores(frames, positions, method='mean'):
+    print_section_header("SCORE-LEVEL RANK FUSION")
+    
+    percentiles = {}
+    non_finite = {}
+    for name, df in frames.items():
+        column, sign = DETECTOR_SCORES[name]
+        if column not in df.columns:
+            print(f"  ⚠ {name}: no '{column}' column, left out of the fusion (re-run the detector)")
+            continue
+        values = sign * df[column].to_numpy(dtype=np.float64)[positions[name]]
+        percentiles[name] = percentile_ranks(values)
+        non_finite[name] = int(np.isnan(percentiles[name]).sum())
+        print(f"  ✓ {name}: ranked {len(values) - non_finite[name]:,} scores ({column})")
+        if non_finite[name]:
+            print(f"  ⚠ {name}: {non_finite[name]:,} non-finite scores left out of the fusion")
+    
+    if not percentiles:
+        raise ValueError("No detector output has a continuous score column to fuse")
+    
+    # Mean or max over the detectors with a finite score for each row; a row
+    # with none gets 0
+    stacked = np.vstack(list(percentiles.values()))
+    valid = ~np.isnan(stacked)
+    filled = np.where(valid, stacked, 0.0)
+    if method == 'max':
+        fused = filled.max(axis=0)
+    else:
+        fused = filled.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    print(f"  ✓ Fused {len(percentiles)} detectors ({method} of percentiles)")
+    return percentiles, fused, non_finite
+
+def top_k_rows(fused, k):
+    # argpartition finds the K largest in linear time; only those K are sorted.
+    k = min(k, len(fused))
+    top = np.argpartition(-fused, k - 1)[:k]
+    return top[np.argsort(-fused[top], kind='stable')]
+
+def create_fusion_outputs(frames, consensus, percentiles, fused, k):
+    keys = consensus['keys']
+    positions = consensus['positions']
+    
+    fusion_df = pd.DataFrame({'DateTime': keys} if keys is not None else {})
+    for name, pct in percentiles.items():
+        fusion_df[f'{name}_percentile'] = pct
+    fusion_df['fused_score'] = fused
+    
+    top = top_k_rows(fused, k)
+    top_df = pd.DataFrame({'Rank': np.arange(1, len(top) + 1)})
+    if keys is not None:
+        top_df['DateTime'] = keys[top]
+    top_df['fused_score'] = fused[top]
+    for name, pct in percentiles.items():
+        column, _ = DETECTOR_SCORES[name]
+        top_df[column] = frames[name][column].to_numpy()[positions[name][top]]
+        top_df[f'{name}_percentile'] = pct[top]
+    top_df['num_methods'] = methods_per_row(consensus['bitsets'], consensus['planes'])[top]
+    
+    return fusion_df, top_df
+
+def create_comparison_bar_chart(overlap_results, total_rows):
     methods = ['Z-Score', 'Isolation Forest', 'LOF', 'Consensus (2+)', 'All 3']
     counts = [
-        comparison_df['outlier_zscore'].sum(),
-        comparison_df['outlier_iforest'].sum(),
-        comparison_df['outlier_lof'].sum(),
-        comparison_df['outlier_consensus'].sum(),
-        comparison_df['outlier_all'].sum()
+        overlap_results['per_method']['zscore'],
+        overlap_results['per_method']['iforest'],
+        overlap_results['per_method']['lof'],
+        overlap_results['consensus'],
+        overlap_results['all_three']
     ]
-    percentages = [count / len(comparison_df) * 100 for count in counts]
+    percentages = [count / total_rows * 100 for count in counts]
     
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
     
@@ -182,8 +257,7 @@ def create_comparison_bar_chart(comparison_df):
     print("✓ Saved: outlier_method_comparison.png")
     plt.close()
 
-def generate_comparison_report(comparison_df, overlap_results):
-    total = len(comparison_df)
+def generate_comparison_report(overlap_results, total):
     
     report = []
     report.append("Outlier Detection Method Comparison")
@@ -197,9 +271,10 @@ def generate_comparison_report(comparison_df, overlap_results):
     report.append("")
     report.append("Individual Method Results:")
     report.append("")
-    report.append(f"Z-Score: {comparison_df['outlier_zscore'].sum():,} outliers ({comparison_df['outlier_zscore'].sum()/total*100:.2f}%)")
-    report.append(f"Isolation Forest: {comparison_df['outlier_iforest'].sum():,} outliers ({comparison_df['outlier_iforest'].sum()/total*100:.2f}%)")
-    report.append(f"LOF: {comparison_df['outlier_lof'].sum():,} outliers ({comparison_df['outlier_lof'].sum()/total*100:.2f}%)")
+    per_method = overlap_results['per_method']
+    report.append(f"Z-Score: {per_method['zscore']:,} outliers ({per_method['zscore']/total*100:.2f}%)")
+    report.append(f"Isolation Forest: {per_method['iforest']:,} outliers ({per_method['iforest']/total*100:.2f}%)")
+    report.append(f"LOF: {per_method['lof']:,} outliers ({per_method['lof']/total*100:.2f}%)")
     report.append("")
     report.append("Overlap Analysis:")
     report.append("")
@@ -213,6 +288,9 @@ def generate_comparison_report(comparison_df, overlap_results):
     report.append("")
     report.append(f"Consensus Outliers (2+ methods agree): {overlap_results['consensus']:,} ({overlap_results['consensus']/total*100:.2f}%)")
     report.append("")
+    report.append("Detector outputs are joined on DateTime before comparison, so the counts do not")
+    report.append("depend on the row order of each detector's CSV.")
+    report.append("")
     report.append("Key Findings:")
     report.append(f"- {overlap_results['all_three']:,} outliers detected by all 3 methods (high confidence)")
     report.append(f"- {overlap_results['consensus']:,} outliers detected by at least 2 methods (moderate-high confidence)")
@@ -220,33 +298,76 @@ def generate_comparison_report(comparison_df, overlap_results):
     report.append("- LOF detected fewest outliers (density-based, more conservative)")
     report.append("- Z-Score middle ground (univariate statistical)")
     report.append("")
+    if 'fusion' in overlap_results:
+        fusion = overlap_results['fusion']
+        report.append("Score-Level Fusion:")
+        report.append("Each detector's continuous score is converted to a percentile rank and the")
+        report.append(f"percentiles are combined ({fusion['method']}) over: {', '.join(fusion['detectors'])}.")
+        for name, count in fusion['non_finite'].items():
+            report.append(f"  {name}: {count:,} non-finite scores left out of the fusion")
+        report.append(f"Of the top {fusion['top_k']:,} fused rows, {fusion['top_k_consensus']:,} are also 2+ method consensus outliers.")
+        report.append("")
     report.append("Recommendation:")
     report.append("Use consensus outliers (2+ methods) for high-confidence anomaly detection.")
     report.append("This balances sensitivity with specificity.")
     
     return "\n".join(report)
 
-def main():
+def main(zscore_df=None, iforest_df=None, lof_df=None, fusion='mean', top_k=1000):
     print_section_header("OUTLIER DETECTION METHOD COMPARISON")
     
-    zscore_df, iforest_df, lof_df = load_outlier_results()
+    if zscore_df is None or iforest_df is None or lof_df is None:
+        zscore_df, iforest_df, lof_df = load_outlier_results()
     
-    comparison_df = create_comparison_dataframe(zscore_df, iforest_df, lof_df)
+    consensus = build_consensus(zscore_df, iforest_df, lof_df)
+    total_rows = consensus['bitsets']['n_rows']
     
-    overlap_results = analyze_overlap(comparison_df)
+    overlap_results = analyze_overlap(consensus)
     
-    create_venn_diagram(comparison_df)
-    create_comparison_bar_chart(comparison_df)
+    create_venn_diagram(overlap_results)
+    create_comparison_bar_chart(overlap_results, total_rows)
     
+    comparison_df = create_comparison_dataframe(consensus)
     save_csv(comparison_df, 'outlier_method_comparison.csv')
     
-    report = generate_comparison_report(comparison_df, overlap_results)
+    frames = {'zscore': zscore_df, 'iforest': iforest_df, 'lof': lof_df}
+    percentiles, fused, non_finite = fuse_scores(frames, consensus['positions'], method=fusion)
+    fusion_df, top_df = create_fusion_outputs(frames, consensus, percentiles, fused, top_k)
+    save_csv(fusion_df, 'outlier_fused_scores.csv')
+    save_csv(top_df, 'outlier_fused_top_k.csv')
+    overlap_results['fusion'] = {
+        'method': fusion,
+        'detectors': list(percentiles),
+        'non_finite': non_finite,
+        'top_k': len(top_df),
+        'top_k_consensus': int((top_df['num_methods'] >= 2).sum())
+    }
+    
+    report = generate_comparison_report(overlap_results, total_rows)
     save_report(report, 'outlier_method_comparison_report.txt')
     
     print_section_header("METHOD COMPARISON COMPLETE")
-    print(f"✓ Total unique outliers: {comparison_df['num_methods'].gt(0).sum():,}")
+    print(f"✓ Total unique outliers: {overlap_results['any']:,}")
     print(f"✓ Consensus outliers (2+ methods): {overlap_results['consensus']:,}")
     print(f"✓ High-confidence outliers (all 3): {overlap_results['all_three']:,}")
+    
+    return comparison_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Compare and fuse the outlier detectors.')
+    parser.add_argument(
+        '--fusion',
+        choices=['mean', 'max'],
+        default='mean',
+        help='How to combine per-detector percentile ranks (default: mean)'
+    )
+    parser.add_argument(
+        '-k', '--top-k',
+        type=int,
+        default=1000,
+        help='Rows to keep in outlier_fused_top_k.csv (default: 1000)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('outlier_comparison'):
+        main(fusion=args.fusion, top_k=args.top_k)
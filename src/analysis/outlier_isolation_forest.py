@@ -1,67 +1,92 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from sklearn.ensemble import IsolationForest
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from utils import load_final_dataset, save_report, save_csv, print_section_header
+from feature_matrix import standardized_features, scaler_from_params
+from instrumentation import instrument_stage, run_manifest
+from detector_store import save_detector
 
-def detect_outliers_iforest(df, features, contamination, random_state=42):
-    X = df[features].values
-    
+def fit_iforest(X, random_state=42):
+    # Contamination only sets offset_ (a percentile of score_samples), never
+    # the trees, so one fit serves every contamination value.
     iso_forest = IsolationForest(
-        contamination=contamination,
+        contamination='auto',
         random_state=random_state,
         n_estimators=100,
         max_samples='auto',
         verbose=0
     )
     
-    print(f"  Training Isolation Forest (contamination={contamination})...")
+    print("  Training Isolation Forest...")
     iso_forest.fit(X)
-    
-    predictions = iso_forest.predict(X)
     scores = iso_forest.score_samples(X)
     
-    n_outliers = (predictions == -1).sum()
-    pct_outliers = (n_outliers / len(df)) * 100
-    
-    print(f"  Detected: {n_outliers:,} outliers ({pct_outliers:.2f}%)")
-    
-    return predictions, scores
+    return iso_forest, scores
+
+def contamination_threshold(scores, contamination):
+    # Same rule IsolationForest.fit uses for a numeric contamination
+    return np.percentile(scores, 100.0 * contamination)
+
+def sweep_contamination(scores, contaminations):
+    # After one sort, the outlier/inlier split for any threshold is a binary
+    # search and both score means come from the cumulative sum.
+    sorted_scores = np.sort(scores)
+    cumulative = np.concatenate([[0.0], np.cumsum(sorted_scores)])
+    n = len(sorted_scores)
+    
+    thresholds = np.percentile(scores, 100.0 * np.asarray(contaminations, dtype=np.float64))
+    n_outliers = np.searchsorted(sorted_scores, thresholds, side='left')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        outlier_mean = cumulative[n_outliers] / n_outliers
+        inlier_mean = (cumulative[-1] - cumulative[n_outliers]) / (n - n_outliers)
+    
+    return pd.DataFrame({
+        'Contamination': contaminations,
+        'Threshold': thresholds,
+        'Outliers': n_outliers,
+        'Percentage': n_outliers / n * 100,
+        'Outlier_Score_Mean': outlier_mean,
+        'Inlier_Score_Mean': inlier_mean,
+        'Score_Separation': inlier_mean - outlier_mean
+    })
 
-def experiment_contamination(df, features, contaminations=[0.05, 0.10, 0.15]):
+@instrument_stage()
+def experiment_contamination(X, contaminations=[0.05, 0.10, 0.15]):
     print_section_header("ISOLATION FOREST CONTAMINATION EXPERIMENTATION")
     
+    model, scores = fit_iforest(X)
+    sweep_df = sweep_contamination(scores, contaminations)
     results = {}
     
-    for cont in contaminations:
+    for _, row in sweep_df.iterrows():
+        cont = row['Contamination']
         print(f"\nContamination = {cont} ({cont*100}% expected outliers):")
         print("-" * 50)
-        
-        predictions, scores = detect_outliers_iforest(df, features, cont)
-        
-        n_outliers = (predictions == -1).sum()
-        pct_outliers = (n_outliers / len(df)) * 100
-        
-        outlier_scores = scores[predictions == -1]
-        inlier_scores = scores[predictions == 1]
-        
+        print(f"  Detected: {int(row['Outliers']):,} outliers ({row['Percentage']:.2f}%)")
         print(f"  Anomaly score range: [{scores.min():.4f}, {scores.max():.4f}]")
-        print(f"  Outlier scores (mean): {outlier_scores.mean():.4f}")
-        print(f"  Inlier scores (mean): {inlier_scores.mean():.4f}")
-        print(f"  Score separation: {inlier_scores.mean() - outlier_scores.mean():.4f}")
+        print(f"  Outlier scores (mean): {row['Outlier_Score_Mean']:.4f}")
+        print(f"  Inlier scores (mean): {row['Inlier_Score_Mean']:.4f}")
+        print(f"  Score separation: {row['Score_Separation']:.4f}")
         
         results[cont] = {
             'contamination': cont,
-            'predictions': predictions,
+            'threshold': row['Threshold'],
             'scores': scores,
-            'n_outliers': n_outliers,
-            'percentage': pct_outliers,
-            'outlier_score_mean': outlier_scores.mean(),
-            'inlier_score_mean': inlier_scores.mean(),
-            'score_separation': inlier_scores.mean() - outlier_scores.mean()
+            'n_outliers': int(row['Outliers']),
+            'percentage': row['Percentage'],
+            'outlier_score_mean': row['Outlier_Score_Mean'],
+            'inlier_score_mean': row['Inlier_Score_Mean'],
+            'score_separation': row['Score_Separation']
         }
     
-    return results
+    return results, model
 
 def visualize_contamination_comparison(results):
     contaminations = list(results.keys())
@@ -197,25 +222,191 @@ def generate_report(results, selected_contamination, features):
     
     return "\n".join(report)
 
-def main():
+_worker_model = None
+
+def _init_iforest_worker(model, n_jobs=1):
+    # Pool workers score single-threaded; the pool is the parallelism, and
+    # the n_jobs=-1 the model was fitted with would oversubscribe the cores
+    global _worker_model
+    _worker_model = model.set_params(n_jobs=n_jobs)
+
+def _score_batch(task):
+    x_path, start, stop = task
+    X = np.load(x_path, mmap_mode='r')
+    return _worker_model.score_samples(np.asarray(X[start:stop]))
+
+@instrument_stage()
+def fit_iforest_subsample(X, contamination, train_size=200_000, random_state=42):
+    print_section_header("PARALLEL ISOLATION FOREST TRAINING")
+    
+    rng = np.random.default_rng(random_state)
+    if len(X) > train_size:
+        train_rows = np.sort(rng.choice(len(X), size=train_size, replace=False))
+        X_train = np.asarray(X[train_rows])
+    else:
+        X_train = np.asarray(X)
+    
+    model = IsolationForest(
+        contamination='auto',
+        random_state=random_state,
+        n_estimators=100,
+        max_samples='auto',
+        n_jobs=-1,
+        verbose=0
+    )
+    print(f"  Training on {len(X_train):,} of {len(X):,} rows (trees built in parallel)...")
+    model.fit(X_train)
+    
+    # The threshold comes from the training subsample's score distribution,
+    # so no extra pass over the full data is needed to place it.
+    model.offset_ = contamination_threshold(model.score_samples(X_train), contamination)
+    print(f"  Threshold (contamination={contamination}): {model.offset_:.4f}")
+    return model, len(X_train)
+
+@instrument_stage()
+def score_iforest_batched(X, model, batch_size=65_536, workers=None, x_path=None):
+    print_section_header("BATCHED ISOLATION FOREST SCORING")
+    
+    n_rows = len(X)
+    bounds = [(start, min(start + batch_size, n_rows)) for start in range(0, n_rows, batch_size)]
+    print(f"  Scoring {n_rows:,} rows in {len(bounds)} float32 batches of up to {batch_size:,}")
+    
+    start_time = time.perf_counter()
+    tmp_dir = tempfile.mkdtemp(prefix='iforest_')
+    try:
+        # The trees compare float32 thresholds, so float32 input is scored as-is;
+        # workers open the shared standardized matrix directly when there is one
+        if x_path is None:
+            x_path = os.path.join(tmp_dir, 'X.npy')
+            np.save(x_path, np.asarray(X, dtype=np.float32))
+        
+        tasks = [(x_path, start, stop) for start, stop in bounds]
+        scores = np.empty(n_rows, dtype=np.float64)
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_iforest_worker,
+                                     initargs=(model,)) as executor:
+                for (start, stop), batch_scores in zip(bounds, executor.map(_score_batch, tasks)):
+                    scores[start:stop] = batch_scores
+        else:
+            _init_iforest_worker(model, n_jobs=model.n_jobs)
+            for (start, stop), task in zip(bounds, tasks):
+                scores[start:stop] = _score_batch(task)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    elapsed = time.perf_counter() - start_time
+    
+    # One pass gives both: labels are just the scores against offset_
+    predictions = np.where(scores < model.offset_, -1, 1)
+    rows_per_s = n_rows / elapsed if elapsed > 0 else float('inf')
+    print(f"  ✓ Scored {n_rows:,} rows in {elapsed:.2f}s ({rows_per_s:,.0f} rows/s, workers={workers or 1})")
+    
+    return predictions, scores, rows_per_s
+
+def generate_fast_report(n_rows, train_rows, contamination, threshold, n_outliers, rows_per_s, workers, batch_size,
+                         projected_rows=None):
+    report = []
+    report.append("Isolation Forest Outlier Detection (High-Throughput Mode)")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Method Overview:")
+    report.append("100 trees are built in parallel on a seeded random training subsample. The decision")
+    report.append("threshold is the contamination percentile of the training scores. All rows are then")
+    report.append("scored once, in float32 batches, and labels are derived from the same scores.")
+    report.append("")
+    report.append(f"Rows scored: {n_rows:,}")
+    report.append(f"Training rows: {train_rows:,} ({train_rows / n_rows:.1%})")
+    report.append(f"Contamination: {contamination} (threshold {threshold:.4f})")
+    report.append(f"Outliers found: {n_outliers:,} ({n_outliers / n_rows * 100:.2f}% of data)")
+    report.append("")
+    report.append("Throughput:")
+    report.append(f"  Scoring: {rows_per_s:,.0f} rows/s with {workers or 1} worker(s), batches of {batch_size:,} rows")
+    report.append(f"  Scoring time for {n_rows:,} rows: {n_rows / rows_per_s:.1f}s")
+    if projected_rows:
+        report.append(f"  Projected time for {projected_rows:,} rows: {projected_rows / rows_per_s:.1f}s")
+    
+    return "\n".join(report)
+
+def main_fast(df=None, matrix=None, contamination=0.05, train_size=200_000, batch_size=65_536, workers=None,
+              projected_rows=None):
+    print_section_header("ISOLATION FOREST OUTLIER DETECTION (HIGH-THROUGHPUT)")
+    
+    X, params = standardized_features(df, matrix)
+    features = params['features']
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'], mmap=True)
+    
+    model, train_rows = fit_iforest_subsample(X, contamination, train_size=train_size)
+    predictions, scores, rows_per_s = score_iforest_batched(X, model, batch_size=batch_size, workers=workers,
+                                                            x_path=params['path'])
+    
+    output_df = pd.DataFrame({
+        'outlier_iforest': predictions == -1,
+        'anomaly_score': scores
+    })
+    if 'DateTime' in df.columns:
+        output_df.insert(0, 'DateTime', df['DateTime'].to_numpy())
+    save_csv(output_df, 'outliers_iforest_flags.csv')
+    save_detector({
+        'kind': 'iforest',
+        'features': features,
+        'scaler': scaler_from_params(params),
+        'model': model,
+        'threshold': model.offset_
+    }, 'iforest')
+    
+    n_outliers = int(output_df['outlier_iforest'].sum())
+    report = generate_fast_report(len(X), train_rows, contamination, model.offset_, n_outliers,
+                                  rows_per_s, workers, batch_size, projected_rows)
+    save_report(report, 'outlier_iforest_fast_report.txt')
+    
+    print_section_header("ISOLATION FOREST ANALYSIS COMPLETE")
+    print(f"✓ Contamination: {contamination}")
+    print(f"✓ Outliers detected: {n_outliers:,}")
+    print(f"✓ Percentage: {n_outliers / len(X) * 100:.2f}%")
+    print(f"✓ Throughput: {rows_per_s:,.0f} rows/s")
+    
+    return output_df
+
+def main(df=None, matrix=None, method='sweep', **kwargs):
+    if method == 'fast':
+        return main_fast(df, matrix, **kwargs)
+    
     print_section_header("ISOLATION FOREST OUTLIER DETECTION")
     
-    df = load_final_dataset()
-    features = get_numeric_features(df)
+    X, params = standardized_features(df, matrix)
+    features = params['features']
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'], mmap=True)
     
-    print(f"\nAnalyzing {len(features)} numeric features with Isolation Forest")
+    print(f"\nAnalyzing {len(features)} standardized numeric features with Isolation Forest")
     
-    results = experiment_contamination(df, features)
+    results, model = experiment_contamination(X)
     visualize_contamination_comparison(results)
     selected_contamination = select_optimal_contamination(results)
     
+    curve_df = sweep_contamination(results[selected_contamination]['scores'],
+                                   np.round(np.arange(0.01, 0.20 + 1e-9, 0.01), 2))
+    save_csv(curve_df, 'iforest_contamination_curve.csv')
+    
     selected_result = results[selected_contamination]
     output_df = pd.DataFrame({
-        'outlier_iforest': selected_result['predictions'] == -1,
+        'outlier_iforest': selected_result['scores'] < selected_result['threshold'],
         'anomaly_score': selected_result['scores']
     })
+    if 'DateTime' in df.columns:
+        output_df.insert(0, 'DateTime', df['DateTime'].to_numpy())
     save_csv(output_df, 'outliers_iforest_flags.csv')
     
+    # predict() flags score_samples(X) < offset_
+    model.offset_ = selected_result['threshold']
+    save_detector({
+        'kind': 'iforest',
+        'features': features,
+        'scaler': scaler_from_params(params),
+        'model': model,
+        'threshold': model.offset_
+    }, 'iforest')
+    
     report = generate_report(results, selected_contamination, features)
     save_report(report, 'outlier_iforest_report.txt')
     
@@ -223,6 +414,52 @@ def main():
     print(f"✓ Selected contamination: {selected_contamination}")
     print(f"✓ Outliers detected: {selected_result['n_outliers']:,}")
     print(f"✓ Percentage: {selected_result['percentage']:.2f}%")
+    
+    return output_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Flag outliers with Isolation Forest.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['sweep', 'fast'],
+        default='sweep',
+        help='sweep: contamination 0.05/0.10/0.15 on all rows; fast: subsample training and parallel batched scoring'
+    )
+    parser.add_argument(
+        '-c', '--contamination',
+        type=float,
+        default=0.05,
+        help='Contamination for the fast method (default: 0.05)'
+    )
+    parser.add_argument(
+        '-t', '--train-size',
+        type=int,
+        default=200_000,
+        help='Training subsample rows for the fast method (default: 200000)'
+    )
+    parser.add_argument(
+        '-b', '--batch-size',
+        type=int,
+        default=65_536,
+        help='Rows per scoring batch for the fast method (default: 65536)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Score batches in a process pool with N workers (default: single process)'
+    )
+    parser.add_argument(
+        '-p', '--projected-rows',
+        type=int,
+        default=None,
+        help='Also report the scoring time projected to N rows, e.g. 2075259 for the full history'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('outlier_isolation_forest'):
+        if args.method == 'fast':
+            main(method='fast', contamination=args.contamination, train_size=args.train_size,
+                 batch_size=args.batch_size, workers=args.workers, projected_rows=args.projected_rows)
+        else:
+            main()
@@ -1,42 +1,81 @@
+import argparse
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.neighbors import LocalOutlierFactor
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from scipy import stats
+from sklearn.neighbors import NearestNeighbors
+from utils import load_final_dataset, save_report, save_csv, print_section_header
+from feature_matrix import standardized_features, scaler_from_params
+from instrumentation import instrument_stage, run_manifest
+from detector_store import save_detector
 
-def detect_outliers_lof(df, features, n_neighbors):
-    X = df[features].values
+# LocalOutlierFactor(contamination='auto') flags negative_outlier_factor_ < -1.5
+LOF_OFFSET = -1.5
+
+def build_neighbor_graph(X, n_neighbors):
+    print(f"  Building {n_neighbors}-nearest-neighbour graph over {len(X):,} rows...")
+    nn = NearestNeighbors(n_neighbors=n_neighbors).fit(X)
+    # kneighbors() without X excludes each point from its own neighbour list,
+    # matching LocalOutlierFactor(novelty=False).
+    distances, indices = nn.kneighbors()
+    return {'nn': nn, 'distances': distances, 'indices': indices}
+
+def local_reachability_density(distances, indices):
+    k_distance = distances[:, -1]
+    reach_dist = np.maximum(distances, k_distance[indices])
+    lrd = 1.0 / (reach_dist.mean(axis=1) + 1e-10)
+    return k_distance, lrd
+
+def lof_from_graph(graph, n_neighbors):
+    # Neighbours come back sorted by distance, so the first k columns of the
+    # widest graph are the k-neighbour graph for any smaller k.
+    idx = graph['indices'][:, :n_neighbors]
+    _, lrd = local_reachability_density(graph['distances'][:, :n_neighbors], idx)
+    scores = -(lrd[idx] / lrd[:, np.newaxis]).mean(axis=1)
     
-    lof = LocalOutlierFactor(
-        n_neighbors=n_neighbors,
-        contamination='auto',
-        novelty=False
-    )
+    predictions = np.where(scores < LOF_OFFSET, -1, 1)
+    return predictions, scores
+
+def lof_reference_from_graph(graph, n_neighbors):
+    # The fitted index plus per-point k-distance and lrd is all that novelty
+    # scoring needs, so the sweep's graph doubles as the saved model.
+    k_distance, lrd = local_reachability_density(graph['distances'][:, :n_neighbors],
+                                                 graph['indices'][:, :n_neighbors])
+    return {'nn': graph['nn'], 'k_distance': k_distance, 'lrd': lrd, 'n_neighbors': n_neighbors}
+
+def detect_outliers_lof(X, n_neighbors, graph=None):
+    if graph is None:
+        graph = build_neighbor_graph(X, n_neighbors)
     
     print(f"  Computing LOF (n_neighbors={n_neighbors})...")
-    predictions = lof.fit_predict(X)
-    scores = lof.negative_outlier_factor_
+    predictions, scores = lof_from_graph(graph, n_neighbors)
     
     n_outliers = (predictions == -1).sum()
-    pct_outliers = (n_outliers / len(df)) * 100
+    pct_outliers = (n_outliers / len(X)) * 100
     
     print(f"  Detected: {n_outliers:,} outliers ({pct_outliers:.2f}%)")
     
     return predictions, scores
 
-def experiment_neighbors(df, features, n_neighbors_list=[10, 20, 50]):
+@instrument_stage()
+def experiment_neighbors(X, n_neighbors_list=[10, 20, 50]):
     print_section_header("LOF N_NEIGHBORS EXPERIMENTATION")
     
     results = {}
+    graph = build_neighbor_graph(X, max(n_neighbors_list))
     
     for n_neighbors in n_neighbors_list:
         print(f"\nn_neighbors = {n_neighbors}:")
         print("-" * 50)
         
-        predictions, scores = detect_outliers_lof(df, features, n_neighbors)
+        predictions, scores = detect_outliers_lof(X, n_neighbors, graph=graph)
         
         n_outliers = (predictions == -1).sum()
-        pct_outliers = (n_outliers / len(df)) * 100
+        pct_outliers = (n_outliers / len(X)) * 100
         
         outlier_scores = scores[predictions == -1]
         inlier_scores = scores[predictions == 1]
@@ -59,7 +98,7 @@ def experiment_neighbors(df, features, n_neighbors_list=[10, 20, 50]):
             'high_lof_count': (outlier_lof > 1.5).sum()
         }
     
-    return results
+    return results, graph
 
 def visualize_neighbors_comparison(results):
     n_neighbors_list = list(results.keys())
@@ -191,15 +230,227 @@ def generate_report(results, selected_n_neighbors, features):
     
     return "\n".join(report)
 
-def main():
+def fit_lof_reference(X_ref, n_neighbors):
+    nn = NearestNeighbors(n_neighbors=n_neighbors, algorithm='kd_tree').fit(X_ref)
+    k_distance, lrd = local_reachability_density(*nn.kneighbors())
+    return {'nn': nn, 'k_distance': k_distance, 'lrd': lrd, 'n_neighbors': n_neighbors}
+
+def score_against_reference(X, self_positions, reference):
+    # Query one extra neighbour so rows that are themselves in the reference
+    # can drop their own match; every other row drops the farthest one.
+    k = reference['n_neighbors']
+    dist, idx = reference['nn'].kneighbors(X, n_neighbors=k + 1)
+    drop = idx == self_positions[:, np.newaxis]
+    drop[~drop.any(axis=1), -1] = True
+    dist = dist[~drop].reshape(len(X), k)
+    idx = idx[~drop].reshape(len(X), k)
+    
+    reach_dist = np.maximum(dist, reference['k_distance'][idx])
+    lrd = 1.0 / (reach_dist.mean(axis=1) + 1e-10)
+    return -(reference['lrd'][idx].mean(axis=1) / lrd)
+
+_worker_reference = None
+
+def _init_lof_worker(reference):
+    global _worker_reference
+    _worker_reference = reference
+
+def _score_chunk(task):
+    x_path, positions_path, start, stop = task
+    X = np.load(x_path, mmap_mode='r')
+    positions = np.load(positions_path, mmap_mode='r')
+    return score_against_reference(np.asarray(X[start:stop], dtype=np.float64),
+                                   np.asarray(positions[start:stop]), _worker_reference)
+
+def chunk_rows_for_budget(n_neighbors, memory_mb):
+    # kneighbors distances + indices, the drop mask, and the reachability
+    # arrays: about five (k + 1)-wide 8-byte arrays per row.
+    bytes_per_row = (n_neighbors + 1) * 8 * 5
+    return max(1_000, int(memory_mb * 1024**2 // bytes_per_row))
+
+@instrument_stage()
+def score_lof_chunked(X, n_neighbors=20, reference_size=100_000, workers=None, memory_mb=256, seed=42, x_path=None):
+    print_section_header("CHUNKED LOF SCORING")
+    
+    n_rows = len(X)
+    rng = np.random.default_rng(seed)
+    if n_rows > reference_size:
+        ref_positions = np.sort(rng.choice(n_rows, size=reference_size, replace=False))
+    else:
+        ref_positions = np.arange(n_rows)
+    
+    print(f"  Reference: {len(ref_positions):,} of {n_rows:,} rows (kd-tree, n_neighbors={n_neighbors})")
+    reference = fit_lof_reference(np.asarray(X[ref_positions], dtype=np.float64), n_neighbors)
+    
+    chunk_rows = chunk_rows_for_budget(n_neighbors, memory_mb)
+    bounds = [(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+    print(f"  Scoring {len(bounds)} chunks of up to {chunk_rows:,} rows (~{memory_mb} MB each)")
+    
+    tmp_dir = tempfile.mkdtemp(prefix='lof_')
+    try:
+        # Workers open the shared standardized matrix directly when there is one
+        if x_path is None:
+            x_path = os.path.join(tmp_dir, 'X.npy')
+            np.save(x_path, np.asarray(X, dtype=np.float32))
+        positions_path = os.path.join(tmp_dir, 'positions.npy')
+        positions = np.full(n_rows, -1, dtype=np.int64)
+        positions[ref_positions] = np.arange(len(ref_positions))
+        np.save(positions_path, positions)
+        del positions
+        
+        tasks = [(x_path, positions_path, start, stop) for start, stop in bounds]
+        scores = np.empty(n_rows, dtype=np.float64)
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_lof_worker,
+                                     initargs=(reference,)) as executor:
+                for (start, stop), chunk_scores in zip(bounds, executor.map(_score_chunk, tasks)):
+                    scores[start:stop] = chunk_scores
+        else:
+            _init_lof_worker(reference)
+            for (start, stop), task in zip(bounds, tasks):
+                scores[start:stop] = _score_chunk(task)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    
+    predictions = np.where(scores < LOF_OFFSET, -1, 1)
+    n_outliers = int((predictions == -1).sum())
+    print(f"  Detected: {n_outliers:,} outliers ({n_outliers / n_rows * 100:.2f}%)")
+    
+    return predictions, scores, reference
+
+@instrument_stage()
+def estimate_lof_approximation(X, n_neighbors, reference_fraction, validation_rows=20_000, seed=42):
+    print_section_header("LOF APPROXIMATION ERROR")
+    
+    if reference_fraction >= 1.0:
+        print("  Reference holds every row: scores are exact LOF")
+        return None
+    
+    # Repeat the subsampling at the same fraction on a sample small enough for
+    # exact LOF, and compare the two scorings on those rows.
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(len(X), size=min(validation_rows, len(X)), replace=False))
+    X_val = np.asarray(X[sample], dtype=np.float32).astype(np.float64)
+    
+    exact_pred, exact_scores = lof_from_graph(build_neighbor_graph(X_val, n_neighbors), n_neighbors)
+    
+    ref_size = max(n_neighbors + 2, int(round(reference_fraction * len(X_val))))
+    ref_positions = np.sort(rng.choice(len(X_val), size=ref_size, replace=False))
+    positions = np.full(len(X_val), -1, dtype=np.int64)
+    positions[ref_positions] = np.arange(ref_size)
+    reference = fit_lof_reference(X_val[ref_positions], n_neighbors)
+    approx_scores = score_against_reference(X_val, positions, reference)
+    approx_pred = np.where(approx_scores < LOF_OFFSET, -1, 1)
+    
+    exact_out = exact_pred == -1
+    approx_out = approx_pred == -1
+    union = (exact_out | approx_out).sum()
+    error = {
+        'validation_rows': len(X_val),
+        'reference_rows': ref_size,
+        'spearman': float(stats.spearmanr(exact_scores, approx_scores)[0]),
+        'median_abs_error': float(np.median(np.abs(exact_scores - approx_scores))),
+        'flag_agreement': float((exact_out == approx_out).mean()),
+        'outlier_jaccard': float((exact_out & approx_out).sum() / union) if union else 1.0,
+        'exact_outliers': int(exact_out.sum()),
+        'approx_outliers': int(approx_out.sum())
+    }
+    
+    print(f"  Validation: {error['validation_rows']:,} rows, reference {ref_size:,} ({reference_fraction:.1%})")
+    print(f"  Spearman (exact vs approximate LOF): {error['spearman']:.4f}")
+    print(f"  Median |LOF error|: {error['median_abs_error']:.4f}")
+    print(f"  Flag agreement: {error['flag_agreement']:.2%}, outlier Jaccard: {error['outlier_jaccard']:.3f}")
+    return error
+
+def generate_chunked_report(n_rows, reference_rows, n_neighbors, n_outliers, error):
+    report = []
+    report.append("Chunked LOF (Local Outlier Factor) Outlier Detection")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Method Overview:")
+    report.append("The neighbour index (kd-tree) is built on a seeded random reference subsample.")
+    report.append("Reference points get their k-distance and local reachability density from that")
+    report.append("subsample. Every row is then scored against the reference in memory-capped chunks,")
+    report.append("in parallel, as LOF = mean(lrd of its k reference neighbours) / its own lrd.")
+    report.append("Rows that belong to the reference exclude themselves from their neighbours.")
+    report.append("")
+    report.append(f"Rows scored: {n_rows:,}")
+    report.append(f"Reference rows: {reference_rows:,} ({reference_rows / n_rows:.1%})")
+    report.append(f"n_neighbors: {n_neighbors}")
+    report.append(f"Outliers found: {n_outliers:,} ({n_outliers / n_rows * 100:.2f}% of data)")
+    report.append("")
+    report.append("Approximation Error:")
+    if error is None:
+        report.append("The reference holds every row, so the scores are exact LOF.")
+    else:
+        report.append("With a subsample, k reference neighbours span roughly the neighbourhood of")
+        report.append("k × (rows / reference rows) neighbours in the full data, so scores are smoother")
+        report.append("than exact LOF. Measured by repeating the same reference fraction on a sample")
+        report.append("small enough for exact LOF:")
+        report.append(f"  Validation rows: {error['validation_rows']:,} (reference {error['reference_rows']:,})")
+        report.append(f"  Spearman rank correlation of scores: {error['spearman']:.4f}")
+        report.append(f"  Median absolute LOF error: {error['median_abs_error']:.4f}")
+        report.append(f"  Flag agreement: {error['flag_agreement']:.2%}")
+        report.append(f"  Outlier set Jaccard: {error['outlier_jaccard']:.3f} "
+                      f"(exact {error['exact_outliers']:,}, approximate {error['approx_outliers']:,})")
+    
+    return "\n".join(report)
+
+def main_chunked(df=None, matrix=None, n_neighbors=20, reference_size=100_000, workers=None, memory_mb=256):
+    print_section_header("CHUNKED LOF OUTLIER DETECTION")
+    
+    X, params = standardized_features(df, matrix)
+    features = params['features']
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'], mmap=True)
+    
+    predictions, scores, reference = score_lof_chunked(
+        X, n_neighbors, reference_size=reference_size, workers=workers, memory_mb=memory_mb,
+        x_path=params['path']
+    )
+    reference_rows = len(reference['lrd'])
+    error = estimate_lof_approximation(X, n_neighbors, reference_rows / len(X))
+    
+    output_df = pd.DataFrame({
+        'outlier_lof': predictions == -1,
+        'lof_score': -scores
+    })
+    if 'DateTime' in df.columns:
+        output_df.insert(0, 'DateTime', df['DateTime'].to_numpy())
+    save_csv(output_df, 'outliers_lof_flags.csv')
+    save_detector({
+        'kind': 'lof',
+        'features': features,
+        'scaler': scaler_from_params(params),
+        'reference': reference,
+        'threshold': LOF_OFFSET
+    }, 'lof')
+    
+    n_outliers = int(output_df['outlier_lof'].sum())
+    report = generate_chunked_report(len(X), reference_rows, n_neighbors, n_outliers, error)
+    save_report(report, 'outlier_lof_chunked_report.txt')
+    
+    print_section_header("CHUNKED LOF ANALYSIS COMPLETE")
+    print(f"✓ n_neighbors: {n_neighbors}")
+    print(f"✓ Outliers detected: {n_outliers:,}")
+    print(f"✓ Percentage: {n_outliers / len(X) * 100:.2f}%")
+    
+    return output_df
+
+def main(df=None, matrix=None, method='sweep', **kwargs):
+    if method == 'chunked':
+        return main_chunked(df, matrix, **kwargs)
+    
     print_section_header("LOF (LOCAL OUTLIER FACTOR) OUTLIER DETECTION")
     
-    df = load_final_dataset()
-    features = get_numeric_features(df)
+    X, params = standardized_features(df, matrix)
+    features = params['features']
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'], mmap=True)
     
-    print(f"\nAnalyzing {len(features)} numeric features with LOF")
+    print(f"\nAnalyzing {len(features)} standardized numeric features with LOF")
     
-    results = experiment_neighbors(df, features)
+    results, graph = experiment_neighbors(X)
     visualize_neighbors_comparison(results)
     selected_n_neighbors = select_optimal_neighbors(results)
     
@@ -208,7 +459,16 @@ def main():
         'outlier_lof': selected_result['predictions'] == -1,
         'lof_score': selected_result['lof_values']
     })
+    if 'DateTime' in df.columns:
+        output_df.insert(0, 'DateTime', df['DateTime'].to_numpy())
     save_csv(output_df, 'outliers_lof_flags.csv')
+    save_detector({
+        'kind': 'lof',
+        'features': features,
+        'scaler': scaler_from_params(params),
+        'reference': lof_reference_from_graph(graph, selected_n_neighbors),
+        'threshold': LOF_OFFSET
+    }, 'lof')
     
     report = generate_report(results, selected_n_neighbors, features)
     save_report(report, 'outlier_lof_report.txt')
@@ -217,6 +477,39 @@ def main():
     print(f"✓ Selected n_neighbors: {selected_n_neighbors}")
     print(f"✓ Outliers detected: {selected_result['n_outliers']:,}")
     print(f"✓ Percentage: {selected_result['percentage']:.2f}%")
+    
+    return output_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Flag outliers with the Local Outlier Factor.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['sweep', 'chunked'],
+        default='sweep',
+        help='sweep: exact LOF for n_neighbors 10, 20, 50; chunked: memory-bounded LOF against a reference subsample'
+    )
+    parser.add_argument(
+        '-r', '--reference-size',
+        type=int,
+        default=100_000,
+        help='Rows in the reference subsample for the chunked method (default: 100000)'
+    )
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Score chunks in a process pool with N workers (default: single process)'
+    )
+    parser.add_argument(
+        '--memory-mb',
+        type=int,
+        default=256,
+        help='Approximate working memory per chunk in MB (default: 256)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('outlier_lof'):
+        if args.method == 'chunked':
+            main(method='chunked', reference_size=args.reference_size, workers=args.workers, memory_mb=args.memory_mb)
+        else:
+            main()
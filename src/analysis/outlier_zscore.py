@@ -1,43 +1,91 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from utils import (load_final_dataset, iter_dataset_chunks, get_numeric_features, NUMERIC_COLUMNS, SEASONS,
+                   MONTH_TO_SEASON, save_report, save_csv, print_section_header)
+from instrumentation import instrument_stage, run_manifest
+from quantile_sketch import create_sketch, update_sketch, sketch_quantile, sketch_absolute_deviation
+from detector_store import save_detector
+
+# Scale factors that make MAD and mean absolute deviation consistent with the
+# standard deviation of a normal distribution.
+MAD_TO_SIGMA = 1.4826
+MEAN_AD_TO_SIGMA = 1.2533
+ROBUST_THRESHOLD = 3.5
+
+# Contexts are (season, hour-of-week) cells: 4 × 7 × 24 = 672 baselines.
+HOURS_PER_WEEK = 7 * 24
+N_CONTEXTS = len(SEASONS) * HOURS_PER_WEEK
+MIN_CONTEXT_ROWS = 30
+CONTEXTUAL_BASELINES_PATH = '../../outputs/phase2/zscore_contextual_baselines.csv'
+
+def zscore_baseline(X):
+    # NaN-aware like the threshold index. Constant columns (Sub_metering_1 in
+    # the cleaned set) get scale 1, as in StandardScaler, so their z-scores
+    # are 0 rather than NaN from a 0/0.
+    mean = np.nanmean(X, axis=0, dtype=np.float64)
+    std = np.nanstd(X, axis=0, ddof=1, dtype=np.float64)
+    std = np.where(std > 0, std, 1.0)
+    return mean, std
 
 def calculate_zscore(df, features):
-    z_scores = pd.DataFrame(index=df.index)
-    for col in features:
-        mean = df[col].mean()
-        std = df[col].std()
-        z_scores[f'zscore_{col}'] = (df[col] - mean) / std
+    X = df[features].to_numpy(dtype=np.float32)
+    mean, std = zscore_baseline(X)
+    z_scores = (X - mean.astype(np.float32)) / std.astype(np.float32)
     return z_scores
 
-def detect_outliers_zscore(z_scores, threshold):
-    outlier_flags = pd.DataFrame(index=z_scores.index)
-    for col in z_scores.columns:
-        outlier_flags[col.replace('zscore_', 'outlier_')] = np.abs(z_scores[col]) > threshold
-    total_outliers = outlier_flags.any(axis=1).sum()
+def build_threshold_index(z_scores):
+    abs_z = np.abs(z_scores)
+    row_max = np.fmax.reduce(abs_z, axis=1)
+    
+    # Sorting once turns every later threshold count into a binary search.
+    return {
+        'n_rows': len(abs_z),
+        'per_feature': np.sort(abs_z, axis=0),
+        'per_feature_valid': (~np.isnan(abs_z)).sum(axis=0),
+        'row_max': np.sort(row_max),
+        'row_max_valid': int((~np.isnan(row_max)).sum())
+    }
+
+def count_outliers(index, thresholds):
+    thresholds = np.atleast_1d(np.asarray(thresholds, dtype=np.float32))
+    
+    total = index['row_max_valid'] - np.searchsorted(index['row_max'], thresholds, side='right')
+    per_feature = np.column_stack([
+        index['per_feature_valid'][j] - np.searchsorted(index['per_feature'][:, j], thresholds, side='right')
+        for j in range(index['per_feature'].shape[1])
+    ])
+    return total, per_feature
+
+def detect_outliers_zscore(z_scores, threshold, features):
+    mask = np.abs(z_scores) > threshold
+    outlier_flags = pd.DataFrame(mask, columns=[f'outlier_{col}' for col in features])
+    total_outliers = int(mask.any(axis=1).sum())
     return outlier_flags, total_outliers
 
+@instrument_stage()
 def experiment_thresholds(df, features, thresholds=[2.5, 3.0, 3.5]):
     print_section_header("Z-SCORE THRESHOLD EXPERIMENTATION")
     
     z_scores = calculate_zscore(df, features)
+    index = build_threshold_index(z_scores)
+    totals, per_feature_counts = count_outliers(index, thresholds)
     results = {}
     
-    for threshold in thresholds:
+    for i, threshold in enumerate(thresholds):
         print(f"\nThreshold |Z| > {threshold}:")
         print("-" * 50)
         
-        outlier_flags, total_outliers = detect_outliers_zscore(z_scores, threshold)
-        
         outlier_counts = {}
-        for col in outlier_flags.columns:
-            count = outlier_flags[col].sum()
+        for j, feature_name in enumerate(features):
+            count = int(per_feature_counts[i, j])
             pct = (count / len(df)) * 100
-            feature_name = col.replace('outlier_', '')
             outlier_counts[feature_name] = {'count': count, 'percentage': pct}
             print(f"  {feature_name}: {count:,} ({pct:.2f}%)")
         
+        total_outliers = int(totals[i])
         pct_total = (total_outliers / len(df)) * 100
         print(f"\n  Total rows with outliers: {total_outliers:,} ({pct_total:.2f}%)")
         
@@ -45,11 +93,46 @@ def experiment_thresholds(df, features, thresholds=[2.5, 3.0, 3.5]):
             'threshold': threshold,
             'total_outliers': total_outliers,
             'percentage': pct_total,
-            'per_feature': outlier_counts,
-            'flags': outlier_flags
+            'per_feature': outlier_counts
         }
     
-    return results, z_scores
+    return results, z_scores, index
+
+def build_threshold_curve(index, features, thresholds=None):
+    if thresholds is None:
+        thresholds = np.round(np.arange(1.0, 6.0 + 1e-9, 0.05), 2)
+    
+    totals, per_feature_counts = count_outliers(index, thresholds)
+    
+    curve_df = pd.DataFrame({
+        'Threshold': thresholds,
+        'Total_Outliers': totals,
+        'Percentage': totals / index['n_rows'] * 100
+    })
+    for j, feature in enumerate(features):
+        curve_df[f'{feature}_Outliers'] = per_feature_counts[:, j]
+    
+    return curve_df
+
+def visualize_threshold_curve(curve_df, features, selected_threshold, n_rows):
+    fig, ax = plt.subplots(figsize=(12, 6))
+    
+    ax.plot(curve_df['Threshold'], curve_df['Percentage'], color='black', linewidth=2.5, label='Any feature')
+    for feature in features:
+        ax.plot(curve_df['Threshold'], curve_df[f'{feature}_Outliers'] / n_rows * 100,
+                linewidth=1, alpha=0.8, label=feature)
+    ax.axvline(selected_threshold, color='red', linestyle='--', label=f'Selected |Z| > {selected_threshold}')
+    ax.set_xlabel('Z-Score Threshold', fontsize=12)
+    ax.set_ylabel('Percentage of Data (%)', fontsize=12)
+    ax.set_yscale('log')
+    ax.set_title('Outlier Rate Across Thresholds', fontsize=14, fontweight='bold')
+    ax.grid(alpha=0.3)
+    ax.legend(fontsize=9)
+    
+    plt.tight_layout()
+    plt.savefig('../../outputs/phase2/zscore_threshold_curve.png', dpi=300, bbox_inches='tight')
+    print("✓ Saved: zscore_threshold_curve.png")
+    plt.close()
 
 def visualize_threshold_comparison(results):
     thresholds = list(results.keys())
@@ -159,22 +242,341 @@ def generate_report(results, selected_threshold, features):
     
     return "\n".join(report)
 
-def main():
+def iter_chunks(df, features, chunksize):
+    if df is None:
+        yield from iter_dataset_chunks(['DateTime'] + features, chunksize)
+    else:
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+@instrument_stage()
+def fit_robust_baseline(chunks, features, max_bins=16384):
+    print_section_header("ROBUST BASELINE (MEDIAN / MAD)")
+    
+    sketches = {feature: create_sketch(max_bins) for feature in features}
+    n_rows = 0
+    for chunk in chunks:
+        for feature in features:
+            update_sketch(sketches[feature], chunk[feature].to_numpy(dtype=np.float64))
+        n_rows += len(chunk)
+    
+    rows = []
+    for feature in features:
+        sketch = sketches[feature]
+        median = float(sketch_quantile(sketch, 0.5)[0])
+        mad, mean_ad = sketch_absolute_deviation(sketch, median)
+        
+        # Channels that sit at one value most of the time (Sub_metering_1 is
+        # usually 0) have MAD = 0, so fall back to the mean absolute deviation.
+        scale = MAD_TO_SIGMA * mad if mad > 0 else MEAN_AD_TO_SIGMA * mean_ad
+        rows.append({
+            'Feature': feature,
+            'Median': median,
+            'MAD': mad,
+            'Mean_Abs_Deviation': mean_ad,
+            'Scale': scale if scale > 0 else np.inf,
+            'Bin_Width': 2.0 ** sketch['exponent'] if sketch['exponent'] is not None else np.nan
+        })
+        print(f"  {feature}: median={median:.4f}, MAD={mad:.4f}, scale={rows[-1]['Scale']:.4f}")
+    
+    print(f"\n  ✓ Sketched {n_rows:,} rows in one pass")
+    return pd.DataFrame(rows), n_rows
+
+@instrument_stage()
+def score_robust_chunks(chunks, features, baseline_df, threshold=ROBUST_THRESHOLD,
+                        output_path='../../outputs/phase2/outliers_zscore_flags.csv'):
+    print_section_header("ROBUST Z-SCORE SCORING")
+    
+    median = baseline_df['Median'].to_numpy(dtype=np.float32)
+    scale = baseline_df['Scale'].to_numpy(dtype=np.float32)
+    columns = [f'outlier_{col}' for col in features]
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    per_feature = np.zeros(len(features), dtype=np.int64)
+    total_outliers = 0
+    n_rows = 0
+    for i, chunk in enumerate(chunks):
+        X = chunk[features].to_numpy(dtype=np.float32)
+        abs_z = np.abs((X - median) / scale)
+        mask = abs_z > threshold
+        
+        flags = pd.DataFrame(mask, columns=columns)
+        flags['outlier_any'] = mask.any(axis=1)
+        flags['max_abs_zscore'] = np.fmax.reduce(abs_z, axis=1)
+        if 'DateTime' in chunk.columns:
+            flags.insert(0, 'DateTime', chunk['DateTime'].to_numpy())
+        flags.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        
+        per_feature += mask.sum(axis=0)
+        total_outliers += int(flags['outlier_any'].sum())
+        n_rows += len(chunk)
+    
+    print(f"  ✓ Scored {n_rows:,} rows")
+    print(f"  ✓ Saved output: outputs/phase2/{os.path.basename(output_path)}")
+    
+    return {
+        'n_rows': n_rows,
+        'total_outliers': total_outliers,
+        'percentage': total_outliers / n_rows * 100 if n_rows else 0.0,
+        'per_feature': dict(zip(features, per_feature.tolist()))
+    }
+
+def generate_robust_report(baseline_df, summary, threshold):
+    report = []
+    report.append("Robust Z-Score Outlier Detection Analysis")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Method Overview:")
+    report.append("The robust z-score replaces the mean and standard deviation with the median and")
+    report.append("the median absolute deviation (MAD), so the baseline is not pulled by the outliers.")
+    report.append(f"Formula: Z = (X - median) / ({MAD_TO_SIGMA} × MAD)")
+    report.append(f"If MAD is 0, the scale falls back to {MEAN_AD_TO_SIGMA} × mean absolute deviation.")
+    report.append("")
+    report.append("The median and MAD come from a mergeable histogram sketch filled in one pass over")
+    report.append("the data. Their error is at most one bin width (listed below). Rows are then scored")
+    report.append("chunk by chunk, so the full dataset is never held in memory.")
+    report.append("")
+    report.append("Baseline:")
+    report.append("")
+    for _, row in baseline_df.iterrows():
+        report.append(f"{row['Feature']}: median={row['Median']:.4f}, MAD={row['MAD']:.4f}, "
+                      f"scale={row['Scale']:.4f}, bin width={row['Bin_Width']:.2e}")
+    report.append("")
+    report.append(f"Threshold: |Z| > {threshold}")
+    report.append(f"Outliers found: {summary['total_outliers']:,} ({summary['percentage']:.2f}% of {summary['n_rows']:,} rows)")
+    report.append("")
+    report.append("Outliers by Feature:")
+    report.append("")
+    for feature, count in summary['per_feature'].items():
+        pct = count / summary['n_rows'] * 100 if summary['n_rows'] else 0.0
+        report.append(f"{feature}: {count:,} outliers ({pct:.2f}%)")
+    
+    return "\n".join(report)
+
+def main_robust(df=None, chunksize=200_000, threshold=ROBUST_THRESHOLD):
+    print_section_header("ROBUST Z-SCORE OUTLIER DETECTION (STREAMING)")
+    
+    features = NUMERIC_COLUMNS if df is None else get_numeric_features(df)
+    print(f"\nAnalyzing {len(features)} numeric features in chunks of {chunksize:,} rows")
+    
+    baseline_df, _ = fit_robust_baseline(iter_chunks(df, features, chunksize), features)
+    save_csv(baseline_df, 'zscore_robust_baseline.csv')
+    
+    summary = score_robust_chunks(iter_chunks(df, features, chunksize), features, baseline_df, threshold)
+    save_detector({
+        'kind': 'zscore',
+        'features': features,
+        'scaler': None,
+        'center': baseline_df['Median'].to_numpy(),
+        'scale': baseline_df['Scale'].to_numpy(),
+        'threshold': threshold
+    }, 'zscore_robust')
+    
+    report = generate_robust_report(baseline_df, summary, threshold)
+    save_report(report, 'outlier_zscore_robust_report.txt')
+    
+    print_section_header("ROBUST Z-SCORE ANALYSIS COMPLETE")
+    print(f"✓ Threshold: |Z| > {threshold}")
+    print(f"✓ Outliers detected: {summary['total_outliers']:,}")
+    print(f"✓ Percentage: {summary['percentage']:.2f}%")
+    
+    return summary
+
+def context_codes(datetimes):
+    dt = pd.DatetimeIndex(datetimes)
+    hour_of_week = dt.dayofweek.to_numpy() * 24 + dt.hour.to_numpy()
+    season = MONTH_TO_SEASON[dt.month.to_numpy()]
+    return season * HOURS_PER_WEEK + hour_of_week
+
+@instrument_stage()
+def fit_contextual_baselines(df, features):
+    print_section_header("CONTEXTUAL BASELINES (SEASON × HOUR-OF-WEEK)")
+    
+    codes = context_codes(df['DateTime'])
+    X = df[features].to_numpy(dtype=np.float64)
+    n_features = len(features)
+    
+    # One bincount over (context, feature) cells reduces all features at once.
+    valid = ~np.isnan(X)
+    filled = np.where(valid, X, 0.0)
+    cells = (codes[:, None] * n_features + np.arange(n_features)).ravel()
+    size = N_CONTEXTS * n_features
+    
+    count = np.bincount(cells, weights=valid.ravel(), minlength=size).reshape(N_CONTEXTS, n_features)
+    total = np.bincount(cells, weights=filled.ravel(), minlength=size).reshape(N_CONTEXTS, n_features)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    deviation = np.where(valid, filled - mean[codes], 0.0)
+    m2 = np.bincount(cells, weights=(deviation ** 2).ravel(), minlength=size).reshape(N_CONTEXTS, n_features)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(m2 / (count - 1))
+    
+    # Sparse or constant contexts fall back to the global baseline, which has
+    # scale 1 for a constant channel, so no context is left with std 0.
+    global_mean, global_std = zscore_baseline(X)
+    fallback = (count < MIN_CONTEXT_ROWS) | ~(std > 0)
+    mean = np.where(fallback, global_mean, mean)
+    std = np.where(fallback, global_std, std)
+    
+    context = np.arange(N_CONTEXTS)
+    baselines_df = pd.DataFrame({
+        'Context': context,
+        'Season': np.array(SEASONS)[context // HOURS_PER_WEEK],
+        'DayOfWeek': (context % HOURS_PER_WEEK) // 24,
+        'Hour': context % 24,
+        'Rows': count.max(axis=1).astype(np.int64)
+    })
+    for j, feature in enumerate(features):
+        baselines_df[f'{feature}_mean'] = mean[:, j]
+        baselines_df[f'{feature}_std'] = std[:, j]
+        baselines_df[f'{feature}_fallback'] = fallback[:, j]
+    
+    print(f"  ✓ {N_CONTEXTS} contexts, {int((baselines_df['Rows'] > 0).sum())} observed")
+    print(f"  ✓ Feature baselines on global fallback (< {MIN_CONTEXT_ROWS} rows or zero std): {int(fallback.sum())}")
+    return baselines_df
+
+def score_contextual(df, features, baselines_df):
+    # Broadcasting back is a single gather per feature: row -> context code.
+    codes = context_codes(df['DateTime'])
+    mean = baselines_df[[f'{f}_mean' for f in features]].to_numpy(dtype=np.float32)
+    std = baselines_df[[f'{f}_std' for f in features]].to_numpy(dtype=np.float32)
+    # Baselines saved before the zero-spread fallback can still hold std 0
+    std = np.where(std > 0, std, np.float32(1.0))
+    X = df[features].to_numpy(dtype=np.float32)
+    return (X - mean[codes]) / std[codes]
+
+def generate_contextual_report(results, selected_threshold, summary):
+    report = []
+    report.append("Contextual Z-Score Outlier Detection Analysis")
+    report.append(f"Generated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}")
+    report.append("")
+    report.append("Method Overview:")
+    report.append("Each row is compared with the mean and standard deviation of its own context:")
+    report.append("the same season, day of week and hour. A 3 kW draw on a winter Sunday evening")
+    report.append("is normal; the same draw at 04:00 is not.")
+    report.append("Formula: Z = (X - mean[context]) / std[context]")
+    report.append(f"Contexts: {len(SEASONS)} seasons × 7 days × 24 hours = {N_CONTEXTS}")
+    report.append(f"Contexts with fewer than {MIN_CONTEXT_ROWS} rows, or zero spread, use the global baseline.")
+    report.append("Baselines are saved to outputs/phase2/zscore_contextual_baselines.csv for scoring new data.")
+    report.append("")
+    report.append("Threshold Experimentation Results:")
+    report.append("")
+    for threshold in sorted(results.keys()):
+        r = results[threshold]
+        report.append(f"Threshold |Z| > {threshold}: {r['total_outliers']:,} outliers ({r['percentage']:.2f}% of data)")
+    report.append("")
+    report.append(f"Selected Threshold: |Z| > {selected_threshold}")
+    report.append("")
+    report.append("Comparison with global z-scores at the same threshold:")
+    report.append(f"  Flagged by both: {summary['both']:,}")
+    report.append(f"  Contextual only (unusual for the time, normal overall): {summary['contextual_only']:,}")
+    report.append(f"  Global only (extreme overall, usual for the time): {summary['global_only']:,}")
+    report.append("")
+    report.append("Outliers by Feature:")
+    report.append("")
+    for feature, stats in results[selected_threshold]['per_feature'].items():
+        report.append(f"{feature}: {stats['count']:,} outliers ({stats['percentage']:.2f}%)")
+    
+    return "\n".join(report)
+
+def main_contextual(df=None, thresholds=[2.5, 3.0, 3.5]):
+    print_section_header("CONTEXTUAL Z-SCORE OUTLIER DETECTION")
+    
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'] + NUMERIC_COLUMNS)
+    features = get_numeric_features(df)
+    
+    baselines_df = fit_contextual_baselines(df, features)
+    save_csv(baselines_df, os.path.basename(CONTEXTUAL_BASELINES_PATH))
+    
+    z_scores = score_contextual(df, features, baselines_df)
+    index = build_threshold_index(z_scores)
+    totals, per_feature_counts = count_outliers(index, thresholds)
+    
+    results = {}
+    for i, threshold in enumerate(thresholds):
+        results[threshold] = {
+            'threshold': threshold,
+            'total_outliers': int(totals[i]),
+            'percentage': totals[i] / len(df) * 100,
+            'per_feature': {
+                feature: {'count': int(per_feature_counts[i, j]), 'percentage': per_feature_counts[i, j] / len(df) * 100}
+                for j, feature in enumerate(features)
+            }
+        }
+        print(f"  |Z| > {threshold}: {int(totals[i]):,} rows ({totals[i] / len(df) * 100:.2f}%)")
+    
+    selected_threshold = 3.0
+    flags, _ = detect_outliers_zscore(z_scores, selected_threshold, features)
+    flags['outlier_any'] = flags.any(axis=1)
+    flags['max_abs_zscore'] = np.fmax.reduce(np.abs(z_scores), axis=1)
+    flags.insert(0, 'DateTime', df['DateTime'].to_numpy())
+    save_csv(flags, 'outliers_zscore_contextual_flags.csv')
+    save_detector({
+        'kind': 'contextual_zscore',
+        'features': features,
+        'scaler': None,
+        'baselines': baselines_df,
+        'threshold': selected_threshold
+    }, 'zscore_contextual')
+    
+    global_any = (np.abs(calculate_zscore(df, features)) > selected_threshold).any(axis=1)
+    contextual_any = flags['outlier_any'].to_numpy()
+    summary = {
+        'both': int((global_any & contextual_any).sum()),
+        'contextual_only': int((~global_any & contextual_any).sum()),
+        'global_only': int((global_any & ~contextual_any).sum())
+    }
+    
+    report = generate_contextual_report(results, selected_threshold, summary)
+    save_report(report, 'outlier_zscore_contextual_report.txt')
+    
+    print_section_header("CONTEXTUAL Z-SCORE ANALYSIS COMPLETE")
+    print(f"✓ Selected threshold: |Z| > {selected_threshold}")
+    print(f"✓ Outliers detected: {results[selected_threshold]['total_outliers']:,}")
+    print(f"✓ Contextual only (missed by global z-scores): {summary['contextual_only']:,}")
+    
+    return flags
+
+def main(df=None, method='standard', chunksize=200_000):
+    if method == 'robust':
+        return main_robust(df, chunksize=chunksize)
+    if method == 'contextual':
+        return main_contextual(df)
+    
     print_section_header("Z-SCORE OUTLIER DETECTION")
     
-    df = load_final_dataset()
+    if df is None:
+        df = load_final_dataset(columns=['DateTime'] + NUMERIC_COLUMNS)
     features = get_numeric_features(df)
     
     print(f"\nAnalyzing {len(features)} numeric features")
     
-    results, z_scores = experiment_thresholds(df, features)
+    results, z_scores, index = experiment_thresholds(df, features)
     visualize_threshold_comparison(results)
     selected_threshold = select_optimal_threshold(results)
     
-    selected_flags = results[selected_threshold]['flags']
+    curve_df = build_threshold_curve(index, features)
+    visualize_threshold_curve(curve_df, features, selected_threshold, len(df))
+    save_csv(curve_df, 'zscore_threshold_curve.csv')
+    
+    selected_flags, _ = detect_outliers_zscore(z_scores, selected_threshold, features)
     selected_flags['outlier_any'] = selected_flags.any(axis=1)
+    selected_flags['max_abs_zscore'] = np.fmax.reduce(np.abs(z_scores), axis=1)
+    if 'DateTime' in df.columns:
+        selected_flags.insert(0, 'DateTime', df['DateTime'].to_numpy())
     save_csv(selected_flags, 'outliers_zscore_flags.csv')
     
+    mean, std = zscore_baseline(df[features].to_numpy(dtype=np.float32))
+    save_detector({
+        'kind': 'zscore',
+        'features': features,
+        'scaler': None,
+        'center': mean,
+        'scale': std,
+        'threshold': selected_threshold
+    }, 'zscore')
+    
     report = generate_report(results, selected_threshold, features)
     save_report(report, 'outlier_zscore_report.txt')
     
@@ -182,6 +584,25 @@ def main():
     print(f"✓ Selected threshold: |Z| > {selected_threshold}")
     print(f"✓ Outliers detected: {results[selected_threshold]['total_outliers']:,}")
     print(f"✓ Percentage: {results[selected_threshold]['percentage']:.2f}%")
+    
+    return selected_flags
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Flag outliers with z-scores.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['standard', 'robust', 'contextual'],
+        default='standard',
+        help='standard: mean/std in memory; robust: streaming median/MAD for datasets that do not fit in memory; '
+             'contextual: mean/std per season and hour of week'
+    )
+    parser.add_argument(
+        '-c', '--chunksize',
+        type=int,
+        default=200_000,
+        help='Rows per chunk for the robust method (default: 200000)'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('outlier_zscore'):
+        main(method=args.method, chunksize=args.chunksize)
@@ -1,24 +1,35 @@
+import argparse
+import os
 import pandas as pd
 import numpy as np
+import joblib
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-from utils import load_final_dataset, get_numeric_features, save_report, save_csv, print_section_header
+from sklearn.decomposition import PCA, IncrementalPCA
+from utils import NUMERIC_COLUMNS, save_report, save_csv, print_section_header
+from feature_matrix import standardized_features, select_features, scaler_from_params
+from instrumentation import instrument_stage, run_manifest
+from density_plot import density_image
 
-def standardize_data(df, features):
+PCA_MODEL_PATH = '../../outputs/phase2/pca_model.joblib'
+ERROR_QUANTILE = 0.99
+
+@instrument_stage()
+def standardize_data(df, features, matrix=None):
     print_section_header("DATA STANDARDIZATION FOR PCA")
     
-    scaler = StandardScaler()
-    scaled_data = scaler.fit_transform(df[features])
-    scaled_df = pd.DataFrame(scaled_data, columns=features, index=df.index)
+    X, params = standardized_features(df, matrix)
+    scaled_data = select_features(X, params, features)
+    scaler = scaler_from_params(params, features)
     
+    col = params['features'].index('Global_active_power')
     print(f"✓ Standardized {len(features)} features (mean=0, std=1)")
-    print(f"  Original range example (Global_active_power): [{df['Global_active_power'].min():.2f}, {df['Global_active_power'].max():.2f}]")
-    print(f"  Scaled range: [{scaled_df['Global_active_power'].min():.2f}, {scaled_df['Global_active_power'].max():.2f}]")
+    print(f"  Original range example (Global_active_power): [{params['min'][col]:.2f}, {params['max'][col]:.2f}]")
+    print(f"  Scaled range: [{X[:, col].min():.2f}, {X[:, col].max():.2f}]")
     
     return scaled_data, scaler
 
+@instrument_stage()
 def perform_pca(scaled_data, n_components=None):
     print_section_header("PRINCIPAL COMPONENT ANALYSIS")
     
@@ -28,10 +39,15 @@ def perform_pca(scaled_data, n_components=None):
     pca = PCA(n_components=n_components)
     pca_components = pca.fit_transform(scaled_data)
     
+    explained_variance, cumulative_variance = print_explained_variance(pca)
+    
+    return pca, pca_components, explained_variance, cumulative_variance
+
+def print_explained_variance(pca):
     explained_variance = pca.explained_variance_ratio_
     cumulative_variance = np.cumsum(explained_variance)
     
-    print(f"Number of components: {n_components}")
+    print(f"Number of components: {pca.n_components_}")
     print(f"\nExplained variance by component:")
     for i, (var, cum) in enumerate(zip(explained_variance, cumulative_variance), 1):
         print(f"  PC{i}: {var*100:.2f}% (cumulative: {cum*100:.2f}%)")
@@ -39,7 +55,76 @@ def perform_pca(scaled_data, n_components=None):
     n_95 = np.argmax(cumulative_variance >= 0.95) + 1
     print(f"\nComponents needed for 95% variance: {n_95}")
     
-    return pca, pca_components, explained_variance, cumulative_variance
+    return explained_variance, cumulative_variance
+
+def reconstruction_components(cumulative_variance):
+    # Rows are rebuilt from the components that reach 95% variance; with every
+    # component kept the reconstruction would be exact and the error always 0.
+    return int(np.argmax(cumulative_variance >= 0.95) + 1)
+
+def reconstruction_error(scaled, pca, n_reconstruction):
+    scores = pca.transform(scaled)
+    rebuilt = scores[:, :n_reconstruction] @ pca.components_[:n_reconstruction] + pca.mean_
+    return scores, ((scaled - rebuilt) ** 2).sum(axis=1)
+
+def chunk_bounds(n_rows, batch_size, min_rows=1):
+    bounds = [(start, min(start + batch_size, n_rows)) for start in range(0, n_rows, batch_size)]
+    # partial_fit needs at least n_components rows per batch, so a short
+    # tail is folded into the previous chunk.
+    if len(bounds) > 1 and bounds[-1][1] - bounds[-1][0] < min_rows:
+        bounds[-2:] = [(bounds[-2][0], n_rows)]
+    return bounds
+
+@instrument_stage()
+def perform_incremental_pca(X, params, features, n_components=None, batch_size=100_000):
+    print_section_header("INCREMENTAL PRINCIPAL COMPONENT ANALYSIS")
+    
+    if n_components is None:
+        n_components = min(len(features), 7)
+    
+    # Only one chunk of the memory-mapped matrix is in memory at a time
+    idx = [params['features'].index(f) for f in features]
+    bounds = chunk_bounds(len(X), batch_size, min_rows=n_components)
+    print(f"  Fitting on {len(X):,} rows in {len(bounds)} chunks of up to {batch_size:,}")
+    
+    pca = IncrementalPCA(n_components=n_components)
+    for start, stop in bounds:
+        pca.partial_fit(np.asarray(X[start:stop, idx], dtype=np.float64))
+    
+    explained_variance, cumulative_variance = print_explained_variance(pca)
+    
+    return pca, explained_variance, cumulative_variance
+
+@instrument_stage()
+def project_to_disk(X, params, features, pca, n_reconstruction, batch_size=100_000, sample_size=100_000, seed=42,
+                    output_path='../../outputs/phase2/pca_components.csv'):
+    print_section_header("STREAMING PCA PROJECTION")
+    
+    idx = [params['features'].index(f) for f in features]
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    # A seeded row sample is kept in memory for the scatter plots
+    rng = np.random.default_rng(seed)
+    n_rows = len(X)
+    sample_rows = np.sort(rng.choice(n_rows, size=min(sample_size, n_rows), replace=False))
+    sample = np.empty((len(sample_rows), pca.n_components_), dtype=np.float64)
+    errors = np.empty(n_rows, dtype=np.float64)
+    
+    for i, (start, stop) in enumerate(chunk_bounds(n_rows, batch_size)):
+        projected, errors[start:stop] = reconstruction_error(
+            np.asarray(X[start:stop, idx], dtype=np.float64), pca, n_reconstruction
+        )
+        chunk_df = pd.DataFrame(projected[:, :3], columns=['PC1', 'PC2', 'PC3'])
+        chunk_df.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        
+        lo, hi = np.searchsorted(sample_rows, [start, stop])
+        sample[lo:hi] = projected[sample_rows[lo:hi] - start]
+    
+    print(f"  ✓ Projected {n_rows:,} rows")
+    print(f"  ✓ Saved output: outputs/phase2/{os.path.basename(output_path)}")
+    print(f"  ✓ Kept {len(sample_rows):,} sampled rows for the scatter plots")
+    
+    return sample, errors
 
 def create_scree_plot(explained_variance, cumulative_variance):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 5))
@@ -75,19 +160,25 @@ def create_scree_plot(explained_variance, cumulative_variance):
     print("\n✓ Saved: pca_scree_plot.png")
     plt.close()
 
-def create_pca_scatter(pca_components, df):
+def create_pca_scatter(pca_components, df, render='density'):
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
     
-    ax1.scatter(pca_components[:, 0], pca_components[:, 1], 
-                alpha=0.3, s=1, c='steelblue')
+    if render == 'density':
+        density_image(ax1, pca_components[:, 0], pca_components[:, 1])
+    else:
+        ax1.scatter(pca_components[:, 0], pca_components[:, 1], 
+                    alpha=0.3, s=1, c='steelblue')
     ax1.set_xlabel('PC1', fontsize=12)
     ax1.set_ylabel('PC2', fontsize=12)
     ax1.set_title('PCA: First Two Principal Components', fontsize=14, fontweight='bold')
     ax1.grid(alpha=0.3)
     
     if pca_components.shape[1] >= 3:
-        ax2.scatter(pca_components[:, 0], pca_components[:, 2], 
-                    alpha=0.3, s=1, c='darkgreen')
+        if render == 'density':
+            density_image(ax2, pca_components[:, 0], pca_components[:, 2], cmap='magma')
+        else:
+            ax2.scatter(pca_components[:, 0], pca_components[:, 2], 
+                        alpha=0.3, s=1, c='darkgreen')
         ax2.set_xlabel('PC1', fontsize=12)
         ax2.set_ylabel('PC3', fontsize=12)
         ax2.set_title('PCA: PC1 vs PC3', fontsize=14, fontweight='bold')
@@ -164,28 +255,98 @@ def generate_report(pca, explained_variance, cumulative_variance, components_df,
     
     return "\n".join(report)
 
-def main():
+def save_pca_model(scaler, pca, features, n_reconstruction, error_threshold, path=PCA_MODEL_PATH):
+    model = {
+        'features': features,
+        'scaler': scaler,
+        'pca': pca,
+        'n_reconstruction': n_reconstruction,
+        'error_threshold': error_threshold,
+        'fitted': pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(model, path)
+    print(f"  ✓ Saved model: outputs/phase2/{os.path.basename(path)} "
+          f"(reconstruction from {n_reconstruction} components, error threshold {error_threshold:.4f})")
+
+def load_pca_model(path=PCA_MODEL_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No saved PCA model at {path}; run pca_analysis.py first")
+    return joblib.load(path)
+
+def transform_batches(chunks, model):
+    # Each chunk is standardized with the saved scaler and projected with the
+    # saved PCA; the reconstruction error is a linear anomaly score.
+    columns = [f'PC{i+1}' for i in range(model['pca'].n_components_)]
+    for chunk in chunks:
+        scaled = model['scaler'].transform(chunk[model['features']].to_numpy(dtype=np.float64))
+        scores, errors = reconstruction_error(scaled, model['pca'], model['n_reconstruction'])
+        
+        result = pd.DataFrame(scores, columns=columns, index=chunk.index)
+        result['reconstruction_error'] = errors
+        result['outlier_pca'] = errors > model['error_threshold']
+        if 'DateTime' in chunk.columns:
+            result.insert(0, 'DateTime', chunk['DateTime'].to_numpy())
+        yield result
+
+def transform_new_data(df, model=None, batch_size=100_000):
+    model = model or load_pca_model()
+    chunks = (df.iloc[start:stop] for start, stop in chunk_bounds(len(df), batch_size))
+    return pd.concat(transform_batches(chunks, model))
+
+def transform_file(input_path, batch_size=100_000, output_path='../../outputs/phase2/pca_new_batch_scores.csv'):
+    print_section_header("PCA TRANSFORM OF NEW DATA")
+    
+    model = load_pca_model()
+    print(f"  Model fitted {model['fitted']} on {len(model['features'])} features")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    
+    n_rows = 0
+    n_outliers = 0
+    for i, result in enumerate(transform_batches(pd.read_csv(input_path, chunksize=batch_size), model)):
+        result.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        n_rows += len(result)
+        n_outliers += int(result['outlier_pca'].sum())
+    
+    print(f"  ✓ Projected {n_rows:,} rows")
+    print(f"  ✓ Reconstruction error above {model['error_threshold']:.4f}: {n_outliers:,} rows")
+    print(f"  ✓ Saved output: outputs/phase2/{os.path.basename(output_path)}")
+    return n_rows, n_outliers
+
+def main(df=None, matrix=None, method='exact', batch_size=100_000, render='density'):
     print_section_header("PCA - PRINCIPAL COMPONENT ANALYSIS")
     
-    df = load_final_dataset()
-    features = get_numeric_features(df)
-    
-    features = [f for f in features if f != 'Sub_metering_1']
-    
-    scaled_data, scaler = standardize_data(df, features)
-    
-    pca, pca_components, explained_variance, cumulative_variance = perform_pca(scaled_data)
+    features = [f for f in NUMERIC_COLUMNS if f != 'Sub_metering_1']
+    
+    if method == 'incremental':
+        # Chunks are read straight from the memory-mapped matrix and the
+        # projection is streamed to pca_components.csv
+        X, params = standardized_features(df, matrix)
+        pca, explained_variance, cumulative_variance = perform_incremental_pca(
+            X, params, features, batch_size=batch_size
+        )
+        n_reconstruction = reconstruction_components(cumulative_variance)
+        pca_components, errors = project_to_disk(X, params, features, pca, n_reconstruction,
+                                                 batch_size=batch_size)
+        scaler = scaler_from_params(params, features)
+    else:
+        scaled_data, scaler = standardize_data(df, features, matrix)
+        pca, pca_components, explained_variance, cumulative_variance = perform_pca(scaled_data)
+        n_reconstruction = reconstruction_components(cumulative_variance)
+        _, errors = reconstruction_error(np.asarray(scaled_data, dtype=np.float64), pca, n_reconstruction)
     
     create_scree_plot(explained_variance, cumulative_variance)
-    create_pca_scatter(pca_components, df)
+    create_pca_scatter(pca_components, df, render=render)
     components_df = create_component_heatmap(pca, features)
     
-    pca_df = pd.DataFrame(
-        pca_components[:, :3],
-        columns=['PC1', 'PC2', 'PC3']
-    )
-    save_csv(pca_df, 'pca_components.csv')
+    if method != 'incremental':
+        pca_df = pd.DataFrame(
+            pca_components[:, :3],
+            columns=['PC1', 'PC2', 'PC3']
+        )
+        save_csv(pca_df, 'pca_components.csv')
     save_csv(components_df, 'pca_loadings.csv')
+    save_pca_model(scaler, pca, features, n_reconstruction, float(np.quantile(errors, ERROR_QUANTILE)))
     
     variance_df = pd.DataFrame({
         'Component': [f'PC{i+1}' for i in range(len(explained_variance))],
@@ -201,6 +362,38 @@ def main():
     print(f"✓ Reduced {len(features)} features to {pca.n_components_} components")
     print(f"✓ First 2 components explain {cumulative_variance[1]*100:.1f}% of variance")
     print(f"✓ Generated scree plot, scatter plots, and component loadings")
+    
+    return components_df, variance_df
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Principal component analysis of the standardized features.')
+    parser.add_argument(
+        '-m', '--method',
+        choices=['exact', 'incremental'],
+        default='exact',
+        help='exact: PCA on the whole matrix in memory; incremental: out-of-core IncrementalPCA over chunks'
+    )
+    parser.add_argument(
+        '-b', '--batch-size',
+        type=int,
+        default=100_000,
+        help='Rows per chunk for the incremental method and for --transform (default: 100000)'
+    )
+    parser.add_argument(
+        '-r', '--render',
+        choices=['density', 'scatter'],
+        default='density',
+        help='density: 2D histogram image with a log colour scale; scatter: one marker per row (default: density)'
+    )
+    parser.add_argument(
+        '-t', '--transform',
+        metavar='INPUT',
+        help='Project a CSV of new rows with the saved scaler and PCA instead of fitting'
+    )
+    args = parser.parse_args()
+    
+    with run_manifest('pca_analysis'):
+        if args.transform:
+            transform_file(args.transform, batch_size=args.batch_size)
+        else:
+            main(method=args.method, batch_size=args.batch_size, render=args.render)
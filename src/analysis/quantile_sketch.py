@@ -0,0 +1,142 @@
+import numpy as np
+
+# Mergeable histogram sketch. Bins have width 2**exponent and are aligned on
+# multiples of that width, so two sketches always merge exactly after the
+# finer one is coarsened. Each bin is represented by its left edge, which is
+# exact for values on the grid (the integer Wh sub-meterings) and off by less
+# than one bin width otherwise.
+
+def create_sketch(max_bins=16384):
+    return {
+        'max_bins': max_bins,
+        'exponent': None,
+        'start': 0,
+        'counts': np.zeros(0, dtype=np.int64),
+        'count': 0,
+        'nan_count': 0,
+        'min': np.inf,
+        'max': -np.inf
+    }
+
+def _bin_width(sketch):
+    return 2.0 ** sketch['exponent']
+
+def _coarsen(sketch, exponent):
+    if sketch['exponent'] is None or exponent <= sketch['exponent']:
+        return
+    factor = 2 ** (exponent - sketch['exponent'])
+    idx = sketch['start'] + np.arange(len(sketch['counts']), dtype=np.int64)
+    new_idx = idx // factor
+    new_start = sketch['start'] // factor
+    sketch['counts'] = np.bincount(new_idx - new_start, weights=sketch['counts'],
+                                   minlength=int(new_idx[-1] - new_start + 1) if len(idx) else 0).astype(np.int64)
+    sketch['start'] = int(new_start)
+    sketch['exponent'] = exponent
+
+def _fit_exponent(sketch, lo, hi):
+    exponent = sketch['exponent']
+    if exponent is None:
+        span = hi - lo
+        reference = span if span > 0 else max(abs(hi), 1.0)
+        exponent = int(np.floor(np.log2(reference / sketch['max_bins'])))
+    while np.floor(hi / 2.0 ** exponent) - np.floor(lo / 2.0 ** exponent) + 1 > sketch['max_bins']:
+        exponent += 1
+    return exponent
+
+def update_sketch(sketch, values):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    valid = values[~np.isnan(values)]
+    sketch['nan_count'] += len(values) - len(valid)
+    if len(valid) == 0:
+        return sketch
+
+    sketch['min'] = min(sketch['min'], float(valid.min()))
+    sketch['max'] = max(sketch['max'], float(valid.max()))
+
+    exponent = _fit_exponent(sketch, sketch['min'], sketch['max'])
+    if sketch['exponent'] is None:
+        sketch['exponent'] = exponent
+        sketch['start'] = int(np.floor(sketch['min'] / 2.0 ** exponent))
+    else:
+        _coarsen(sketch, exponent)
+
+    idx = np.floor(valid / _bin_width(sketch)).astype(np.int64)
+    new_start = min(sketch['start'], int(idx.min()))
+    new_end = max(sketch['start'] + len(sketch['counts']) - 1, int(idx.max()))
+
+    counts = np.zeros(new_end - new_start + 1, dtype=np.int64)
+    offset = sketch['start'] - new_start
+    counts[offset:offset + len(sketch['counts'])] = sketch['counts']
+    counts += np.bincount(idx - new_start, minlength=len(counts))
+
+    sketch['counts'] = counts
+    sketch['start'] = new_start
+    sketch['count'] += len(valid)
+    return sketch
+
+def merge_sketches(a, b):
+    if a['exponent'] is None:
+        merged = {key: (value.copy() if isinstance(value, np.ndarray) else value) for key, value in b.items()}
+        merged['nan_count'] += a['nan_count']
+        return merged
+    if b['exponent'] is None:
+        return merge_sketches(b, a)
+
+    merged = {key: (value.copy() if isinstance(value, np.ndarray) else value) for key, value in a.items()}
+    other = {key: (value.copy() if isinstance(value, np.ndarray) else value) for key, value in b.items()}
+    merged['min'] = min(a['min'], b['min'])
+    merged['max'] = max(a['max'], b['max'])
+
+    exponent = _fit_exponent({'exponent': max(a['exponent'], b['exponent']), 'max_bins': a['max_bins']},
+                             merged['min'], merged['max'])
+    _coarsen(merged, exponent)
+    _coarsen(other, exponent)
+
+    new_start = min(merged['start'], other['start'])
+    new_end = max(merged['start'] + len(merged['counts']), other['start'] + len(other['counts'])) - 1
+    counts = np.zeros(new_end - new_start + 1, dtype=np.int64)
+    for part in (merged, other):
+        offset = part['start'] - new_start
+        counts[offset:offset + len(part['counts'])] += part['counts']
+
+    merged['counts'] = counts
+    merged['start'] = new_start
+    merged['count'] = a['count'] + b['count']
+    merged['nan_count'] = a['nan_count'] + b['nan_count']
+    return merged
+
+def sketch_quantile(sketch, q):
+    q = np.atleast_1d(np.asarray(q, dtype=np.float64))
+    if sketch['count'] == 0:
+        return np.full(len(q), np.nan)
+
+    cumulative = np.cumsum(sketch['counts'])
+    bins = np.searchsorted(cumulative, q * sketch['count'], side='left')
+    bins = np.clip(bins, 0, len(cumulative) - 1)
+
+    values = (sketch['start'] + bins) * _bin_width(sketch)
+    return np.clip(values, sketch['min'], sketch['max'])
+
+def sketch_points(sketch):
+    # Bin left edges (clipped to the observed range) with their counts, for
+    # rebuilding histograms or densities from the sketch
+    if sketch['count'] == 0:
+        return np.zeros(0), sketch['counts']
+    edges = (sketch['start'] + np.arange(len(sketch['counts']))) * _bin_width(sketch)
+    return np.clip(edges, sketch['min'], sketch['max']), sketch['counts']
+
+def sketch_absolute_deviation(sketch, center):
+    # Distribution of |x - center| reconstructed from the bin edges, so the
+    # median and mean absolute deviation share the quantile error bound.
+    if sketch['count'] == 0:
+        return np.nan, np.nan
+
+    edges = (sketch['start'] + np.arange(len(sketch['counts']))) * _bin_width(sketch)
+    deviations = np.abs(edges - center)
+    order = np.argsort(deviations, kind='stable')
+    cumulative = np.cumsum(sketch['counts'][order])
+
+    median_idx = np.searchsorted(cumulative, 0.5 * sketch['count'], side='left')
+    median_deviation = deviations[order][median_idx]
+    mean_deviation = float(np.dot(sketch['counts'], deviations) / sketch['count'])
+    return float(median_deviation), mean_deviation
@@ -1,21 +1,141 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import json
 import os
+import shutil
 
-def load_final_dataset():
-    data_path = '../../data/processed/household_power_consumption_cleaned.csv'
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..')
+
+CLEANED_DATA_PATH = os.path.join(project_root, 'data/processed/household_power_consumption_cleaned.csv')
+CACHE_DIR = os.path.join(project_root, 'data/processed/cache')
+
+DTYPE_SCHEMA = {
+    'DateTime': 'datetime64[ns]',
+    'Date': '<U10',
+    'Time': '<U8',
+    'Global_active_power': 'float64',
+    'Global_reactive_power': 'float64',
+    'Voltage': 'float64',
+    'Global_intensity': 'float64',
+    'Sub_metering_1': 'float64',
+    'Sub_metering_2': 'float64',
+    'Sub_metering_3': 'float64'
+}
+
+NUMERIC_COLUMNS = [col for col, dtype in DTYPE_SCHEMA.items() if dtype == 'float64']
+
+# Months (1-12) map to seasons as in preprocessing/feature_engineering.get_season
+SEASONS = ['Winter', 'Spring', 'Summer', 'Autumn']
+MONTH_TO_SEASON = np.array([0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 0])
+
+def _cache_path(data_path):
+    name = os.path.splitext(os.path.basename(data_path))[0]
+    return os.path.join(CACHE_DIR, name)
+
+def _source_signature(data_path):
+    stat = os.stat(data_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+def _read_cache_manifest(cache_path, data_path):
+    manifest_path = os.path.join(cache_path, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
     
-    print("Loading dataset...")
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    
+    signature = _source_signature(data_path)
+    if any(manifest.get(key) != value for key, value in signature.items()):
+        return None
+    return manifest
+
+def _column_to_array(series, dtype):
+    if dtype == 'datetime64[ns]':
+        return pd.to_datetime(series).to_numpy(dtype='datetime64[ns]')
+    if dtype.startswith('<U'):
+        return series.astype(str).to_numpy(dtype=dtype)
+    return series.to_numpy(dtype=dtype)
+
+def build_dataset_cache(data_path=CLEANED_DATA_PATH):
+    print("  Building binary column cache from CSV...")
     df = pd.read_csv(data_path)
     
+    columns = {}
+    for col in df.columns:
+        if col in DTYPE_SCHEMA:
+            columns[col] = DTYPE_SCHEMA[col]
+        elif pd.api.types.is_numeric_dtype(df[col]):
+            columns[col] = 'float64'
+        else:
+            values = df[col].astype(str)
+            columns[col] = f'<U{max(values.str.len().max(), 1)}'
+    
+    cache_path = _cache_path(data_path)
+    tmp_path = f'{cache_path}.tmp-{os.getpid()}'
+    os.makedirs(tmp_path, exist_ok=True)
+    
+    for col, dtype in columns.items():
+        np.save(os.path.join(tmp_path, f'{col}.npy'), _column_to_array(df[col], dtype))
+    
+    manifest = {'source': os.path.basename(data_path), 'rows': len(df), 'columns': columns}
+    manifest.update(_source_signature(data_path))
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    
+    # Build in a private directory and swap it in, so a concurrent reader
+    # never sees a half-written cache. The old cache is renamed aside and
+    # only deleted once the new one is in place.
+    old_path = f'{cache_path}.old-{os.getpid()}'
+    try:
+        os.replace(cache_path, old_path)
+    except FileNotFoundError:
+        old_path = None
+    try:
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if not os.path.exists(os.path.join(cache_path, 'manifest.json')):
+            # Put the old cache back and keep the new build for inspection
+            if old_path:
+                os.replace(old_path, cache_path)
+            raise
+        # Another process swapped in its own build first; that one is used
+        shutil.rmtree(tmp_path, ignore_errors=True)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+    
+    print(f"  ✓ Cached {len(columns)} columns: {os.path.relpath(cache_path, project_root)}")
+    return manifest
+
+def load_final_dataset(columns=None, mmap=False, data_path=CLEANED_DATA_PATH):
+    print("Loading dataset...")
+    
+    cache_path = _cache_path(data_path)
+    manifest = _read_cache_manifest(cache_path, data_path)
+    if manifest is None:
+        manifest = build_dataset_cache(data_path)
+    
+    if columns is None:
+        columns = list(manifest['columns'])
+    missing = [col for col in columns if col not in manifest['columns']]
+    if missing:
+        raise KeyError(f"Columns not in dataset: {missing}")
+    
+    mmap_mode = 'r' if mmap else None
+    data = {col: np.load(os.path.join(cache_path, f'{col}.npy'), mmap_mode=mmap_mode) for col in columns}
+    df = pd.DataFrame(data, columns=columns, copy=False)
+    
     if 'DateTime' in df.columns:
-        df['DateTime'] = pd.to_datetime(df['DateTime'])
-        print(f"  ✓ DateTime column parsed")
+        print(f"  ✓ DateTime column loaded (datetime64)")
     
-    print(f"  ✓ Loaded: {df.shape[0]:,} rows × {df.shape[1]} columns")
+    print(f"  ✓ Loaded: {df.shape[0]:,} rows × {df.shape[1]} columns{' (memory-mapped)' if mmap else ''}")
     return df
 
+def iter_dataset_chunks(columns=None, chunksize=200_000, data_path=CLEANED_DATA_PATH):
+    # Streams the CSV directly, for datasets too large to load or cache whole.
+    dtype = {col: 'float64' for col in (columns or NUMERIC_COLUMNS) if DTYPE_SCHEMA.get(col) == 'float64'}
+    return pd.read_csv(data_path, usecols=columns, dtype=dtype, chunksize=chunksize)
+
 def get_numeric_features(df):
     exclude_cols = [
         'DateTime', 'Date', 'Time',
@@ -2,6 +2,7 @@ import argparse
 import csv
 import os
 import sys
+from contextlib import nullcontext
 from typing import Optional
 
 
@@ -89,4 +90,12 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+    # Instrumentation needs pandas, which this converter does not
+    try:
+        from instrumentation import run_manifest
+    except ImportError:
+        run_manifest = lambda script: nullcontext()
+
+    with run_manifest('convert_to_csv'):
+        main()
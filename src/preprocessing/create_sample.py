@@ -66,4 +66,8 @@ def main():
 
 
 if __name__ == '__main__':
-    main()
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis'))
+    from instrumentation import run_manifest
+
+    with run_manifest('create_sample'):
+        main()
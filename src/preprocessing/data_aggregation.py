@@ -1,10 +1,9 @@
+import argparse
 import pandas as pd
 import numpy as np
 import os
-
-print("="*80)
-print("AGREGIMI I TË DHËNAVE")
-print("="*80)
+import sys
+from partitioned_aggregation import aggregate_partitioned
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(script_dir, '../..')
@@ -12,302 +11,346 @@ project_root = os.path.join(script_dir, '../..')
 processed_dir = os.path.join(project_root, 'data/processed')
 aggregated_dir = os.path.join(project_root, 'data/aggregated')
 reports_analysis_dir = os.path.join(project_root, 'reports/analysis')
-os.makedirs(processed_dir, exist_ok=True)
-os.makedirs(aggregated_dir, exist_ok=True)
-os.makedirs(reports_analysis_dir, exist_ok=True)
-
-features_data_path = os.path.join(processed_dir, 'household_power_consumption_with_features.csv')
-df = pd.read_csv(features_data_path)
-df['DateTime'] = pd.to_datetime(df['DateTime'])
-df['Date_Only'] = df['DateTime'].dt.date
-
-print(f"\nDataset: {df.shape[0]:,} rreshta × {df.shape[1]} kolona")
-print(f"Periudha: {df['DateTime'].min()} deri {df['DateTime'].max()}")
-
-print("\n" + "-"*80)
-print("AGREGIM DITOR")
-print("-"*80)
-
-daily_agg = df.groupby('Date_Only').agg({
-    'Global_active_power': ['mean', 'sum', 'min', 'max', 'std'],
-    'Global_reactive_power': ['mean', 'sum'],
-    'Voltage': ['mean', 'min', 'max', 'std'],
-    'Global_intensity': ['mean', 'max'],
-    'Sub_metering_1': ['sum', 'mean', 'max'],
-    'Sub_metering_2': ['sum', 'mean', 'max'],
-    'Sub_metering_3': ['sum', 'mean', 'max'],
-    'Sub_metering_4': ['sum', 'mean', 'max'],
-    'Total_Sub_metering': ['sum', 'mean'],
-    'Energy_per_minute': ['sum']
-}).reset_index()
-
-daily_agg.columns = ['_'.join(col).strip('_') for col in daily_agg.columns.values]
-daily_agg.rename(columns={'Date_Only': 'Date'}, inplace=True)
-
-daily_agg['Daily_Energy_kWh'] = daily_agg['Energy_per_minute_sum']
-
-print(f"✓ Agregim ditor: {len(daily_agg)} ditë")
-print(f"\nShembull (5 ditë të para):")
-print(daily_agg[['Date', 'Global_active_power_mean', 'Global_active_power_sum', 
-                 'Daily_Energy_kWh', 'Voltage_mean']].head())
-
-daily_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_daily.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_daily.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM SIPAS ORËS (HOURLY PATTERNS)")
-print("-"*80)
-
-hourly_agg = df.groupby('Hour').agg({
-    'Global_active_power': ['mean', 'std', 'min', 'max'],
-    'Voltage': ['mean', 'std'],
-    'Global_intensity': ['mean', 'max'],
-    'Sub_metering_1': ['mean', 'max'],
-    'Sub_metering_2': ['mean', 'max'],
-    'Sub_metering_3': ['mean', 'max'],
-    'Sub_metering_4': ['mean', 'max'],
-    'Total_Sub_metering': ['mean']
-}).reset_index()
-
-hourly_agg.columns = ['_'.join(col).strip('_') for col in hourly_agg.columns.values]
-hourly_agg.rename(columns={'Hour': 'Hour'}, inplace=True)
-
-print(f"✓ Agregim sipas orës: {len(hourly_agg)} orë (0-23)")
-print(f"\nPattern konsumi sipas orës:")
-print(hourly_agg[['Hour', 'Global_active_power_mean', 'Global_active_power_max']])
-
-peak_hour = hourly_agg.loc[hourly_agg['Global_active_power_mean'].idxmax(), 'Hour']
-low_hour = hourly_agg.loc[hourly_agg['Global_active_power_mean'].idxmin(), 'Hour']
-print(f"\n✓ Peak hour: {int(peak_hour)}:00 ({hourly_agg.loc[hourly_agg['Hour'] == peak_hour, 'Global_active_power_mean'].values[0]:.2f} kW)")
-print(f"✓ Lowest hour: {int(low_hour)}:00 ({hourly_agg.loc[hourly_agg['Hour'] == low_hour, 'Global_active_power_mean'].values[0]:.2f} kW)")
-
-hourly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_hourly.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_hourly.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM JAVOR (WEEKDAY vs WEEKEND)")
-print("-"*80)
-
-df['Day_Type'] = df['IsWeekend'].map({0: 'Weekday', 1: 'Weekend'})
-
-weekly_agg = df.groupby('Day_Type').agg({
-    'Global_active_power': ['mean', 'std', 'min', 'max'],
-    'Voltage': ['mean'],
-    'Global_intensity': ['mean'],
-    'Sub_metering_1': ['mean', 'sum'],
-    'Sub_metering_2': ['mean', 'sum'],
-    'Sub_metering_3': ['mean', 'sum'],
-    'Sub_metering_4': ['mean', 'sum'],
-    'Total_Sub_metering': ['mean', 'sum']
-}).reset_index()
-
-weekly_agg.columns = ['_'.join(col).strip('_') for col in weekly_agg.columns.values]
-weekly_agg.rename(columns={'Day_Type': 'Day_Type'}, inplace=True)
-
-print(f"✓ Agregim javor:")
-print(weekly_agg[['Day_Type', 'Global_active_power_mean', 'Global_active_power_std']])
-
-weekday_mean = weekly_agg.loc[weekly_agg['Day_Type'] == 'Weekday', 'Global_active_power_mean'].values[0]
-weekend_mean = weekly_agg.loc[weekly_agg['Day_Type'] == 'Weekend', 'Global_active_power_mean'].values[0]
-diff_pct = ((weekend_mean - weekday_mean) / weekday_mean) * 100
-
-print(f"\n✓ Weekday mesatar: {weekday_mean:.3f} kW")
-print(f"✓ Weekend mesatar: {weekend_mean:.3f} kW")
-print(f"✓ Ndryshimi: {diff_pct:+.1f}%")
-
-weekly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_weekly.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_weekly.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM MUJOR (MONTHLY TRENDS)")
-print("-"*80)
-
-df['Year_Month'] = df['DateTime'].dt.to_period('M')
-
-monthly_agg = df.groupby('Year_Month').agg({
-    'Global_active_power': ['mean', 'sum', 'std'],
-    'Voltage': ['mean'],
-    'Global_intensity': ['mean'],
-    'Sub_metering_1': ['sum', 'mean'],
-    'Sub_metering_2': ['sum', 'mean'],
-    'Sub_metering_3': ['sum', 'mean'],
-    'Sub_metering_4': ['sum', 'mean'],
-    'Total_Sub_metering': ['sum', 'mean'],
-    'Energy_per_minute': ['sum']
-}).reset_index()
-
-monthly_agg.columns = ['_'.join(col).strip('_') for col in monthly_agg.columns.values]
-monthly_agg.rename(columns={'Year_Month': 'Year_Month'}, inplace=True)
-monthly_agg['Year_Month'] = monthly_agg['Year_Month'].astype(str)
-
-print(f"✓ Agregim mujor: {len(monthly_agg)} muaj")
-print(f"\nShembull (6 muaj të parë):")
-print(monthly_agg[['Year_Month', 'Global_active_power_mean', 'Global_active_power_sum']].head(6))
-
-monthly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_monthly.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_monthly.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM SIPAS SEZONAVE")
-print("-"*80)
-
-seasonal_agg = df.groupby('Season').agg({
-    'Global_active_power': ['mean', 'std', 'min', 'max'],
-    'Voltage': ['mean'],
-    'Sub_metering_1': ['mean', 'sum'],
-    'Sub_metering_2': ['mean', 'sum'],
-    'Sub_metering_3': ['mean', 'sum'],
-    'Sub_metering_4': ['mean', 'sum'],
-    'Total_Sub_metering': ['mean', 'sum']
-}).reset_index()
-
-seasonal_agg.columns = ['_'.join(col).strip('_') for col in seasonal_agg.columns.values]
-seasonal_agg.rename(columns={'Season': 'Season'}, inplace=True)
-
-season_order = ['Winter', 'Spring', 'Summer', 'Autumn']
-seasonal_agg['Season'] = pd.Categorical(seasonal_agg['Season'], categories=season_order, ordered=True)
-seasonal_agg = seasonal_agg.sort_values('Season')
-
-print(f"✓ Agregim sezonat:")
-print(seasonal_agg[['Season', 'Global_active_power_mean', 'Global_active_power_std']])
-
-highest_season = seasonal_agg.loc[seasonal_agg['Global_active_power_mean'].idxmax(), 'Season']
-lowest_season = seasonal_agg.loc[seasonal_agg['Global_active_power_mean'].idxmin(), 'Season']
-print(f"\n✓ Sezona me konsim më të lartë: {highest_season}")
-print(f"✓ Sezona me konsim më të ulët: {lowest_season}")
-
-seasonal_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_seasonal.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_seasonal.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM SIPAS PJESËS SË DITËS")
-print("-"*80)
-
-timeofday_agg = df.groupby('TimeOfDay').agg({
-    'Global_active_power': ['mean', 'std', 'max'],
-    'Sub_metering_1': ['mean'],
-    'Sub_metering_2': ['mean'],
-    'Sub_metering_3': ['mean'],
-    'Sub_metering_4': ['mean'],
-    'Total_Sub_metering': ['mean']
-}).reset_index()
-
-timeofday_agg.columns = ['_'.join(col).strip('_') for col in timeofday_agg.columns.values]
-timeofday_agg.rename(columns={'TimeOfDay': 'TimeOfDay'}, inplace=True)
-
-time_order = ['Morning', 'Afternoon', 'Evening', 'Night']
-timeofday_agg['TimeOfDay'] = pd.Categorical(timeofday_agg['TimeOfDay'], categories=time_order, ordered=True)
-timeofday_agg = timeofday_agg.sort_values('TimeOfDay')
-
-print(f"✓ Agregim sipas pjesës së ditës:")
-print(timeofday_agg[['TimeOfDay', 'Global_active_power_mean', 'Global_active_power_max']])
-
-timeofday_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_timeofday.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_timeofday.csv")
-
-print("\n" + "-"*80)
-print("AGREGIM KOMBINUAR (HOUR × WEEKEND)")
-print("-"*80)
-
-hour_weekend_agg = df.groupby(['Hour', 'Day_Type']).agg({
-    'Global_active_power': ['mean', 'std'],
-    'Total_Sub_metering': ['mean']
-}).reset_index()
-
-hour_weekend_agg.columns = ['_'.join(col).strip('_') for col in hour_weekend_agg.columns.values]
-hour_weekend_agg.rename(columns={'Hour': 'Hour', 'Day_Type': 'Day_Type'}, inplace=True)
-
-print(f"✓ Agregim Hour × Day_Type: {len(hour_weekend_agg)} kombinime")
-print(f"\nShembull (8:00-12:00):")
-print(hour_weekend_agg[(hour_weekend_agg['Hour'] >= 8) & (hour_weekend_agg['Hour'] <= 12)][['Hour', 'Day_Type', 'Global_active_power_mean']])
-
-hour_weekend_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_hour_weekend.csv'), index=False)
-print(f"\n✓ Ruajtur: aggregation_hour_weekend.csv")
-
-print("\n" + "-"*80)
-print("KRIJIMI I RAPORTIT")
-print("-"*80)
-
-with open(os.path.join(reports_analysis_dir, 'aggregation_report.txt'), 'w', encoding='utf-8') as f:
-    f.write("RAPORTI I AGREGIMIT TË TË DHËNAVE\n")
-    f.write("="*80 + "\n\n")
-    f.write(f"Dataset origjinal: {df.shape[0]:,} rreshta\n")
-    f.write(f"Periudha: {df['DateTime'].min()} - {df['DateTime'].max()}\n\n")
-    
-    f.write("-"*80 + "\n")
-    f.write("AGREGIMET E KRIJUARA\n")
-    f.write("-"*80 + "\n\n")
-    
-    f.write(f"1. DITOR (aggregation_daily.csv)\n")
-    f.write(f"   Rreshta: {len(daily_agg)}\n")
-    f.write(f"   Periudha: Çdo ditë\n")
-    f.write(f"   Statistika: mean, sum, min, max, std\n\n")
-    
-    f.write(f"2. SIPAS ORËS (aggregation_hourly.csv)\n")
-    f.write(f"   Rreshta: {len(hourly_agg)}\n")
-    f.write(f"   Pattern: 24 orë (0-23)\n")
-    f.write(f"   Peak hour: {int(peak_hour)}:00\n")
-    f.write(f"   Lowest hour: {int(low_hour)}:00\n\n")
-    
-    f.write(f"3. JAVOR (aggregation_weekly.csv)\n")
-    f.write(f"   Rreshta: {len(weekly_agg)}\n")
-    f.write(f"   Kategori: Weekday vs Weekend\n")
-    f.write(f"   Weekday mean: {weekday_mean:.3f} kW\n")
-    f.write(f"   Weekend mean: {weekend_mean:.3f} kW\n")
-    f.write(f"   Ndryshimi: {diff_pct:+.1f}%\n\n")
-    
-    f.write(f"4. MUJOR (aggregation_monthly.csv)\n")
-    f.write(f"   Rreshta: {len(monthly_agg)}\n")
-    f.write(f"   Periudha: {monthly_agg['Year_Month'].min()} - {monthly_agg['Year_Month'].max()}\n\n")
-    
-    f.write(f"5. SEZONAT (aggregation_seasonal.csv)\n")
-    f.write(f"   Rreshta: {len(seasonal_agg)}\n")
-    f.write(f"   Kategori: Winter, Spring, Summer, Autumn\n")
-    f.write(f"   Highest: {highest_season}\n")
-    f.write(f"   Lowest: {lowest_season}\n\n")
-    
-    f.write(f"6. PJESA E DITËS (aggregation_timeofday.csv)\n")
-    f.write(f"   Rreshta: {len(timeofday_agg)}\n")
-    f.write(f"   Kategori: Morning, Afternoon, Evening, Night\n\n")
-    
-    f.write(f"7. HOUR × WEEKEND (aggregation_hour_weekend.csv)\n")
-    f.write(f"   Rreshta: {len(hour_weekend_agg)}\n")
-    f.write(f"   Kombinime: 24 orë × 2 day types\n\n")
-    
-    f.write("-"*80 + "\n")
-    f.write("INSIGHTS\n")
-    f.write("-"*80 + "\n\n")
-    f.write(f"Peak consumption hour: {int(peak_hour)}:00\n")
-    f.write(f"Lowest consumption hour: {int(low_hour)}:00\n")
-    f.write(f"Weekend vs Weekday: {diff_pct:+.1f}%\n")
-    f.write(f"Highest season: {highest_season}\n")
-    f.write(f"Lowest season: {lowest_season}\n")
-
-print(f"✓ Raport u ruajt: {os.path.join(reports_analysis_dir, 'aggregation_report.txt')}")
-
-print("\n" + "="*80)
-print("PËRMBLEDHJE E AGREGIMIT")
-print("="*80)
-
-print(f"\n✓ 7 agregimet u krijuan:")
-print(f"  1. Daily: {len(daily_agg)} ditë")
-print(f"  2. Hourly: {len(hourly_agg)} orë")
-print(f"  3. Weekly: {len(weekly_agg)} kategori")
-print(f"  4. Monthly: {len(monthly_agg)} muaj")
-print(f"  5. Seasonal: {len(seasonal_agg)} sezona")
-print(f"  6. TimeOfDay: {len(timeofday_agg)} kategori")
-print(f"  7. Hour×Weekend: {len(hour_weekend_agg)} kombinime")
-
-print("\n✓ Files të ruajtura:")
-print("  - aggregation_daily.csv")
-print("  - aggregation_hourly.csv")
-print("  - aggregation_weekly.csv")
-print("  - aggregation_monthly.csv")
-print("  - aggregation_seasonal.csv")
-print("  - aggregation_timeofday.csv")
-print("  - aggregation_hour_weekend.csv")
-print("  - aggregation_report.txt")
-
-print("\n" + "="*80)
-print("✓ Agregimi përfundoi me sukses!")
-print("="*80)
+
+AGGREGATION_SPECS = {
+    'daily': (['Date_Only'], {
+        'Global_active_power': ['mean', 'sum', 'min', 'max', 'std'],
+        'Global_reactive_power': ['mean', 'sum'],
+        'Voltage': ['mean', 'min', 'max', 'std'],
+        'Global_intensity': ['mean', 'max'],
+        'Sub_metering_1': ['sum', 'mean', 'max'],
+        'Sub_metering_2': ['sum', 'mean', 'max'],
+        'Sub_metering_3': ['sum', 'mean', 'max'],
+        'Sub_metering_4': ['sum', 'mean', 'max'],
+        'Total_Sub_metering': ['sum', 'mean'],
+        'Energy_per_minute': ['sum']
+    }),
+    'hourly': (['Hour'], {
+        'Global_active_power': ['mean', 'std', 'min', 'max'],
+        'Voltage': ['mean', 'std'],
+        'Global_intensity': ['mean', 'max'],
+        'Sub_metering_1': ['mean', 'max'],
+        'Sub_metering_2': ['mean', 'max'],
+        'Sub_metering_3': ['mean', 'max'],
+        'Sub_metering_4': ['mean', 'max'],
+        'Total_Sub_metering': ['mean']
+    }),
+    'weekly': (['Day_Type'], {
+        'Global_active_power': ['mean', 'std', 'min', 'max'],
+        'Voltage': ['mean'],
+        'Global_intensity': ['mean'],
+        'Sub_metering_1': ['mean', 'sum'],
+        'Sub_metering_2': ['mean', 'sum'],
+        'Sub_metering_3': ['mean', 'sum'],
+        'Sub_metering_4': ['mean', 'sum'],
+        'Total_Sub_metering': ['mean', 'sum']
+    }),
+    'monthly': (['Year_Month'], {
+        'Global_active_power': ['mean', 'sum', 'std'],
+        'Voltage': ['mean'],
+        'Global_intensity': ['mean'],
+        'Sub_metering_1': ['sum', 'mean'],
+        'Sub_metering_2': ['sum', 'mean'],
+        'Sub_metering_3': ['sum', 'mean'],
+        'Sub_metering_4': ['sum', 'mean'],
+        'Total_Sub_metering': ['sum', 'mean'],
+        'Energy_per_minute': ['sum']
+    }),
+    'seasonal': (['Season'], {
+        'Global_active_power': ['mean', 'std', 'min', 'max'],
+        'Voltage': ['mean'],
+        'Sub_metering_1': ['mean', 'sum'],
+        'Sub_metering_2': ['mean', 'sum'],
+        'Sub_metering_3': ['mean', 'sum'],
+        'Sub_metering_4': ['mean', 'sum'],
+        'Total_Sub_metering': ['mean', 'sum']
+    }),
+    'timeofday': (['TimeOfDay'], {
+        'Global_active_power': ['mean', 'std', 'max'],
+        'Sub_metering_1': ['mean'],
+        'Sub_metering_2': ['mean'],
+        'Sub_metering_3': ['mean'],
+        'Sub_metering_4': ['mean'],
+        'Total_Sub_metering': ['mean']
+    }),
+    'hour_weekend': (['Hour', 'Day_Type'], {
+        'Global_active_power': ['mean', 'std'],
+        'Total_Sub_metering': ['mean']
+    })
+}
+
+def load_features_dataset(df=None):
+    if df is None:
+        features_data_path = os.path.join(processed_dir, 'household_power_consumption_with_features.csv')
+        df = pd.read_csv(features_data_path)
+    else:
+        df = df.copy()
+    df['DateTime'] = pd.to_datetime(df['DateTime'])
+    df['Date_Only'] = df['DateTime'].dt.date
+    df['Day_Type'] = df['IsWeekend'].map({0: 'Weekday', 1: 'Weekend'})
+    df['Year_Month'] = df['DateTime'].dt.to_period('M')
+    return df
+
+def compute_aggregations(df, workers=None):
+    # Partitioned mode splits rows by Year_Month and merges partial statistics
+    # in partition order, so its output does not depend on the worker count.
+    if workers:
+        return aggregate_partitioned(df, AGGREGATION_SPECS, partition_column='Year_Month', workers=workers)
+
+    aggregations = {}
+    for name, (keys, spec) in AGGREGATION_SPECS.items():
+        agg = df.groupby(keys).agg(spec).reset_index()
+        agg.columns = ['_'.join(col).strip('_') for col in agg.columns.values]
+        aggregations[name] = agg
+    return aggregations
+
+def main(df=None, workers=None):
+    print("="*80)
+    print("AGREGIMI I TË DHËNAVE")
+    print("="*80)
+
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(aggregated_dir, exist_ok=True)
+    os.makedirs(reports_analysis_dir, exist_ok=True)
+
+    df = load_features_dataset(df)
+
+    print(f"\nDataset: {df.shape[0]:,} rreshta × {df.shape[1]} kolona")
+    print(f"Periudha: {df['DateTime'].min()} deri {df['DateTime'].max()}")
+    if workers:
+        print(f"Mënyra: particione vit-muaj me {workers} procese")
+
+    aggregations = compute_aggregations(df, workers=workers)
+
+    print("\n" + "-"*80)
+    print("AGREGIM DITOR")
+    print("-"*80)
+
+    daily_agg = aggregations['daily']
+    daily_agg.rename(columns={'Date_Only': 'Date'}, inplace=True)
+
+    daily_agg['Daily_Energy_kWh'] = daily_agg['Energy_per_minute_sum']
+
+    print(f"✓ Agregim ditor: {len(daily_agg)} ditë")
+    print(f"\nShembull (5 ditë të para):")
+    print(daily_agg[['Date', 'Global_active_power_mean', 'Global_active_power_sum', 
+                     'Daily_Energy_kWh', 'Voltage_mean']].head())
+
+    daily_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_daily.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_daily.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM SIPAS ORËS (HOURLY PATTERNS)")
+    print("-"*80)
+
+    hourly_agg = aggregations['hourly']
+
+    print(f"✓ Agregim sipas orës: {len(hourly_agg)} orë (0-23)")
+    print(f"\nPattern konsumi sipas orës:")
+    print(hourly_agg[['Hour', 'Global_active_power_mean', 'Global_active_power_max']])
+
+    peak_hour = hourly_agg.loc[hourly_agg['Global_active_power_mean'].idxmax(), 'Hour']
+    low_hour = hourly_agg.loc[hourly_agg['Global_active_power_mean'].idxmin(), 'Hour']
+    print(f"\n✓ Peak hour: {int(peak_hour)}:00 ({hourly_agg.loc[hourly_agg['Hour'] == peak_hour, 'Global_active_power_mean'].values[0]:.2f} kW)")
+    print(f"✓ Lowest hour: {int(low_hour)}:00 ({hourly_agg.loc[hourly_agg['Hour'] == low_hour, 'Global_active_power_mean'].values[0]:.2f} kW)")
+
+    hourly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_hourly.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_hourly.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM JAVOR (WEEKDAY vs WEEKEND)")
+    print("-"*80)
+
+    weekly_agg = aggregations['weekly']
+
+    print(f"✓ Agregim javor:")
+    print(weekly_agg[['Day_Type', 'Global_active_power_mean', 'Global_active_power_std']])
+
+    weekday_mean = weekly_agg.loc[weekly_agg['Day_Type'] == 'Weekday', 'Global_active_power_mean'].values[0]
+    weekend_mean = weekly_agg.loc[weekly_agg['Day_Type'] == 'Weekend', 'Global_active_power_mean'].values[0]
+    diff_pct = ((weekend_mean - weekday_mean) / weekday_mean) * 100
+
+    print(f"\n✓ Weekday mesatar: {weekday_mean:.3f} kW")
+    print(f"✓ Weekend mesatar: {weekend_mean:.3f} kW")
+    print(f"✓ Ndryshimi: {diff_pct:+.1f}%")
+
+    weekly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_weekly.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_weekly.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM MUJOR (MONTHLY TRENDS)")
+    print("-"*80)
+
+    monthly_agg = aggregations['monthly']
+    monthly_agg['Year_Month'] = monthly_agg['Year_Month'].astype(str)
+
+    print(f"✓ Agregim mujor: {len(monthly_agg)} muaj")
+    print(f"\nShembull (6 muaj të parë):")
+    print(monthly_agg[['Year_Month', 'Global_active_power_mean', 'Global_active_power_sum']].head(6))
+
+    monthly_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_monthly.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_monthly.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM SIPAS SEZONAVE")
+    print("-"*80)
+
+    seasonal_agg = aggregations['seasonal']
+
+    season_order = ['Winter', 'Spring', 'Summer', 'Autumn']
+    seasonal_agg['Season'] = pd.Categorical(seasonal_agg['Season'], categories=season_order, ordered=True)
+    seasonal_agg = seasonal_agg.sort_values('Season')
+
+    print(f"✓ Agregim sezonat:")
+    print(seasonal_agg[['Season', 'Global_active_power_mean', 'Global_active_power_std']])
+
+    highest_season = seasonal_agg.loc[seasonal_agg['Global_active_power_mean'].idxmax(), 'Season']
+    lowest_season = seasonal_agg.loc[seasonal_agg['Global_active_power_mean'].idxmin(), 'Season']
+    print(f"\n✓ Sezona me konsim më të lartë: {highest_season}")
+    print(f"✓ Sezona me konsim më të ulët: {lowest_season}")
+
+    seasonal_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_seasonal.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_seasonal.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM SIPAS PJESËS SË DITËS")
+    print("-"*80)
+
+    timeofday_agg = aggregations['timeofday']
+
+    time_order = ['Morning', 'Afternoon', 'Evening', 'Night']
+    timeofday_agg['TimeOfDay'] = pd.Categorical(timeofday_agg['TimeOfDay'], categories=time_order, ordered=True)
+    timeofday_agg = timeofday_agg.sort_values('TimeOfDay')
+
+    print(f"✓ Agregim sipas pjesës së ditës:")
+    print(timeofday_agg[['TimeOfDay', 'Global_active_power_mean', 'Global_active_power_max']])
+
+    timeofday_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_timeofday.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_timeofday.csv")
+
+    print("\n" + "-"*80)
+    print("AGREGIM KOMBINUAR (HOUR × WEEKEND)")
+    print("-"*80)
+
+    hour_weekend_agg = aggregations['hour_weekend']
+
+    print(f"✓ Agregim Hour × Day_Type: {len(hour_weekend_agg)} kombinime")
+    print(f"\nShembull (8:00-12:00):")
+    print(hour_weekend_agg[(hour_weekend_agg['Hour'] >= 8) & (hour_weekend_agg['Hour'] <= 12)][['Hour', 'Day_Type', 'Global_active_power_mean']])
+
+    hour_weekend_agg.to_csv(os.path.join(aggregated_dir, 'aggregation_hour_weekend.csv'), index=False)
+    print(f"\n✓ Ruajtur: aggregation_hour_weekend.csv")
+
+    print("\n" + "-"*80)
+    print("KRIJIMI I RAPORTIT")
+    print("-"*80)
+
+    with open(os.path.join(reports_analysis_dir, 'aggregation_report.txt'), 'w', encoding='utf-8') as f:
+        f.write("RAPORTI I AGREGIMIT TË TË DHËNAVE\n")
+        f.write("="*80 + "\n\n")
+        f.write(f"Dataset origjinal: {df.shape[0]:,} rreshta\n")
+        f.write(f"Periudha: {df['DateTime'].min()} - {df['DateTime'].max()}\n\n")
+
+        f.write("-"*80 + "\n")
+        f.write("AGREGIMET E KRIJUARA\n")
+        f.write("-"*80 + "\n\n")
+
+        f.write(f"1. DITOR (aggregation_daily.csv)\n")
+        f.write(f"   Rreshta: {len(daily_agg)}\n")
+        f.write(f"   Periudha: Çdo ditë\n")
+        f.write(f"   Statistika: mean, sum, min, max, std\n\n")
+
+        f.write(f"2. SIPAS ORËS (aggregation_hourly.csv)\n")
+        f.write(f"   Rreshta: {len(hourly_agg)}\n")
+        f.write(f"   Pattern: 24 orë (0-23)\n")
+        f.write(f"   Peak hour: {int(peak_hour)}:00\n")
+        f.write(f"   Lowest hour: {int(low_hour)}:00\n\n")
+
+        f.write(f"3. JAVOR (aggregation_weekly.csv)\n")
+        f.write(f"   Rreshta: {len(weekly_agg)}\n")
+        f.write(f"   Kategori: Weekday vs Weekend\n")
+        f.write(f"   Weekday mean: {weekday_mean:.3f} kW\n")
+        f.write(f"   Weekend mean: {weekend_mean:.3f} kW\n")
+        f.write(f"   Ndryshimi: {diff_pct:+.1f}%\n\n")
+
+        f.write(f"4. MUJOR (aggregation_monthly.csv)\n")
+        f.write(f"   Rreshta: {len(monthly_agg)}\n")
+        f.write(f"   Periudha: {monthly_agg['Year_Month'].min()} - {monthly_agg['Year_Month'].max()}\n\n")
+
+        f.write(f"5. SEZONAT (aggregation_seasonal.csv)\n")
+        f.write(f"   Rreshta: {len(seasonal_agg)}\n")
+        f.write(f"   Kategori: Winter, Spring, Summer, Autumn\n")
+        f.write(f"   Highest: {highest_season}\n")
+        f.write(f"   Lowest: {lowest_season}\n\n")
+
+        f.write(f"6. PJESA E DITËS (aggregation_timeofday.csv)\n")
+        f.write(f"   Rreshta: {len(timeofday_agg)}\n")
+        f.write(f"   Kategori: Morning, Afternoon, Evening, Night\n\n")
+
+        f.write(f"7. HOUR × WEEKEND (aggregation_hour_weekend.csv)\n")
+        f.write(f"   Rreshta: {len(hour_weekend_agg)}\n")
+        f.write(f"   Kombinime: 24 orë × 2 day types\n\n")
+
+        f.write("-"*80 + "\n")
+        f.write("INSIGHTS\n")
+        f.write("-"*80 + "\n\n")
+        f.write(f"Peak consumption hour: {int(peak_hour)}:00\n")
+        f.write(f"Lowest consumption hour: {int(low_hour)}:00\n")
+        f.write(f"Weekend vs Weekday: {diff_pct:+.1f}%\n")
+        f.write(f"Highest season: {highest_season}\n")
+        f.write(f"Lowest season: {lowest_season}\n")
+
+    print(f"✓ Raport u ruajt: {os.path.join(reports_analysis_dir, 'aggregation_report.txt')}")
+
+    print("\n" + "="*80)
+    print("PËRMBLEDHJE E AGREGIMIT")
+    print("="*80)
+
+    print(f"\n✓ 7 agregimet u krijuan:")
+    print(f"  1. Daily: {len(daily_agg)} ditë")
+    print(f"  2. Hourly: {len(hourly_agg)} orë")
+    print(f"  3. Weekly: {len(weekly_agg)} kategori")
+    print(f"  4. Monthly: {len(monthly_agg)} muaj")
+    print(f"  5. Seasonal: {len(seasonal_agg)} sezona")
+    print(f"  6. TimeOfDay: {len(timeofday_agg)} kategori")
+    print(f"  7. Hour×Weekend: {len(hour_weekend_agg)} kombinime")
+
+    print("\n✓ Files të ruajtura:")
+    print("  - aggregation_daily.csv")
+    print("  - aggregation_hourly.csv")
+    print("  - aggregation_weekly.csv")
+    print("  - aggregation_monthly.csv")
+    print("  - aggregation_seasonal.csv")
+    print("  - aggregation_timeofday.csv")
+    print("  - aggregation_hour_weekend.csv")
+    print("  - aggregation_report.txt")
+
+    print("\n" + "="*80)
+    print("✓ Agregimi përfundoi me sukses!")
+    print("="*80)
+
+    return {
+        'daily': daily_agg,
+        'hourly': hourly_agg,
+        'weekly': weekly_agg,
+        'monthly': monthly_agg,
+        'seasonal': seasonal_agg,
+        'timeofday': timeofday_agg,
+        'hour_weekend': hour_weekend_agg
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create the seven aggregated views of the featured dataset.')
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=None,
+        help='Aggregate year-month partitions in a process pool with N workers (default: single pass)'
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.join(script_dir, '..', 'analysis'))
+    from instrumentation import run_manifest
+
+    with run_manifest('data_aggregation'):
+        main(workers=args.workers)
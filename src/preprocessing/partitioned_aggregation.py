@@ -0,0 +1,190 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+def encode_group_keys(df, key_columns):
+    codes = {}
+    uniques = {}
+    for col in key_columns:
+        col_codes, col_uniques = pd.factorize(df[col], sort=True)
+        codes[col] = col_codes.astype(np.int64)
+        uniques[col] = col_uniques
+    return codes, uniques
+
+
+def _combined_codes(key_block, radices):
+    combined = np.zeros(len(key_block), dtype=np.int64)
+    for j, radix in enumerate(radices):
+        combined = combined * radix + key_block[:, j]
+    return combined
+
+
+def _partial_statistics(values, group_codes):
+    uniq, inverse = np.unique(group_codes, return_inverse=True)
+    n_groups = len(uniq)
+    n_cols = values.shape[1]
+
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+
+    count = np.empty((n_groups, n_cols))
+    total = np.empty((n_groups, n_cols))
+    m2 = np.empty((n_groups, n_cols))
+    for c in range(n_cols):
+        count[:, c] = np.bincount(inverse, weights=valid[:, c], minlength=n_groups)
+        total[:, c] = np.bincount(inverse, weights=filled[:, c], minlength=n_groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+    for c in range(n_cols):
+        deviation = np.where(valid[:, c], filled[:, c] - mean[inverse, c], 0.0)
+        m2[:, c] = np.bincount(inverse, weights=deviation ** 2, minlength=n_groups)
+
+    order = np.argsort(inverse, kind='stable')
+    starts = np.searchsorted(inverse[order], np.arange(n_groups))
+    ordered = values[order]
+    minimum = np.fmin.reduceat(ordered, starts, axis=0)
+    maximum = np.fmax.reduceat(ordered, starts, axis=0)
+
+    return uniq, count, total, m2, minimum, maximum
+
+
+def _aggregate_partition(task):
+    values_path, keys_path, start, stop, plans = task
+    values = np.load(values_path, mmap_mode='r')
+    keys = np.load(keys_path, mmap_mode='r')
+
+    partials = []
+    for key_idx, radices, value_idx in plans:
+        block_values = np.asarray(values[start:stop][:, value_idx])
+        block_keys = np.asarray(keys[start:stop][:, key_idx])
+        group_codes = _combined_codes(block_keys, radices)
+        partials.append(_partial_statistics(block_values, group_codes))
+    return partials
+
+
+def _merge_partials(partials):
+    all_keys = np.unique(np.concatenate([p[0] for p in partials]))
+    n_cols = partials[0][1].shape[1]
+    shape = (len(all_keys), n_cols)
+
+    count = np.zeros(shape)
+    total = np.zeros(shape)
+    m2 = np.zeros(shape)
+    minimum = np.full(shape, np.nan)
+    maximum = np.full(shape, np.nan)
+
+    # Partials arrive in partition order, so the floating-point merge order
+    # never depends on how many workers produced them.
+    for uniq, p_count, p_total, p_m2, p_min, p_max in partials:
+        idx = np.searchsorted(all_keys, uniq)
+        n_a = count[idx]
+        new_count = n_a + p_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = p_total / p_count - total[idx] / n_a
+            correction = delta ** 2 * n_a * p_count / new_count
+        correction = np.where((n_a > 0) & (p_count > 0), correction, 0.0)
+
+        m2[idx] = m2[idx] + p_m2 + correction
+        total[idx] = total[idx] + p_total
+        count[idx] = new_count
+        minimum[idx] = np.fmin(minimum[idx], p_min)
+        maximum[idx] = np.fmax(maximum[idx], p_max)
+
+    return all_keys, count, total, m2, minimum, maximum
+
+
+def _finalize_statistic(stat, count, total, m2, minimum, maximum):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if stat == 'mean':
+            return total / count
+        if stat == 'sum':
+            return total
+        if stat == 'min':
+            return minimum
+        if stat == 'max':
+            return maximum
+        if stat == 'count':
+            return count
+        if stat in ('std', 'var'):
+            var = np.where(count > 1, m2 / (count - 1), np.nan)
+            return np.sqrt(var) if stat == 'std' else var
+    raise ValueError(f"Unsupported statistic for partitioned aggregation: {stat}")
+
+
+def aggregate_partitioned(df, specs, partition_column='Year_Month', workers=None):
+    key_columns = sorted({col for keys, _ in specs.values() for col in keys} | {partition_column})
+    value_columns = sorted({col for _, spec in specs.values() for col in spec})
+
+    codes, uniques = encode_group_keys(df, key_columns)
+
+    order = np.argsort(codes[partition_column], kind='stable')
+    partition_codes = codes[partition_column][order]
+    _, starts = np.unique(partition_codes, return_index=True)
+    bounds = list(zip(starts, list(starts[1:]) + [len(df)]))
+
+    tmp_dir = tempfile.mkdtemp(prefix='aggregation_')
+    try:
+        values_path = os.path.join(tmp_dir, 'values.npy')
+        keys_path = os.path.join(tmp_dir, 'keys.npy')
+
+        values_mm = np.lib.format.open_memmap(values_path, mode='w+', dtype=np.float64,
+                                              shape=(len(df), len(value_columns)))
+        for j, col in enumerate(value_columns):
+            values_mm[:, j] = df[col].to_numpy(dtype=np.float64)[order]
+        values_mm.flush()
+        del values_mm
+
+        keys_mm = np.lib.format.open_memmap(keys_path, mode='w+', dtype=np.int64,
+                                            shape=(len(df), len(key_columns)))
+        for j, col in enumerate(key_columns):
+            keys_mm[:, j] = codes[col][order]
+        keys_mm.flush()
+        del keys_mm
+
+        plans = []
+        for keys, spec in specs.values():
+            key_idx = [key_columns.index(col) for col in keys]
+            radices = [len(uniques[col]) for col in keys]
+            value_idx = [value_columns.index(col) for col in spec]
+            plans.append((key_idx, radices, value_idx))
+
+        tasks = [(values_path, keys_path, int(start), int(stop), plans) for start, stop in bounds]
+
+        if workers and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                partition_results = list(executor.map(_aggregate_partition, tasks))
+        else:
+            partition_results = [_aggregate_partition(task) for task in tasks]
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    aggregations = {}
+    for spec_idx, (name, (keys, spec)) in enumerate(specs.items()):
+        merged = _merge_partials([result[spec_idx] for result in partition_results])
+        group_codes, count, total, m2, minimum, maximum = merged
+
+        result = {}
+        remaining = group_codes
+        decoded = []
+        for col in reversed(keys):
+            radix = len(uniques[col])
+            decoded.append((col, uniques[col][remaining % radix]))
+            remaining = remaining // radix
+        for col, col_values in reversed(decoded):
+            result[col] = np.asarray(col_values)
+
+        for j, (col, stats) in enumerate(spec.items()):
+            for stat in stats:
+                result[f'{col}_{stat}'] = _finalize_statistic(
+                    stat, count[:, j], total[:, j], m2[:, j], minimum[:, j], maximum[:, j]
+                )
+
+        aggregations[name] = pd.DataFrame(result)
+
+    return aggregations
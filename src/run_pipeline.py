@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import pandas as pd
+
+src_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.join(src_dir, '..')
+sys.path.insert(0, os.path.join(src_dir, 'preprocessing'))
+sys.path.insert(0, os.path.join(src_dir, 'analysis'))
+
+from utils import print_section_header
+from instrumentation import track_stage, count_rows, pop_stage_records, write_run_manifest
+
+STATE_DIR = os.path.join(project_root, 'data/processed/cache/pipeline')
+RAW_DATA_PATH = os.path.join(project_root, 'data/raw/household_power_consumption_sample.txt')
+
+# Each stage's main() receives the outputs of its inputs positionally, in the
+# order listed here, followed by its params as keyword arguments.
+STAGES = {
+    'cleaning': {'module': 'data_cleaning', 'inputs': [], 'sources': [RAW_DATA_PATH]},
+    'feature_engineering': {'module': 'feature_engineering', 'inputs': ['cleaning']},
+    'aggregation': {'module': 'data_aggregation', 'inputs': ['feature_engineering'], 'params': {'workers': None}},
+    'transformation': {'module': 'data_transformation', 'inputs': ['feature_engineering']},
+    'feature_selection': {'module': 'feature_selection', 'inputs': ['transformation']},
+    'feature_summary': {'module': 'feature_summary', 'inputs': ['cleaning']},
+    'enhanced_statistics': {'module': 'enhanced_statistics', 'inputs': ['cleaning', 'feature_summary']},
+    'distribution_analysis': {'module': 'distribution_analysis', 'inputs': ['feature_summary']},
+    'correlation_analysis': {'module': 'correlation_analysis', 'inputs': ['cleaning']},
+    'feature_matrix': {'module': 'feature_matrix', 'inputs': ['cleaning']},
+    'pca_analysis': {'module': 'pca_analysis', 'inputs': ['cleaning', 'feature_matrix']},
+    'outlier_zscore': {'module': 'outlier_zscore', 'inputs': ['cleaning']},
+    'outlier_isolation_forest': {'module': 'outlier_isolation_forest', 'inputs': ['cleaning', 'feature_matrix']},
+    'outlier_lof': {'module': 'outlier_lof', 'inputs': ['cleaning', 'feature_matrix']},
+    'outlier_comparison': {
+        'module': 'outlier_comparison',
+        'inputs': ['outlier_zscore', 'outlier_isolation_forest', 'outlier_lof']
+    }
+}
+
+def fingerprint(value):
+    digest = hashlib.sha256()
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(zip(value.columns, value.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(str(value.dtype).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            digest.update(fingerprint(item).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            digest.update(str(key).encode())
+            digest.update(fingerprint(value[key]).encode())
+    else:
+        digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+def code_fingerprint(module_name):
+    # Hash every module in the stage's folder so edits to shared helpers
+    # (utils.py, partitioned_aggregation.py) also invalidate the stage.
+    spec = importlib.util.find_spec(module_name)
+    module_dir = os.path.dirname(spec.origin)
+    digest = hashlib.sha256()
+    for filename in sorted(os.listdir(module_dir)):
+        if filename.endswith('.py'):
+            with open(os.path.join(module_dir, filename), 'rb') as f:
+                digest.update(filename.encode())
+                digest.update(f.read())
+    return digest.hexdigest()
+
+def source_fingerprint(path):
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [os.path.basename(path), stat.st_size, stat.st_mtime_ns]
+
+def stage_key(name, stage, input_fingerprints):
+    payload = {
+        'stage': name,
+        'params': repr(sorted(stage.get('params', {}).items())),
+        'code': code_fingerprint(stage['module']),
+        'inputs': input_fingerprints,
+        'sources': [source_fingerprint(path) for path in stage.get('sources', [])]
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def output_path(name):
+    return os.path.join(STATE_DIR, f'{name}.pkl')
+
+def load_state():
+    state_path = os.path.join(STATE_DIR, 'state.json')
+    if not os.path.exists(state_path):
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_state(state):
+    with open(os.path.join(STATE_DIR, 'state.json'), 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def run_stage(name, module_name, inputs, params):
+    module = importlib.import_module(module_name)
+    with track_stage(name, rows_in=count_rows(inputs)) as record:
+        result = module.main(*inputs, **params)
+        record['rows_out'] = count_rows(result)
+    # Records travel back with the result because pool workers keep their own
+    return result, pop_stage_records()
+
+def run_pipeline(stages=STAGES, workers=1, force=False):
+    print_section_header("PIPELINE RUN")
+    os.makedirs(STATE_DIR, exist_ok=True)
+
+    state = load_state()
+    outputs = {}
+    fingerprints = {}
+    pending = dict(stages)
+    running = {}
+    summary = {}
+    run_records = []
+    run_start = time.perf_counter()
+
+    def get_output(name):
+        if name not in outputs:
+            with open(output_path(name), 'rb') as f:
+                outputs[name] = pickle.load(f)
+        return outputs[name]
+
+    def finish(name, key, stage_result):
+        result, records = stage_result
+        run_records.extend(records)
+        outputs[name] = result
+        fingerprints[name] = fingerprint(result)
+        with open(output_path(name), 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        state[name] = {'key': key, 'output_fingerprint': fingerprints[name]}
+        save_state(state)
+        summary[name] = 'ran'
+        print(f"  ✓ Finished: {name}")
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while pending or running:
+            ready = [name for name, stage in pending.items()
+                     if all(dep in fingerprints for dep in stage['inputs'])]
+
+            for name in ready:
+                stage = pending.pop(name)
+                key = stage_key(name, stage, [fingerprints[dep] for dep in stage['inputs']])
+                cached = state.get(name)
+
+                if not force and cached and cached['key'] == key and os.path.exists(output_path(name)):
+                    fingerprints[name] = cached['output_fingerprint']
+                    summary[name] = 'skipped'
+                    print(f"  - Skipped (unchanged): {name}")
+                    continue
+
+                inputs = [get_output(dep) for dep in stage['inputs']]
+                params = stage.get('params', {})
+                print(f"  → Running: {name}")
+                if executor is None:
+                    finish(name, key, run_stage(name, stage['module'], inputs, params))
+                else:
+                    future = executor.submit(run_stage, name, stage['module'], inputs, params)
+                    running[future] = (name, key)
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    finish(name, key, future.result())
+            elif pending and not ready:
+                raise ValueError(f"Unresolvable stage inputs: {sorted(pending)}")
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - run_start
+
+    print_section_header("PIPELINE COMPLETE")
+    ran = [name for name, status in summary.items() if status == 'ran']
+    skipped = [name for name, status in summary.items() if status == 'skipped']
+    print(f"✓ Stages run: {len(ran)}")
+    print(f"✓ Stages skipped (inputs and parameters unchanged): {len(skipped)}")
+    print(f"✓ Elapsed: {elapsed:.1f}s")
+
+    for record in run_records:
+        if record['parent'] is None:
+            print(f"  {record['stage']:<26} {record['wall_time_s']:>8.2f}s  "
+                  f"peak {record['peak_tracemalloc_mb'] or 0:>8.1f} MB")
+
+    write_run_manifest(run_records, extra={
+        'elapsed_wall_time_s': round(elapsed, 4),
+        'workers': workers,
+        'forced': force,
+        'skipped_stages': skipped
+    })
+
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the preprocessing and phase-2 stages as one in-memory pipeline.')
+    parser.add_argument(
+        '-w', '--workers',
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help='Number of processes for independent stages (default: up to 4, 1 = run in-process)'
+    )
+    parser.add_argument(
+        '-f', '--force',
+        action='store_true',
+        help='Re-run every stage even if its inputs and parameters are unchanged'
+    )
+    args = parser.parse_args()
+
+    # Stages still write reports and figures through '../../' paths, which
+    # resolve to the project root from either source folder.
+    os.chdir(os.path.join(src_dir, 'analysis'))
+
+    run_pipeline(workers=args.workers, force=args.force)
+
+if __name__ == '__main__':
+    main()